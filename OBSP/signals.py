@@ -4,9 +4,7 @@ from django.db import transaction
 from django.utils import timezone
 from OBSP.models import OBSPResponse
 from freelancer.models import FreelancerOBSPEligibility
-from core.models import Notification, User  # Assuming Notification is in core.models
-from asgiref.sync import async_to_sync
-from channels.layers import get_channel_layer
+from core.services.notification_service import NotificationService
 import logging
 from django.utils.html import escape
 
@@ -33,14 +31,11 @@ def send_obsp_response_notifications(sender, instance, created, **kwargs):
                     eligible_list = list(eligible_freelancers)
                     
                     if eligible_list:
-                        for freelancer_data in eligible_list:
-                            freelancer = User.objects.get(id=freelancer_data['freelancer__id'])
-                            
-                            obsp_title = escape(instance.template.title)
-                            level_display = instance.get_selected_level_display()
-                            obsp_url = f"/freelancer/obsp/obspresponse/{instance.id}"
+                        obsp_title = escape(instance.template.title)
+                        level_display = instance.get_selected_level_display()
+                        obsp_url = f"/freelancer/obsp/obspresponse/{instance.id}"
 
-                            notification_html = f"""
+                        notification_html = f"""
   <div style='padding: 20px; text-align: center;'>
     <h2 style='font-size: 1.5rem; color: #222; margin-bottom: 10px; font-weight: 700;'>
       New OBSP Opportunity
@@ -58,35 +53,23 @@ def send_obsp_response_notifications(sender, instance, created, **kwargs):
   </div>
 """
 
-                            notification = Notification.objects.create(
-                                user=freelancer,
-                                title="New OBSP Opportunity",
-                                notification_text=notification_html,
-                                type='obsp_opportunity',
-                                is_read=False,
-                            )
-                            
-                            # Broadcast via WebSocket (using your existing consumers)
-                            channel_layer = get_channel_layer()
-                            group_name = f"freelancer_notification_{freelancer.id}"  # Matches your consumer group
-                            
-                            async_to_sync(channel_layer.group_send)(
-                                group_name,
-                                {
-                                    'type': 'send_notification',
-                                    'notification': {
-                                        'id': notification.id,
-                                        'title': notification.title,
-                                        'notification_text': notification.notification_text,
-                                        'created_at': notification.created_at.isoformat(),
-                                        'related_model_id': instance.id,  # Link back to the OBSP response
-                                        'type': notification.type,
-                                    }
-                                }
-                            )
-                            
-                            logger.info(f"Notification sent to freelancer {freelancer.username} for OBSP response {instance.id}")
-                    
+                        # One bulk insert for every eligible freelancer
+                        notifications = NotificationService.send_many(
+                            [freelancer_data['freelancer__id'] for freelancer_data in eligible_list],
+                            type='obsp_opportunity',
+                            subtype='opportunity',
+                            title="New OBSP Opportunity",
+                            notification_text=notification_html,
+                            related_model_id=instance.id,  # Link back to the OBSP response
+                        )
+
+                        # Broadcast via WebSocket (using your existing consumers)
+                        transaction.on_commit(lambda: NotificationService.publish_to_groups(
+                            notifications, "freelancer_notification_{}"
+                        ))
+
+                        logger.info(f"Notification sent to {len(notifications)} freelancer(s) for OBSP response {instance.id}")
+
                     logger.info(f"Notifications processed for OBSP response {instance.id}")
         except Exception as e:
             logger.error(f"Error in send_obsp_response_notifications: {str(e)}") 
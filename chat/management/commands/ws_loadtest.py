@@ -0,0 +1,393 @@
+import asyncio
+import json
+import statistics
+import threading
+import time
+import uuid
+
+from asgiref.sync import SyncToAsync
+from channels.layers import DEFAULT_CHANNEL_LAYER, InMemoryChannelLayer, channel_layers
+from channels.testing import WebsocketCommunicator
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.backends.signals import connection_created
+from rest_framework_simplejwt.tokens import AccessToken
+
+from chat.models import Conversation, ConversationParticipant
+from chat.services.presence_service import LocalPresenceBackend, PresenceService
+from core.models import Notification, User
+
+USERNAME_PREFIX = 'wsload_'
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def summarize(values):
+    """Milliseconds summary of a list of second durations"""
+    return {
+        'count': len(values),
+        'p50_ms': round(percentile(values, 50) * 1000, 2),
+        'p95_ms': round(percentile(values, 95) * 1000, 2),
+        'p99_ms': round(percentile(values, 99) * 1000, 2),
+        'max_ms': round(max(values) * 1000, 2) if values else 0.0,
+        'mean_ms': round(statistics.fmean(values) * 1000, 2) if values else 0.0,
+    }
+
+
+class Instrumentation:
+    """
+    Counts SQL queries on every connection and times every sync_to_async /
+    database_sync_to_async call, plus an event-loop lag probe.
+    """
+
+    def __init__(self, probe_interval=0.005):
+        self.lock = threading.Lock()
+        self.queries = 0
+        self.sync_calls = []
+        self.loop_lag = []
+        self.probe_interval = probe_interval
+        self._original_thread_handler = None
+
+    def count_query(self, execute, sql, params, many, context):
+        with self.lock:
+            self.queries += 1
+        return execute(sql, params, many, context)
+
+    def _on_connection_created(self, sender, connection, **kwargs):
+        if self.count_query not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self.count_query)
+
+    def install(self):
+        connection_created.connect(self._on_connection_created, weak=False)
+
+        instrumentation = self
+        original = SyncToAsync.thread_handler
+        self._original_thread_handler = original
+
+        def timed_thread_handler(self, loop, *args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return original(self, loop, *args, **kwargs)
+            finally:
+                with instrumentation.lock:
+                    instrumentation.sync_calls.append(time.perf_counter() - started)
+
+        SyncToAsync.thread_handler = timed_thread_handler
+
+    def uninstall(self):
+        connection_created.disconnect(self._on_connection_created)
+        if self._original_thread_handler:
+            SyncToAsync.thread_handler = self._original_thread_handler
+
+    def reset(self):
+        with self.lock:
+            self.queries = 0
+            self.sync_calls = []
+            self.loop_lag = []
+
+    async def probe_loop(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.probe_interval)
+            self.loop_lag.append(max(0.0, time.perf_counter() - started - self.probe_interval))
+
+
+class Client:
+    """A connected WebsocketCommunicator plus a reader that timestamps frames"""
+
+    def __init__(self, application, path, user, on_frame):
+        self.user = user
+        self.communicator = WebsocketCommunicator(
+            application, path, headers=[(b'origin', b'http://localhost')]
+        )
+        self.on_frame = on_frame
+        self.reader = None
+
+    async def connect(self):
+        connected, _ = await self.communicator.connect()
+        if not connected:
+            raise CommandError(f"Websocket connection refused for {self.user.username}")
+        self.reader = asyncio.ensure_future(self._read())
+
+    async def _read(self):
+        # Read the output queue directly: receive_output() cancels the
+        # application when its timeout expires.
+        queue = self.communicator.output_queue
+        while True:
+            message = await queue.get()
+            if message.get('type') == 'websocket.send' and message.get('text'):
+                self.on_frame(self, json.loads(message['text']), time.perf_counter())
+
+    async def send(self, payload):
+        await self.communicator.send_to(text_data=json.dumps(payload))
+
+    async def close(self):
+        if self.reader:
+            self.reader.cancel()
+        await self.communicator.disconnect()
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test ChatConsumer and the notification consumers in-process with "
+        "WebsocketCommunicator and the in-memory channel layer. Reports per-frame "
+        "latency, SQL queries per frame and time spent in sync_to_async calls."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--conversations', type=int, default=10, help="Concurrent conversations")
+        parser.add_argument('--participants', type=int, default=2, help="Participants per conversation")
+        parser.add_argument('--messages', type=int, default=5, help="Messages each participant sends")
+        parser.add_argument('--notification-subscribers', type=int, default=10,
+                            help="Users that also open the notification sockets and receive notifications")
+        parser.add_argument('--timeout', type=float, default=30.0, help="Seconds to wait for each phase")
+        parser.add_argument('--json', action='store_true', help="Print the report as JSON")
+        parser.add_argument('--keep-data', action='store_true', help="Keep the generated users and conversations")
+        parser.add_argument('--force', action='store_true', help="Allow running with DEBUG=False")
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options['force']:
+            raise CommandError("ws_loadtest writes fixture rows; run it against a development database or pass --force")
+
+        # Everything stays in this process: no Redis for channels or presence.
+        channel_layers.set(DEFAULT_CHANNEL_LAYER, InMemoryChannelLayer(capacity=100000))
+        PresenceService.backend = LocalPresenceBackend()
+
+        users, conversations = self.create_fixtures(options)
+        instrumentation = Instrumentation()
+        instrumentation.install()
+        try:
+            report = asyncio.run(self.run(users, conversations, instrumentation, options))
+        finally:
+            instrumentation.uninstall()
+            if not options['keep_data']:
+                self.delete_fixtures(conversations)
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self.print_report(report)
+
+    # Fixtures
+
+    def create_fixtures(self, options):
+        run_id = uuid.uuid4().hex[:8]
+        users = []
+        conversations = []
+        for c in range(options['conversations']):
+            conversation = Conversation.objects.create(is_group=options['participants'] > 2)
+            members = []
+            for p in range(options['participants']):
+                user = User.objects.create(
+                    username=f"{USERNAME_PREFIX}{run_id}_{c}_{p}",
+                    email=f"{USERNAME_PREFIX}{run_id}_{c}_{p}@example.com",
+                    role='client' if p % 2 == 0 else 'freelancer',
+                )
+                ConversationParticipant.objects.create(conversation=conversation, user=user)
+                members.append(user)
+            users.extend(members)
+            conversations.append((conversation, members))
+        return users, conversations
+
+    def delete_fixtures(self, conversations):
+        conversation_ids = [conversation.id for conversation, _ in conversations]
+        user_ids = [user.id for _, members in conversations for user in members]
+        Conversation.objects.filter(id__in=conversation_ids).delete()
+        User.objects.filter(id__in=user_ids).delete()
+
+    # Scenario
+
+    async def run(self, users, conversations, instrumentation, options):
+        from freelancer_hub.asgi import application
+
+        chat_latency, seen_latency, notification_latency = [], [], []
+        sent_messages = {}        # temp_id -> perf_counter at send
+        sent_receipts = {}        # (message_id, user_id) -> perf_counter at send
+        sent_notifications = {}   # notification id -> perf_counter at create
+        received_by = {}          # user id -> message ids sent by others
+
+        def on_chat_frame(client, frame, at):
+            if frame.get('type') == 'seen':
+                started = sent_receipts.get((frame['message_id'], frame['user_id']))
+                if started:
+                    seen_latency.append(at - started)
+            elif frame.get('temp_id') in sent_messages:
+                chat_latency.append(at - sent_messages[frame['temp_id']])
+                if frame['sender']['id'] != client.user.id:
+                    received_by.setdefault(client.user.id, []).append(frame['id'])
+
+        def on_notification_frame(client, frame, at):
+            notification_id = frame.get('notification_id')
+            if notification_id in sent_notifications:
+                notification_latency.append(at - sent_notifications[notification_id])
+
+        def token(user):
+            return str(AccessToken.for_user(user))
+
+        chat_clients = []
+        for conversation, members in conversations:
+            for user in members:
+                chat_clients.append(Client(
+                    application, f"/ws/chat/{conversation.id}/?token={token(user)}", user, on_chat_frame
+                ))
+        notification_users = users[:options['notification_subscribers']]
+        notification_clients = []
+        for user in notification_users:
+            notification_clients.append(Client(application, f"/ws/notification_count/?token={token(user)}", user, lambda *a: None))
+            notification_clients.append(Client(application, f"/ws/notifications/?token={token(user)}", user, on_notification_frame))
+
+        phases = {}
+        probe = asyncio.ensure_future(instrumentation.probe_loop())
+        try:
+            phases['connect'] = await self.measure(
+                instrumentation, len(chat_clients) + len(notification_clients),
+                lambda: asyncio.gather(*[c.connect() for c in chat_clients + notification_clients]),
+            )
+
+            # Messages: every participant of every conversation sends concurrently,
+            # and each message is echoed to every participant including the sender.
+            expected = sum(len(members) ** 2 for _, members in conversations) * options['messages']
+
+            async def send_messages():
+                for _ in range(options['messages']):
+                    sends = []
+                    for client in chat_clients:
+                        temp_id = uuid.uuid4().hex
+                        sent_messages[temp_id] = time.perf_counter()
+                        sends.append(client.send({'message': f"load test {temp_id}", 'temp_id': temp_id}))
+                    await asyncio.gather(*sends)
+                await self.wait_for(lambda: len(chat_latency) >= expected, options['timeout'])
+
+            frames = len(chat_clients) * options['messages']
+            phases['messages'] = await self.measure(instrumentation, frames, send_messages)
+            phases['messages']['delivered'] = len(chat_latency)
+            phases['messages']['expected'] = expected
+            phases['messages']['latency'] = summarize(chat_latency)
+
+            # Seen receipts for everything each participant received.
+            receipt_frames = 0
+            expected_receipts = 0
+            members_by_user = {u.id: len(m) for _, m in conversations for u in m}
+
+            async def send_receipts():
+                nonlocal receipt_frames, expected_receipts
+                sends = []
+                for client in chat_clients:
+                    message_ids = received_by.get(client.user.id, [])
+                    if not message_ids:
+                        continue
+                    for message_id in message_ids:
+                        sent_receipts[(message_id, client.user.id)] = time.perf_counter()
+                    expected_receipts += len(message_ids) * members_by_user[client.user.id]
+                    receipt_frames += 1
+                    sends.append(client.send({'type': 'seen', 'message_ids': message_ids}))
+                await asyncio.gather(*sends)
+                await self.wait_for(lambda: len(seen_latency) >= expected_receipts, options['timeout'])
+
+            phases['receipts'] = await self.measure(instrumentation, None, send_receipts)
+            phases['receipts']['frames'] = receipt_frames
+            phases['receipts']['per_frame'] = self.per_frame(phases['receipts'], receipt_frames)
+            phases['receipts']['delivered'] = len(seen_latency)
+            phases['receipts']['expected'] = expected_receipts
+            phases['receipts']['latency'] = summarize(seen_latency)
+
+            # Notifications created through the ORM, so the post_save signals fan out.
+            @SyncToAsync
+            def create_notification(user):
+                started = time.perf_counter()
+                notification = Notification.objects.create(
+                    user=user, type='Messages', title="Load test", notification_text="Load test notification",
+                )
+                sent_notifications[notification.id] = started
+
+            async def send_notifications():
+                for _ in range(options['messages']):
+                    await asyncio.gather(*[create_notification(user) for user in notification_users])
+                await self.wait_for(
+                    lambda: len(notification_latency) >= len(notification_users) * options['messages'],
+                    options['timeout'],
+                )
+
+            phases['notifications'] = await self.measure(
+                instrumentation, len(notification_users) * options['messages'], send_notifications
+            )
+            phases['notifications']['delivered'] = len(notification_latency)
+            phases['notifications']['latency'] = summarize(notification_latency)
+        finally:
+            probe.cancel()
+            await asyncio.gather(*[c.close() for c in chat_clients + notification_clients], return_exceptions=True)
+
+        return {
+            'conversations': len(conversations),
+            'participants': options['participants'],
+            'messages_per_participant': options['messages'],
+            'notification_subscribers': len(notification_users),
+            'phases': phases,
+        }
+
+    async def measure(self, instrumentation, frames, run):
+        instrumentation.reset()
+        started = time.perf_counter()
+        await run()
+        elapsed = time.perf_counter() - started
+        result = {
+            'seconds': round(elapsed, 3),
+            'frames': frames,
+            'queries': instrumentation.queries,
+            'sync_calls': summarize(instrumentation.sync_calls),
+            'sync_seconds': round(sum(instrumentation.sync_calls), 3),
+            'loop_lag': summarize(instrumentation.loop_lag),
+        }
+        if frames:
+            result['per_frame'] = self.per_frame(result, frames)
+        return result
+
+    def per_frame(self, result, frames):
+        if not frames:
+            return {}
+        return {
+            'queries': round(result['queries'] / frames, 2),
+            'sync_calls': round(result['sync_calls']['count'] / frames, 2),
+            'sync_ms': round(result['sync_seconds'] * 1000 / frames, 2),
+        }
+
+    async def wait_for(self, condition, timeout):
+        deadline = time.perf_counter() + timeout
+        while not condition():
+            if time.perf_counter() > deadline:
+                self.stderr.write(self.style.WARNING("Timed out waiting for deliveries"))
+                return
+            await asyncio.sleep(0.01)
+
+    # Output
+
+    def print_report(self, report):
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['conversations']} conversations x {report['participants']} participants, "
+            f"{report['messages_per_participant']} messages each, "
+            f"{report['notification_subscribers']} notification subscribers"
+        ))
+        for name, phase in report['phases'].items():
+            line = f"{name:<14} {phase['seconds']:>8.3f}s  queries={phase['queries']}"
+            per_frame = phase.get('per_frame')
+            if per_frame:
+                line += (
+                    f"  per frame: {per_frame['queries']} queries, {per_frame['sync_calls']} sync calls, "
+                    f"{per_frame['sync_ms']} ms in sync code"
+                )
+            self.stdout.write(line)
+            if 'latency' in phase:
+                latency = phase['latency']
+                delivered = f"{phase['delivered']}/{phase['expected']}" if 'expected' in phase else phase['delivered']
+                self.stdout.write(
+                    f"{'':<14} delivered={delivered}  latency p50={latency['p50_ms']}ms "
+                    f"p95={latency['p95_ms']}ms p99={latency['p99_ms']}ms max={latency['max_ms']}ms"
+                )
+            lag = phase['loop_lag']
+            self.stdout.write(f"{'':<14} event loop lag p99={lag['p99_ms']}ms max={lag['max_ms']}ms")
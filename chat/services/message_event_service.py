@@ -0,0 +1,192 @@
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from ..models import Conversation, ConversationParticipant, Message, MessageStatus
+from ..serializers import UserShortSerializer
+
+
+def build_absolute_uri(path):
+    base = getattr(settings, "BASE_URL", "http://127.0.0.1:8000")
+    if not path:
+        return None
+    if path.startswith("http"):
+        return path
+    return base + path
+
+
+class MessageEventService:
+    """
+    Single pipeline for realtime chat events.
+
+    Every place that creates a message (the chat socket, file uploads and
+    ``create_conversation_and_send_message``) calls ``message_created``; after
+    the transaction commits, ``dispatch_message_created`` loads the message and
+    participants once, publishes the message to ``chat_<id>`` and one
+    ``user_conversation_update`` to each participant's ``user_<id>`` group.
+    """
+
+    @staticmethod
+    def message_created(message, temp_id=None, file_url=None, file_name=None):
+        """Publish the events for a new message once the current transaction commits"""
+        transaction.on_commit(lambda: MessageEventService.dispatch_message_created(
+            message.id, temp_id=temp_id, file_url=file_url, file_name=file_name,
+        ))
+
+    @staticmethod
+    def dispatch_message_created(message_id, temp_id=None, file_url=None, file_name=None):
+        message = (
+            Message.objects
+            .select_related('sender', 'reply_to__sender')
+            .get(id=message_id)
+        )
+        conversation_id = message.conversation_id
+
+        # The first message turns a temporary conversation into a real one
+        Conversation.objects.filter(id=conversation_id, is_temporary=True).update(is_temporary=False)
+        conversation = Conversation.objects.get(id=conversation_id)
+        participants = MessageEventService._participants(conversation_id)
+
+        sender = next((p.user for p in participants if p.user_id == message.sender_id), message.sender)
+        avatar = MessageEventService._avatar(sender)
+
+        async_to_sync(get_channel_layer().group_send)(
+            f"chat_{conversation_id}",
+            {
+                'type': 'chat_message',
+                'conversation_id': conversation_id,
+                'message': MessageEventService._message_payload(message, avatar, temp_id, file_url, file_name),
+            }
+        )
+        MessageEventService._publish_conversation_updates(conversation, participants, message, message.sender_id)
+
+    @staticmethod
+    def conversation_updated(conversation_id, actor_id):
+        """Refresh every participant's conversation list entry (e.g. after seen receipts)"""
+        conversation = Conversation.objects.get(id=conversation_id)
+        last_message = (
+            Message.objects.filter(conversation_id=conversation_id)
+            .select_related('sender')
+            .order_by('-created_at')
+            .first()
+        )
+        participants = MessageEventService._participants(conversation_id)
+        MessageEventService._publish_conversation_updates(conversation, participants, last_message, actor_id)
+
+    @staticmethod
+    def _participants(conversation_id):
+        """Participants with user, profiles and their unread count in one query"""
+        seen = MessageStatus.objects.filter(
+            message=OuterRef('pk'), user=OuterRef(OuterRef('user')), status='seen'
+        )
+        unread = (
+            Message.objects.filter(conversation=OuterRef('conversation'))
+            .exclude(sender=OuterRef('user'))
+            .exclude(Exists(seen))
+            .order_by()
+            .values('conversation')
+            .annotate(count=Count('id'))
+            .values('count')
+        )
+        return list(
+            ConversationParticipant.objects
+            .filter(conversation_id=conversation_id)
+            .select_related('user', 'user__client_profile', 'user__freelancer_profile')
+            .annotate(unread=Coalesce(Subquery(unread), Value(0)))
+        )
+
+    @staticmethod
+    def _avatar(user):
+        return build_absolute_uri(UserShortSerializer(user, context={'request': None}).data.get('avatar'))
+
+    @staticmethod
+    def _message_payload(message, avatar, temp_id, file_url, file_name):
+        sender = {
+            'id': message.sender_id,
+            'username': message.sender.username,
+            'avatar': avatar,
+        }
+        reply_to = {
+            'id': message.reply_to.id,
+            'content': message.reply_to.content,
+            'sender': {
+                'id': message.reply_to.sender.id,
+                'username': message.reply_to.sender.username,
+            },
+        } if message.reply_to else None
+
+        if message.file:
+            return {
+                'id': message.id,
+                'file_url': file_url or build_absolute_uri(message.file.url),
+                'name': file_name or message.file.name,
+                'sender': sender,
+                'avatar': avatar,
+                'created_at': message.created_at.isoformat(),
+                'reply_to': reply_to,
+                'type': 'file_uploaded',
+                'conversation_id': message.conversation_id,
+                'content': '',
+                'temp_id': temp_id,
+            }
+        return {
+            'id': message.id,
+            'sender': sender,
+            'avatar': avatar,
+            'content': message.content,
+            'created_at': message.created_at.isoformat(),
+            'temp_id': temp_id,
+            'reply_to': reply_to,
+        }
+
+    @staticmethod
+    def _publish_conversation_updates(conversation, participants, last_message, actor_id):
+        last_message_payload = {
+            'id': last_message.id,
+            'content': last_message.content or '',
+            'created_at': last_message.created_at.isoformat(),
+            'sender': {
+                'id': last_message.sender_id,
+                'username': last_message.sender.username,
+            },
+        } if last_message else None
+        participant_payload = [{'id': p.user_id, 'username': p.user.username} for p in participants]
+        timestamp = last_message.created_at.isoformat() if last_message else conversation.updated_at.isoformat()
+
+        if conversation.is_group:
+            group_avatar = build_absolute_uri(getattr(conversation, 'group_avatar', None))
+        else:
+            avatars = {p.user_id: MessageEventService._avatar(p.user) for p in participants}
+
+        channel_layer = get_channel_layer()
+        for participant in participants:
+            if conversation.is_group:
+                name = getattr(conversation, 'group_name', 'Group Chat')
+                avatar = group_avatar
+            else:
+                other = next((p for p in participants if p.user_id != participant.user_id), None)
+                if other:
+                    name = other.user.get_full_name() or other.user.username
+                    avatar = avatars[other.user_id]
+                else:
+                    name = "Unknown"
+                    avatar = "https://ui-avatars.com/api/?name=Unknown"
+
+            async_to_sync(channel_layer.group_send)(
+                f"user_{participant.user_id}",
+                {
+                    'type': 'user_conversation_update',
+                    'conversation_id': conversation.id,
+                    'name': name,
+                    'avatar': avatar,
+                    'is_group': conversation.is_group,
+                    'lastMessage': last_message_payload,
+                    'participants': participant_payload,
+                    'timestamp': timestamp,
+                    'unread': participant.unread,
+                    'sender_id': actor_id,
+                }
+            )
@@ -0,0 +1,182 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.utils.html import escape
+
+from ..models import ConversationParticipant, Message
+
+User = get_user_model()
+
+HIGHLIGHT_START = '<mark>'
+HIGHLIGHT_END = '</mark>'
+
+# Private-use code points mark matches inside the database snippet so the
+# message text can be HTML-escaped before the real <mark> tags are added.
+_MATCH_START = '\ue000'
+_MATCH_END = '\ue001'
+
+
+class MessageSearchService:
+    """
+    Full-text search over chat messages, restricted to the conversations a
+    user participates in.
+
+    Postgres uses the generated ``search_vector`` column plus a trigram index on
+    ``content`` (see chat migration 0003); SQLite uses the ``chat_message_fts``
+    FTS5 table. Results are returned newest first and paginated with an id
+    cursor, so deep pages cost the same as the first one.
+    """
+    DEFAULT_LIMIT = 20
+    MAX_LIMIT = 50
+
+    @staticmethod
+    def tokenize(query):
+        return re.findall(r'\w+', (query or '').lower())
+
+    @staticmethod
+    def search(user, query, cursor=None, limit=None, conversation_id=None):
+        """Return ``{'results': [...], 'next_cursor': str|None}`` for ``query``"""
+        tokens = MessageSearchService.tokenize(query)
+        limit = min(int(limit or MessageSearchService.DEFAULT_LIMIT), MessageSearchService.MAX_LIMIT)
+        if not tokens or limit <= 0:
+            return {'results': [], 'next_cursor': None}
+
+        before_id = int(cursor) if cursor else None
+        vendor = connection.vendor
+        if vendor == 'postgresql':
+            rows = MessageSearchService._search_postgres(user, query, tokens, before_id, limit + 1, conversation_id)
+        elif vendor == 'sqlite':
+            rows = MessageSearchService._search_sqlite(user, tokens, before_id, limit + 1, conversation_id)
+        else:
+            rows = MessageSearchService._search_fallback(user, query, before_id, limit + 1, conversation_id)
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        return {
+            'results': [MessageSearchService._serialize(row) for row in rows],
+            'next_cursor': str(rows[-1].id) if has_more and rows else None,
+        }
+
+    @staticmethod
+    def _scope_sql(user, before_id, conversation_id):
+        """WHERE fragments shared by the raw backends (alias ``m`` is chat_message)"""
+        participant_table = ConversationParticipant._meta.db_table
+        deleted_for_me_table = Message.is_deleted_for_me.through._meta.db_table
+        clauses = [
+            f"m.conversation_id IN (SELECT conversation_id FROM {participant_table} "
+            f"WHERE user_id = %s AND is_deleted = %s)",
+            "m.is_deleted_for_everyone = %s",
+            f"NOT EXISTS (SELECT 1 FROM {deleted_for_me_table} d WHERE d.message_id = m.id AND d.user_id = %s)",
+        ]
+        params = [user.id, False, False, user.id]
+        if conversation_id:
+            clauses.append("m.conversation_id = %s")
+            params.append(int(conversation_id))
+        if before_id:
+            clauses.append("m.id < %s")
+            params.append(before_id)
+        return ' AND '.join(clauses), params
+
+    @staticmethod
+    def _search_postgres(user, query, tokens, before_id, limit, conversation_id):
+        message_table = Message._meta.db_table
+        user_table = User._meta.db_table
+        tsquery = ' & '.join(f"{token}:*" for token in tokens)
+        like_pattern = '%' + re.sub(r'([\\%_])', r'\\\1', query.strip()) + '%'
+        scope_sql, scope_params = MessageSearchService._scope_sql(user, before_id, conversation_id)
+
+        # Rank/paginate on the indexed columns first, then build headlines only
+        # for the rows that make it onto the page.
+        sql = f"""
+            SELECT m.*, u.username AS sender_username,
+                   ts_headline('simple', m.content, to_tsquery('simple', %s), %s) AS snippet
+            FROM (
+                SELECT m.id FROM {message_table} m
+                WHERE {scope_sql}
+                  AND (m.search_vector @@ to_tsquery('simple', %s) OR m.content ILIKE %s)
+                ORDER BY m.id DESC
+                LIMIT %s
+            ) page
+            JOIN {message_table} m ON m.id = page.id
+            JOIN {user_table} u ON u.id = m.sender_id
+            ORDER BY m.id DESC
+        """
+        headline_options = f'StartSel={_MATCH_START}, StopSel={_MATCH_END}, MaxFragments=2, MaxWords=20, MinWords=5'
+        params = [tsquery, headline_options, *scope_params, tsquery, like_pattern, limit]
+        return list(Message.objects.raw(sql, params))
+
+    @staticmethod
+    def _search_sqlite(user, tokens, before_id, limit, conversation_id):
+        message_table = Message._meta.db_table
+        user_table = User._meta.db_table
+        match = ' '.join(f'"{token}"*' for token in tokens)
+        scope_sql, scope_params = MessageSearchService._scope_sql(user, before_id, conversation_id)
+        sql = f"""
+            SELECT m.*, u.username AS sender_username,
+                   snippet(chat_message_fts, 0, %s, %s, '…', 16) AS snippet
+            FROM chat_message_fts
+            JOIN {message_table} m ON m.id = chat_message_fts.rowid
+            JOIN {user_table} u ON u.id = m.sender_id
+            WHERE chat_message_fts MATCH %s AND {scope_sql}
+            ORDER BY m.id DESC
+            LIMIT %s
+        """
+        params = [_MATCH_START, _MATCH_END, match, *scope_params, limit]
+        return list(Message.objects.raw(sql, params))
+
+    @staticmethod
+    def _search_fallback(user, query, before_id, limit, conversation_id):
+        """Unindexed icontains search for databases without a dedicated backend"""
+        messages = Message.objects.filter(
+            conversation__participants__user=user,
+            conversation__participants__is_deleted=False,
+            is_deleted_for_everyone=False,
+            content__icontains=query.strip(),
+        ).exclude(is_deleted_for_me=user).select_related('sender')
+        if conversation_id:
+            messages = messages.filter(conversation_id=conversation_id)
+        if before_id:
+            messages = messages.filter(id__lt=before_id)
+
+        rows = list(messages.order_by('-id')[:limit])
+        for row in rows:
+            row.sender_username = row.sender.username
+            row.snippet = MessageSearchService._highlight(row.content, query.strip())
+        return rows
+
+    @staticmethod
+    def _highlight(content, query, radius=60):
+        index = content.lower().find(query.lower())
+        if index < 0:
+            return content[:radius * 2]
+        start = max(0, index - radius)
+        end = min(len(content), index + len(query) + radius)
+        return (
+            ('…' if start else '')
+            + content[start:index]
+            + _MATCH_START + content[index:index + len(query)] + _MATCH_END
+            + content[index + len(query):end]
+            + ('…' if end < len(content) else '')
+        )
+
+    @staticmethod
+    def _render_snippet(snippet):
+        return (
+            escape(snippet or '')
+            .replace(_MATCH_START, HIGHLIGHT_START)
+            .replace(_MATCH_END, HIGHLIGHT_END)
+        )
+
+    @staticmethod
+    def _serialize(message):
+        return {
+            'id': message.id,
+            'conversation_id': message.conversation_id,
+            'sender': {
+                'id': message.sender_id,
+                'username': message.sender_username,
+            },
+            'snippet': MessageSearchService._render_snippet(message.snippet),
+            'created_at': message.created_at.isoformat(),
+        }
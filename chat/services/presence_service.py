@@ -0,0 +1,186 @@
+import asyncio
+import time
+
+from django.conf import settings
+
+
+class LocalPresenceBackend:
+    """
+    In-process stand-in for Redis with the few commands presence needs.
+    Used for tests and single-process development (PRESENCE_BACKEND='local').
+    """
+
+    def __init__(self):
+        self._data = {}
+
+    def _get(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        return value
+
+    async def write(self, sets=(), deletes=(), connections=()):
+        now = time.monotonic()
+        for key, member, seen, ttl in connections:
+            members = self._get(key) or {}
+            members[member] = seen
+            self._data[key] = (members, now + ttl)
+        for key, value, ttl in sets:
+            self._data[key] = (str(value), now + ttl)
+        for key in deletes:
+            self._data.pop(key, None)
+
+    async def mget(self, keys):
+        return [self._get(key) for key in keys]
+
+    async def remove_connection(self, key, member, now, ttl, online_key):
+        connections = self._get(key) or {}
+        connections.pop(member, None)
+        for stale in [m for m, seen in connections.items() if seen <= now - ttl]:
+            del connections[stale]
+        if connections:
+            self._data[key] = (connections, time.monotonic() + ttl)
+        else:
+            self._data.pop(key, None)
+            self._data.pop(online_key, None)
+        return len(connections)
+
+    def flush(self):
+        self._data.clear()
+
+
+class RedisPresenceBackend:
+    """Presence keys in Redis, written through a pipeline and read with MGET"""
+
+    # Drop one connection and any that stopped heartbeating; clear the online
+    # key only when none are left. One script, so a heartbeat from another
+    # connection cannot land between the count and the delete.
+    REMOVE_CONNECTION = """
+        redis.call('ZREM', KEYS[1], ARGV[1])
+        redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', tonumber(ARGV[2]) - tonumber(ARGV[3]))
+        local remaining = redis.call('ZCARD', KEYS[1])
+        if remaining == 0 then
+            redis.call('DEL', KEYS[1], KEYS[2])
+        end
+        return remaining
+    """
+
+    def __init__(self, url):
+        self.url = url
+        self._clients = {}
+
+    @property
+    def client(self):
+        # redis.asyncio connections belong to the loop that opened them
+        import redis.asyncio as redis
+
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = redis.from_url(self.url, decode_responses=True)
+            self._clients = {loop: client}
+        return client
+
+    async def write(self, sets=(), deletes=(), connections=()):
+        """
+        Apply ``(key, member, seen, ttl)`` connection heartbeats, ``(key,
+        value, ttl)`` sets and deletes atomically in one round trip
+        """
+        async with self.client.pipeline(transaction=True) as pipe:
+            for key, member, seen, ttl in connections:
+                pipe.zadd(key, {member: seen})
+                pipe.expire(key, ttl)
+            for key, value, ttl in sets:
+                pipe.set(key, value, ex=ttl)
+            if deletes:
+                pipe.delete(*deletes)
+            await pipe.execute()
+
+    async def mget(self, keys):
+        if not keys:
+            return []
+        return await self.client.mget(keys)
+
+    async def remove_connection(self, key, member, now, ttl, online_key):
+        return await self.client.eval(self.REMOVE_CONNECTION, 2, key, online_key, member, now, ttl)
+
+
+def _build_backend():
+    if getattr(settings, 'PRESENCE_BACKEND', 'redis') == 'local':
+        return LocalPresenceBackend()
+    return RedisPresenceBackend(settings.REDIS_URL)
+
+
+class PresenceService:
+    """
+    Online/last-seen state for chat users, kept only in Redis.
+
+    Connected consumers call ``heartbeat`` on connect and on every client
+    heartbeat, and ``go_offline`` on disconnect, passing their channel name.
+    Each user's live connections are kept in ``presence:connections``, so a
+    user with several sockets (tabs, or a chat socket plus the realtime one)
+    stays online until the last one closes. The ``presence:online`` key
+    expires ``PRESENCE_TTL`` seconds after the last heartbeat, so crashed
+    sockets go offline by themselves. Nothing here touches the database.
+    """
+    ONLINE_KEY = 'presence:online:{}'
+    CONNECTIONS_KEY = 'presence:connections:{}'
+    LAST_SEEN_KEY = 'presence:last_seen:{}'
+    LAST_SEEN_TTL = 60 * 60 * 24 * 30
+
+    backend = None
+
+    @staticmethod
+    def get_backend():
+        if PresenceService.backend is None:
+            PresenceService.backend = _build_backend()
+        return PresenceService.backend
+
+    @staticmethod
+    def ttl():
+        return getattr(settings, 'PRESENCE_TTL', 60)
+
+    @staticmethod
+    async def heartbeat(user_id, connection):
+        now = int(time.time())
+        await PresenceService.get_backend().write(
+            connections=[(PresenceService.CONNECTIONS_KEY.format(user_id), connection, now, PresenceService.ttl())],
+            sets=[
+                (PresenceService.ONLINE_KEY.format(user_id), now, PresenceService.ttl()),
+                (PresenceService.LAST_SEEN_KEY.format(user_id), now, PresenceService.LAST_SEEN_TTL),
+            ],
+        )
+
+    @staticmethod
+    async def go_offline(user_id, connection):
+        """Drop ``connection``; the user goes offline once it was their last one"""
+        now = int(time.time())
+        backend = PresenceService.get_backend()
+        await backend.remove_connection(
+            PresenceService.CONNECTIONS_KEY.format(user_id), connection, now, PresenceService.ttl(),
+            PresenceService.ONLINE_KEY.format(user_id),
+        )
+        await backend.write(
+            sets=[(PresenceService.LAST_SEEN_KEY.format(user_id), now, PresenceService.LAST_SEEN_TTL)],
+        )
+
+    @staticmethod
+    async def get_presence(user_ids):
+        """Return ``{user_id: {'online': bool, 'last_seen': int|None}}`` with one MGET"""
+        user_ids = list(dict.fromkeys(user_ids))
+        keys = [PresenceService.ONLINE_KEY.format(uid) for uid in user_ids]
+        keys += [PresenceService.LAST_SEEN_KEY.format(uid) for uid in user_ids]
+        values = await PresenceService.get_backend().mget(keys)
+
+        online, last_seen = values[:len(user_ids)], values[len(user_ids):]
+        return {
+            uid: {
+                'online': online[i] is not None,
+                'last_seen': int(last_seen[i]) if last_seen[i] is not None else None,
+            }
+            for i, uid in enumerate(user_ids)
+        }
@@ -12,6 +12,8 @@ from rest_framework.parsers import MultiPartParser, FormParser
 from django.contrib.auth import get_user_model
 from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
+from .services.message_search_service import MessageSearchService
+from .services.message_event_service import MessageEventService
 
 User = get_user_model()
 
@@ -65,6 +67,24 @@ class MessageViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         return Message.objects.filter(conversation__participants__user=self.request.user)
 
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """Search message content across the user's conversations"""
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({'error': 'Search query is required'}, status=400)
+        try:
+            results = MessageSearchService.search(
+                request.user,
+                query,
+                cursor=request.query_params.get('cursor'),
+                limit=request.query_params.get('limit'),
+                conversation_id=request.query_params.get('conversation_id'),
+            )
+        except ValueError:
+            return Response({'error': 'Invalid cursor, limit or conversation_id'}, status=400)
+        return Response(results)
+
     @action(detail=True, methods=['post'])
     def pin(self, request, pk=None):
         # Pin logic here
@@ -106,31 +126,12 @@ class MessageViewSet(viewsets.ModelViewSet):
             reply_to=reply_to,
         )
 
-        # Broadcast via WebSocket
-        channel_layer = get_channel_layer()
-        async_to_sync(channel_layer.group_send)(
-            f"chat_{conversation_id}",
-            {
-                "type": "file_uploaded",
-                "file_url": request.build_absolute_uri(message.file.url),
-                "message_id": message.id,
-                "temp_id": temp_id,
-                "sender_id": request.user.id,
-                "conversation_id": conversation_id,
-                "name": file.name,
-                "reply_to": {
-                    "id": reply_to.id if reply_to else None,
-                    "content": reply_to.content if reply_to else None,
-                    "sender": {
-                        "id": reply_to.sender.id if reply_to else None,
-                        "username": reply_to.sender.username if reply_to else None,
-                    },
-                } if reply_to else None,
-            }
-        )
+        # Broadcast via WebSocket once the message is committed
+        file_url = request.build_absolute_uri(message.file.url)
+        MessageEventService.message_created(message, temp_id=temp_id, file_url=file_url, file_name=file.name)
 
         return Response({
-            'file_url': request.build_absolute_uri(message.file.url),
+            'file_url': file_url,
             'message_id': message.id,
             'temp_id': temp_id,
             'name': file.name,
@@ -157,6 +158,7 @@ class MessageViewSet(viewsets.ModelViewSet):
             f"chat_{message.conversation.id}",
             {
                 "type": "message_deleted",
+                "conversation_id": message.conversation_id,
                 "message_id": message.id,
                 "deleted_for_everyone": True,
             }
@@ -180,6 +182,7 @@ def create_conversation_and_send_message(request):
         ConversationParticipant.objects.create(conversation=conv, user=user1)
         ConversationParticipant.objects.create(conversation=conv, user_id=user2_id)
     msg = Message.objects.create(conversation=conv, sender=user1, content=text)
+    MessageEventService.message_created(msg)
     return Response({
         'conversation': ConversationSerializer(conv).data,
         'message': MessageSerializer(msg).data
@@ -1,7 +1,7 @@
 from django.shortcuts import render,get_object_or_404
 # Create your views here.
 from .serializers import EventSerializer,ActivitySerializer
-from core.serializers import ProjectSerializer,TaskSerializer,SpendingDistributionByProjectSerializer,ProjectResponseSerializer,TaskResponseSerializer
+from core.serializers import ProjectSerializer,TaskSerializer,SpendingDistributionByProjectSerializer,ProjectResponseSerializer,TaskResponseSerializer,ProjectSpendingSerializer
 from .models import Event,Activity
 from core.models import Project,Task,Payment
 from rest_framework.permissions import IsAuthenticated,AllowAny
@@ -16,6 +16,7 @@ from django.db.models import Sum
 from django.db.models.functions import TruncMonth, TruncWeek, TruncYear,ExtractWeekDay
 import calendar
 from datetime import timedelta
+from financeapp.services.rollup_service import RollupService
 from collaborations.models import *
 from collaborations.serializers import *
 from collections import defaultdict
@@ -465,13 +466,14 @@ class SpendingDataView(APIView):
         return Response(data)
     
 class SpendingDistributionByProject(generics.ListAPIView):
+    """The user's total spending per project, largest first, from the project rollups"""
     permission_classes = [IsAuthenticated]
-    serializer_class = SpendingDistributionByProjectSerializer
+    serializer_class = ProjectSpendingSerializer
     pagination_class = PageNumberPagination
 
     def get_queryset(self):
         user = self.request.user
-        return Payment.objects.filter(from_user=user).order_by('-payment_date')
+        return RollupService.by_project(user, 'debits')
 
     def list(self, request, *args, **kwargs):
         queryset = self.get_queryset()
@@ -521,86 +523,30 @@ class CollaborationView(APIView):
 
 
 def get_spending_data(user, time_frame='monthly'):
-    if time_frame == 'weekly':
-        start_of_week = timezone.now() - timezone.timedelta(days=timezone.now().weekday())
-        payments = Payment.objects.filter(from_user=user, payment_date__gte=start_of_week)
-
-        spending_data = (
-            payments.annotate(weekday=ExtractWeekDay('payment_date'))
-                    .values('weekday')
-                    .annotate(total_spent=Sum('amount')) 
-                    .order_by('weekday')
-        )
+    """Chart data of the user's spending, read from the daily spending rollups"""
+    today = timezone.localdate()
 
+    if time_frame == 'weekly':
         labels = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-
-        chart_data = {
-            'labels': labels,
-            'datasets': [
-                {
-                    'label': 'Spend Over Time',
-                    'data': [0] * 7, 
-                    'borderColor': 'rgba(75,192,192,1)',
-                    'fill': False,
-                },
-            ],
-        }
-
-        for entry in spending_data:
-            day_index = entry['weekday'] - 1
-            chart_data['datasets'][0]['data'][day_index] = entry['total_spent'] or 0
-
-        weekly = chart_data
-
-        return weekly
+        data = [0] * 7
+        start_of_week = today - timedelta(days=today.weekday())
+        for day, total, _ in RollupService.totals(user, 'debits', start=start_of_week):
+            data[day.weekday()] = total
 
     elif time_frame == 'monthly':
-        payments = Payment.objects.filter(from_user=user)
-
-        spending_data = (
-            payments.annotate(month=TruncMonth('payment_date'))
-                    .values('month')
-                    .annotate(total_spent=Sum('amount'))
-                    .order_by('month')
-        )
-
-        months = [calendar.month_name[i] for i in range(1, 13)]
-
-        chart_data = {
-            'labels': months,
-            'datasets': [
-                {
-                    'label': 'Spend Over Time',
-                    'data': [0] * 12, 
-                    'borderColor': 'rgba(75,192,192,1)',
-                    'fill': False,
-                },
-            ],
-        }
-
-        for entry in spending_data:
-            month_name = entry['month'].strftime('%B')
-            month_index = months.index(month_name)
-            chart_data['datasets'][0]['data'][month_index] = entry['total_spent'] or 0
-
-        monthly = chart_data
-
-        return monthly
-
+        # The last twelve months, one per month name
+        labels = [calendar.month_name[i] for i in range(1, 13)]
+        data = [0] * 12
+        start = today.replace(day=1)
+        start = start.replace(month=1) if start.month == 12 else start.replace(year=start.year - 1, month=start.month + 1)
+        for month, total, _ in RollupService.totals(user, 'debits', start=start, period='month'):
+            data[month.month - 1] = total
 
     elif time_frame == 'yearly':
-        payments = Payment.objects.filter(from_user=user)
-
-        spending_data = (
-            payments.annotate(year=TruncYear('payment_date')) 
-                    .values('year')
-                    .annotate(total_spent=Sum('amount'))  # Sum the payment amounts for each year
-                    .order_by('year')
-        )
-        # Extract the starting year and the current year as integers
-        start_year = min([entry['year'].year for entry in spending_data])  # Extract year from datetime
-        current_year = timezone.now().year  # Get the current year
-        labels = [str(year) for year in range(start_year, current_year + 1)]  # Use year range
+        totals = {year.year: total for year, total, _ in RollupService.totals(user, 'debits', period='year')}
+        start_year = min(totals, default=today.year)
+        labels = [str(year) for year in range(start_year, today.year + 1)]
+        data = [totals.get(year, 0) for year in range(start_year, today.year + 1)]
 
     else:
         return {'error': 'Invalid time frame. Choose from "weekly", "monthly", or "yearly."'}
@@ -610,7 +556,7 @@ def get_spending_data(user, time_frame='monthly'):
         'datasets': [
             {
                 'label': 'Spend Over Time',
-                'data': [entry['total_spent'] or 0 for entry in spending_data],
+                'data': data,
                 'borderColor': 'rgba(75,192,192,1)',
                 'fill': False,
             },
@@ -3,9 +3,8 @@ from channels.generic.websocket import AsyncWebsocketConsumer
 import json
 from channels.db import database_sync_to_async
 from core.models import Notification, User
+from core.services.notification_counter_service import NotificationCounterService
 from asgiref.sync import async_to_sync
-from rest_framework_simplejwt.tokens import AccessToken
-from urllib.parse import parse_qs
 from django.core.paginator import Paginator
 from django.core.cache import cache
 from Profile.models import ClientProfile, FreelancerProfile  # Ensure correct import
@@ -13,19 +12,23 @@ from core.serializers import ProjectSerializer, CategorySerializer
 
 class NotificationConsumer(AsyncWebsocketConsumer):
     async def connect(self):
-        # Extract the user from the token
-        token = self.scope['query_string'].decode().split('=')[-1]  # Assuming token is passed via query params
-        user_id = await self.get_user_from_token(token)  # Get user based on the token
+        # The user is resolved once per connection by JWTAuthMiddleware
+        self.user = self.scope['user']
 
-        if user_id:
-            self.user = await database_sync_to_async(User.objects.get)(id=user_id)
+        if self.user.is_authenticated:
             self.group_name = f"user_{self.user.id}"
+            # Bulk notifications carry the new count on the notification group
+            self.batch_group_name = f"user_notification_{self.user.id}"
 
-            # Join the user to their group
+            # Join the user to their groups
             await self.channel_layer.group_add(
                 self.group_name,
                 self.channel_name
             )
+            await self.channel_layer.group_add(
+                self.batch_group_name,
+                self.channel_name
+            )
             await self.accept()
 
             # Send initial notification count
@@ -43,11 +46,25 @@ class NotificationConsumer(AsyncWebsocketConsumer):
                 self.group_name,
                 self.channel_name
             )
+            await self.channel_layer.group_discard(
+                self.batch_group_name,
+                self.channel_name
+            )
 
     async def receive(self, text_data):
         # Handle incoming messages (if needed, like marking notifications as read)
         pass
 
+    async def send_notification(self, event):
+        # Single notifications are shown by NotificationShowConsumer; the count
+        # arrives separately as send_notification_count
+        pass
+
+    async def notification_batch(self, event):
+        await self.send(text_data=json.dumps({
+            'notifications_count': event['notifications_count']
+        }))
+
     async def send_notification_count(self, event):
         
         if 'notifications_count' in event:
@@ -59,47 +76,31 @@ class NotificationConsumer(AsyncWebsocketConsumer):
 
     @database_sync_to_async
     def get_unread_notification_count(self, user):
-        return Notification.objects.filter(user=user, is_read=False).count()
-
-    @database_sync_to_async
-    def get_user_from_token(self, token):
-        from rest_framework_simplejwt.tokens import AccessToken
-        try:
-            decoded_token = AccessToken(token)
-            return decoded_token['user_id']
-        except Exception:
-            return None
+        return NotificationCounterService.get_total(user.id)
 
 
 class NotificationShowConsumer(AsyncWebsocketConsumer):
     async def connect(self):
-        # Extract the user from the token
-        query_string = parse_qs(self.scope['query_string'].decode())
-        token = query_string.get('token', [None])[0]  # Extract token safely
-
-        if token:
-            user_id = await self.get_user_from_token(token)
-
-            if user_id:
-                self.user = await database_sync_to_async(User.objects.get)(id=user_id)
-                self.group_name = f"user_notification_{self.user.id}"
-
-                # Join the user to their group
-                await self.channel_layer.group_add(
-                    self.group_name,
-                    self.channel_name
-                )
-                await self.accept()
-
-                # Send initial notifications only once
-                notifications = await self.get_user_notification(self.user)
-                if notifications:  # If there are notifications to send
-                    # Send only the first notification (or none if no notifications)
-                    await self.send(text_data=json.dumps({
-                        "notifications": [notifications[0]]  # Send just one notification
-                    }))
-            else:
-                await self.close()
+        # The user is resolved once per connection by JWTAuthMiddleware
+        self.user = self.scope['user']
+
+        if self.user.is_authenticated:
+            self.group_name = f"user_notification_{self.user.id}"
+
+            # Join the user to their group
+            await self.channel_layer.group_add(
+                self.group_name,
+                self.channel_name
+            )
+            await self.accept()
+
+            # Send initial notifications only once
+            notifications = await self.get_user_notification(self.user)
+            if notifications:  # If there are notifications to send
+                # Send only the first notification (or none if no notifications)
+                await self.send(text_data=json.dumps({
+                    "notifications": [notifications[0]]  # Send just one notification
+                }))
         else:
             await self.close()
 
@@ -128,6 +129,11 @@ class NotificationShowConsumer(AsyncWebsocketConsumer):
                 'type': notification['type']
             }))
 
+    async def notification_batch(self, event):
+        """Send each notification of a bulk fan-out (NotificationService.send_many)."""
+        for notification in event['notifications']:
+            await self.send_notification({'notification': notification})
+
     @database_sync_to_async
     def get_user_notification(self, user):
         """Fetch the unread notifications for the user."""
@@ -140,12 +146,3 @@ class NotificationShowConsumer(AsyncWebsocketConsumer):
             "type": notification.type
         } for notification in notifications]
 
-    @database_sync_to_async
-    def get_user_from_token(self, token):
-        """Extract user ID from JWT token."""
-        try:
-            decoded_token = AccessToken(token)
-            return decoded_token['user_id']
-        except Exception:
-            return None
-
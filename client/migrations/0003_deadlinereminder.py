@@ -0,0 +1,55 @@
+# Generated by Django 5.2.3 on 2026-10-19 05:12
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def seed_sent_reminders(apps, schema_editor):
+    """
+    Record reminders already sent as notifications, so the first run of the
+    set-based sweep does not repeat them for deadlines still in the future.
+    """
+    Notification = apps.get_model('core', 'Notification')
+    DeadlineReminder = apps.get_model('client', 'DeadlineReminder')
+
+    kinds = {'Projects': 'project', 'Projects & Tasks': 'task'}
+    sent = (
+        Notification.objects
+        .filter(type__in=kinds, related_model_id__isnull=False)
+        .values_list('user_id', 'type', 'related_model_id')
+        .distinct()
+        .iterator(chunk_size=5000)
+    )
+    batch = []
+    for user_id, notification_type, object_id in sent:
+        batch.append(DeadlineReminder(user_id=user_id, kind=kinds[notification_type], object_id=object_id))
+        if len(batch) >= 5000:
+            DeadlineReminder.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    DeadlineReminder.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client', '0002_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeadlineReminder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('project', 'Project deadline'), ('task', 'Task deadline')], max_length=20)),
+                ('object_id', models.PositiveIntegerField()),
+                ('sent_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deadline_reminders', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'kind', 'object_id')},
+            },
+        ),
+        migrations.RunPython(seed_sent_reminders, migrations.RunPython.noop),
+    ]
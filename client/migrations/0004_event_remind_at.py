@@ -0,0 +1,43 @@
+# Generated by Django 5.2.3 on 2026-10-19 05:13
+
+import datetime
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_remind_at(apps, schema_editor):
+    """Compute remind_at for the reminders that have not been sent yet"""
+    Event = apps.get_model('client', 'Event')
+    pending = Event.objects.filter(notification_sent=False, start__isnull=False).only('id', 'start', 'notification_time')
+    batch = []
+    for event in pending.iterator(chunk_size=2000):
+        start = timezone.make_aware(datetime.datetime.combine(event.start, datetime.time.min))
+        event.remind_at = start - datetime.timedelta(minutes=event.notification_time)
+        batch.append(event)
+        if len(batch) >= 2000:
+            Event.objects.bulk_update(batch, ['remind_at'])
+            batch = []
+    Event.objects.bulk_update(batch, ['remind_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client', '0003_deadlinereminder'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='remind_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['notification_sent', 'remind_at'], name='client_even_notific_4f983d_idx'),
+        ),
+        migrations.RunPython(backfill_remind_at, migrations.RunPython.noop),
+    ]
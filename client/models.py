@@ -1,4 +1,7 @@
+import datetime
+
 from django.db import models
+from django.utils import timezone
 from core.models import User
 # Create your models here.
 
@@ -21,12 +24,50 @@ class Event(models.Model):
         help_text="Notification time in minutes before the event."
     )
     notification_sent = models.BooleanField(default=False)
+    # start (at midnight) minus notification_time, maintained in save() so the
+    # reminder job only has to read the reminders that are due
+    remind_at = models.DateTimeField(null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['notification_sent', 'remind_at']),
+        ]
+
     def __str__(self):
         return f"{self.title} - {self.user.username}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_remind_at = instance.__dict__.get('remind_at')
+        return instance
+
+    def compute_remind_at(self):
+        if self.start is None:
+            return None
+        start = self.start
+        if not isinstance(start, datetime.datetime):
+            start = timezone.make_aware(datetime.datetime.combine(start, datetime.time.min))
+        return start - datetime.timedelta(minutes=self.notification_time)
+
+    def save(self, *args, **kwargs):
+        self.remind_at = self.compute_remind_at()
+        # Moving the reminder into the future (new start or notification time)
+        # re-arms it, so an edited event is reminded again
+        if (
+            self.pk and self.remind_at != getattr(self, '_loaded_remind_at', self.remind_at)
+            and self.remind_at is not None and self.remind_at > timezone.now()
+        ):
+            self.notification_sent = False
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {'remind_at', 'notification_sent'}
+        super().save(*args, **kwargs)
+        self._loaded_remind_at = self.remind_at
+
 
 class Activity(models.Model):
     ACTIVITY_TYPES = [
@@ -67,3 +108,27 @@ class Activity(models.Model):
         return self.description
     
     
+
+
+class DeadlineReminder(models.Model):
+    """
+    One row per reminder already sent, keyed by (user, kind, object_id).
+    The deadline sweep anti-joins against this table instead of probing the
+    notifications table, and the unique index keeps overlapping runs from
+    sending the same reminder twice.
+    """
+    KIND_CHOICES = [
+        ('project', 'Project deadline'),
+        ('task', 'Task deadline'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='deadline_reminders')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.PositiveIntegerField()
+    sent_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('user', 'kind', 'object_id')
+
+    def __str__(self):
+        return f"{self.user_id} - {self.kind} #{self.object_id}"
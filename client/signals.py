@@ -4,9 +4,13 @@ from django.dispatch import receiver
 from django.utils.timezone import now
 from datetime import timedelta
 from core.models import Project, Task, Notification, Invitation
+from core.services.notification_service import NotificationService
 from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
 import json
+import logging
+
+logger = logging.getLogger(__name__)
 
 @receiver(post_save, sender=Project)
 def notify_project_deadline(sender, instance, created, **kwargs):
@@ -43,15 +47,15 @@ def notify_task_deadline(sender, instance, created, **kwargs):
                 notification_text = f"Your task '{instance.title}' deadline is approaching! Only {days_left} day(s) left!"
                 
                 # Check if assigned_to field has users
-                if instance.assigned_to.exists():
-                    for user in instance.assigned_to.all():
-                        print(f"Notifying user {user.username} about task deadline.")  # Debugging output
-                        Notification.objects.create(
-                            user=user,
-                            type="Projects & Tasks",
-                            related_model_id=instance.id,
-                            notification_text=notification_text
-                        )
+                assigned_ids = list(instance.assigned_to.values_list('id', flat=True))
+                if assigned_ids:
+                    logger.info(f"Notifying {len(assigned_ids)} assigned user(s) about task deadline.")
+                    NotificationService.send_many(
+                        assigned_ids,
+                        type="Projects & Tasks",
+                        related_model_id=instance.id,
+                        notification_text=notification_text
+                    )
                 
                 Notification.objects.create(
                         user=instance.project.client,
@@ -65,55 +69,43 @@ from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from channels.layers import get_channel_layer
 from core.models import Notification
+from core.services.notification_counter_service import NotificationCounterService
 from asgiref.sync import async_to_sync
 
 def update_unread_notification_count(user):
     """Helper function to get the unread notification count."""
-    return Notification.objects.filter(user=user, is_read=False).count()
+    return NotificationCounterService.get_total(user.id)
 
 # Triggered when a Notification is created or updated (post_save)
 @receiver(post_save, sender=Notification)
 def notify_count_user_on_new_notification(sender, instance, created, **kwargs):
-    """Send real-time notification when a new Notification object is created."""
-    user = instance.user
-    channel_layer = get_channel_layer()
-
-    # Get unread notification count
-    unread_count = update_unread_notification_count(user)
-
-    group_name = f"user_{user.id}"
-
-    # Send the message to the group
-    async_to_sync(channel_layer.group_send)(
-        group_name, 
-        {
-            "type": "send_notification_count",
-            "notifications_count": unread_count
-        }
-    )
+    """Adjust the user's unread counters and push the badge when the read state changes."""
+    unread = 0 if instance.is_read else 1
+    if created:
+        delta = unread
+    else:
+        loaded_is_read = getattr(instance, '_loaded_is_read', None)
+        if loaded_is_read is None:
+            # Not loaded from the database, so the previous state is unknown
+            NotificationCounterService.rebuild(instance.user_id)
+            NotificationCounterService.push_count(instance.user_id)
+            instance._loaded_is_read = instance.is_read
+            return
+        delta = unread - (0 if loaded_is_read else 1)
+    instance._loaded_is_read = instance.is_read
+
+    if delta:
+        NotificationCounterService.notification_changed(instance, delta)
 
 # Triggered when a Notification is deleted (post_delete)
 @receiver(post_delete, sender=Notification)
 def notify_count_user_on_deleted_notification(sender, instance, **kwargs):
-    """Send real-time notification when a Notification object is deleted."""
-    user = instance.user
-    channel_layer = get_channel_layer()
-
-    # Get unread notification count
-    unread_count = update_unread_notification_count(user)
-
-    group_name = f"user_{user.id}"
-
-    print(unread_count)
-
-    # Send the updated unread count to the group
-    async_to_sync(channel_layer.group_send)(
-        group_name, 
-        {
-            "type": "send_notification_count",
-            "notifications_count": unread_count
-        }
-    )
+    """Decrement the unread counters when an unread Notification is deleted."""
+    is_read = getattr(instance, '_loaded_is_read', None)
+    if is_read is None:
+        is_read = instance.is_read
+    if not is_read:
+        NotificationCounterService.notification_changed(instance, -1)
 
 @receiver(post_save, sender=Notification)
 def send_notification_to_user(sender, instance, created, **kwargs):
@@ -1,8 +1,12 @@
 from celery import shared_task
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, OuterRef, Value
 from django.utils.timezone import now
 from datetime import timedelta,datetime
-from .models import Event
+from itertools import chain
+from .models import Event, DeadlineReminder
 from core.models import Project,Notification,Task
+from core.services.notification_service import NotificationService
 from django.utils import timezone
 
 
@@ -11,75 +15,79 @@ def check_deadlines():
     """
     Celery task to check for approaching deadlines (within 2 days) for projects and tasks
     and send notifications to clients and assigned users.
+
+    Each reminder is identified by a (user, kind, object) key. The keys still
+    to send are computed with one query per source, anti-joined against
+    DeadlineReminder in SQL, and the missing reminders and notifications are
+    written with bulk_create in a single transaction.
     """
     today = now().date()
-
-    # Get projects with deadlines within the next 2 days
-    projects = Project.objects.filter(
-        deadline__gte=today,  # Deadline is today or in the future
-        deadline__lte=today + timedelta(days=2),  # Deadline within 2 days
-        status="pending"
+    window = {
+        'deadline__gte': today,  # Deadline is today or in the future
+        'deadline__lte': today + timedelta(days=2),  # Deadline within 2 days
+        'status': "pending",
+    }
+
+    def not_sent(kind, user_field, object_field):
+        return ~Exists(DeadlineReminder.objects.filter(
+            kind=kind, user_id=OuterRef(user_field), object_id=OuterRef(object_field)
+        ))
+
+    # (user_id, kind, object_id, title, deadline) for every reminder not sent yet
+    project_keys = (
+        Project.objects.filter(**window)
+        .filter(not_sent('project', 'client_id', 'id'))
+        .values_list('client_id', Value('project'), 'id', 'title', 'deadline')
     )
-
-    # Notify project clients about the upcoming project deadlines
-    for project in projects:
-        days_left = (project.deadline - today).days
-        notification_text = f"Your project '{project.title}' deadline is near! Due in {days_left} day(s)."
-        
-        # Avoid duplicate notifications for the same project client
-        if not Notification.objects.filter(
-            user=project.client,
-            type="Projects",
-            related_model_id=project.id
-        ).exists():
-            Notification.objects.create(
-                user=project.client,
-                type="Projects",
-                related_model_id=project.id,
-                notification_text=notification_text
-            )
-
-    # Get tasks with deadlines within the next 2 days
-    tasks = Task.objects.filter(
-        deadline__gte=today,  # Task deadline is today or in the future
-        deadline__lte=today + timedelta(days=2),  # Deadline within 2 days
-        status="pending"
+    assignee_keys = (
+        Task.assigned_to.through.objects
+        .filter(**{f"task__{field}": value for field, value in window.items()})
+        .filter(not_sent('task', 'user_id', 'task_id'))
+        .values_list('user_id', Value('task'), 'task_id', 'task__title', 'task__deadline')
+    )
+    task_client_keys = (
+        Task.objects.filter(**window)
+        .filter(not_sent('task', 'project__client_id', 'id'))
+        .values_list('project__client_id', Value('task'), 'id', 'title', 'deadline')
     )
 
-    # Notify assigned users about the upcoming task deadlines
-    for task in tasks:
-        days_left = (task.deadline - today).days
-        notification_text = f"Your task '{task.title}' deadline is near! Due in {days_left} day(s)."
-        
-        # Create notifications for each assigned user (avoid duplicates)
-        for user in task.assigned_to.all():
-            if not Notification.objects.filter(
-                user=user,
-                type="Projects & Tasks",
-                related_model_id=task.id
-            ).exists():
-                Notification.objects.create(
-                    user=user,
-                    type="Projects & Tasks",
-                    related_model_id=task.id,
-                    notification_text=notification_text
-                )
+    due = {}
+    for user_id, kind, object_id, title, deadline in chain(project_keys, assignee_keys, task_client_keys):
+        due.setdefault((user_id, kind, object_id), (title, deadline))
+
+    if not due:
+        return "Checked deadlines: no new reminders."
+
+    reminders = []
+    notifications = []
+    for (user_id, kind, object_id), (title, deadline) in due.items():
+        days_left = (deadline - today).days
+        if kind == 'project':
+            notification_type = "Projects"
+            notification_text = f"Your project '{title}' deadline is near! Due in {days_left} day(s)."
+        else:
+            notification_type = "Projects & Tasks"
+            notification_text = f"Your task '{title}' deadline is near! Due in {days_left} day(s)."
+        reminders.append(DeadlineReminder(user_id=user_id, kind=kind, object_id=object_id))
+        notifications.append(Notification(
+            user_id=user_id,
+            type=notification_type,
+            related_model_id=object_id,
+            notification_text=notification_text,
+        ))
 
-        # Also notify the project client about the task deadline
-        if not Notification.objects.filter(
-            user=task.project.client,
-            type="Projects & Tasks",
-            related_model_id=task.id
-        ).exists():
-            Notification.objects.create(
-                user=task.project.client,
-                type="Projects & Tasks",
-                related_model_id=task.id,
-                notification_text=notification_text
-            )
-
-    # Return a log of how many projects and tasks were processed
-    return f"Checked deadlines for {projects.count()} projects and {tasks.count()} tasks."
+    try:
+        with transaction.atomic():
+            # The unique index makes an overlapping run fail here instead of
+            # sending the same reminders twice.
+            DeadlineReminder.objects.bulk_create(reminders)
+            NotificationService.create_many(notifications)
+    except IntegrityError:
+        logger.warning("Deadline reminders were sent concurrently by another run; skipping this one.")
+        return "Checked deadlines: skipped, another run sent the reminders."
+
+    # Return a log of how many reminders were sent
+    return f"Checked deadlines: sent {len(notifications)} reminder(s)."
 
 import logging
 logger = logging.getLogger(__name__)
@@ -105,55 +113,61 @@ def format_notification_time(notification_time):
         return f"{notification_time} minutes"
 
 @shared_task
-def send_event_approaching_notification():
+def send_event_approaching_notification(batch_size=500):
+    """
+    Send the event reminders that are due.
+
+    Event.remind_at is maintained on save, so each run reads only the due,
+    unsent reminders through the (notification_sent, remind_at) index, in
+    batches of ``batch_size``. Rows are claimed with SKIP LOCKED and marked sent
+    in the same transaction as their notifications, so overlapping runs never
+    send a reminder twice.
+    """
     try:
-        events = Event.objects.filter(notification_sent=False)
-        logger.info(f"Found {events.count()} events to check.")
-        for event in events:
-            logger.info(f"Processing event {event.id}...")
-
-            # Handle DateField and convert to timezone-aware datetime if needed
-            if isinstance(event.start, datetime.date) and not isinstance(event.start, datetime.datetime):
-                # Combine the date with a default time (e.g., midnight) and make it timezone-aware
-                event.start = timezone.make_aware(datetime.datetime.combine(event.start, datetime.time.min))
-
-            notification_time = event.notification_time
-            event_time = event.start
-            notification_time_delta = timedelta(minutes=notification_time)
-
-            notification_send_time = event_time - notification_time_delta
-
-            logger.info(f"Notification should be sent at: {notification_send_time}")
-            logger.info(f"Current time is: {timezone.now()}")
-            
-            if timezone.now() >= notification_send_time and not event.notification_sent:
-                # Format the notification time
-                formatted_notification_time = format_notification_time(notification_time)
-
-                # Format the event start date as yyyy-mm-dd
-                formatted_event_start = event.start.strftime('%Y-%m-%d')
-
-                # Create notification with HTML and CSS
-                notification_text = f"""
+        sent = 0
+        while True:
+            with transaction.atomic():
+                events = list(
+                    Event.objects
+                    .filter(notification_sent=False, remind_at__lte=timezone.now())
+                    .order_by('remind_at')
+                    .select_for_update(skip_locked=True)
+                    .only('id', 'user_id', 'title', 'start', 'notification_time')[:batch_size]
+                )
+                if not events:
+                    break
+
+                notifications = []
+                for event in events:
+                    # Format the notification time
+                    formatted_notification_time = format_notification_time(event.notification_time)
+
+                    # Format the event start date as yyyy-mm-dd
+                    formatted_event_start = event.start.strftime('%Y-%m-%d')
+
+                    # Create notification with HTML and CSS
+                    notification_text = f"""
                 <span class="event-title" style="font-weight: bold; text-decoration: none;" onmouseover="this.style.textDecoration='underline'" onmouseout="this.style.textDecoration='none'">
                     {event.title}
                 </span> is scheduled for <span>{formatted_event_start}</span>. This is a reminder {formatted_notification_time} before the event.
                 """
 
-                Notification.objects.create(
-                    user=event.user,  # Use the correct user field if necessary
-                    type="Events",
-                    related_model_id=event.id,
-                    notification_text=notification_text
-                )
-
-                event.notification_sent = True
-                event.save()
-
-                logger.info(f"Notification sent for event {event.id}.")
-            else:
-                logger.info(f"Event {event.id} notification is not ready yet.")
-        return 'Checked and scheduled notifications for future events.'
+                    if event.user_id:
+                        notifications.append(Notification(
+                            user_id=event.user_id,  # Use the correct user field if necessary
+                            type="Events",
+                            related_model_id=event.id,
+                            notification_text=notification_text
+                        ))
+
+                NotificationService.create_many(notifications)
+                Event.objects.filter(id__in=[event.id for event in events]).update(notification_sent=True)
+
+            sent += len(events)
+            logger.info(f"Sent {len(events)} event reminder(s).")
+            if len(events) < batch_size:
+                break
+        return f'Sent {sent} event reminder(s).'
     except Exception as e:
         logger.error(f"Error occurred: {e}")
         raise e
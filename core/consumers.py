@@ -1,26 +1,102 @@
+import asyncio
 import json
-import jwt  # For decoding JWT
+from collections import deque
 from django.conf import settings
 from channels.generic.websocket import AsyncWebsocketConsumer
 from asgiref.sync import sync_to_async
 from django.contrib.auth import get_user_model
-from django.db.models import Q
-from django.core.cache import cache
-from core.models import User, Project, Category
-from Profile.models import ClientProfile,FreelancerProfile
-from core.serializers import ProjectSerializer, CategorySerializer
-from django.core.serializers import serialize
+from core.models import User, Notification
+from freelancer_hub.middleware import authenticate_token
+from core.services.notification_counter_service import NotificationCounterService
+from core.services.autocomplete_service import AutocompleteService
+from core.services.search_service import SearchService
+from chat.consumers import ChatActionsMixin
+from chat.services.presence_service import PresenceService
 
 
 User = get_user_model()
 
-class SearchConsumer(AsyncWebsocketConsumer):
+class SearchMixin:
+    """
+    Search-as-you-type results for ``self.user``. Used by SearchConsumer and
+    by the search channel of RealtimeConsumer, which implement
+    ``send_search_results()`` and ``send_search_error()``.
+
+    Each query runs in its own task; a new query cancels the one still in
+    flight on the socket, so only the latest query's results are sent.
+    """
+    search_task = None
+
+    def start_search(self, query, ref=None):
+        self.cancel_search()
+        self.search_task = asyncio.create_task(self.answer(query, ref))
+
+    def cancel_search(self):
+        if self.search_task and not self.search_task.done():
+            self.search_task.cancel()
+        self.search_task = None
+
+    async def answer(self, query, ref=None):
+        try:
+            results = await self.search_results(query)
+            await self.send_search_results(query, results, ref)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Error in {type(self).__name__}: {str(e)}")
+            await self.send_search_error(ref)
+
+    async def send_search_results(self, query, results, ref=None):
+        raise NotImplementedError
+
+    async def send_search_error(self, ref=None):
+        raise NotImplementedError
+
+    async def search_results(self, query):
+        await AutocompleteService.ensure_fresh()
+
+        if AutocompleteService.handles(query):
+            results = AutocompleteService.lookup(query, user=self.user)
+            users, projects, categories = results['user'], results['project'], results['category']
+        else:
+            # A keystroke within the debounce cancels the caller's task
+            # before it reaches the database
+            await asyncio.sleep(AutocompleteService.get_settings()['debounce_seconds'])
+            users, projects, categories = await self.perform_search(query)
+        skills = AutocompleteService.lookup(query, entity_types=['skill'])['skill']
+        return {"users": users, "projects": projects, "categories": categories, "skills": skills}
+
+    @sync_to_async
+    def perform_search(self, query):
+        """Search the index for the authenticated user; projects are limited to their own"""
+        if not self.user:
+            return [], [], []  # Return empty results if not authenticated
+
+        results = SearchService.search(query, scope='mine', user=self.user)
+        return (
+            results['user']['results'],
+            results['project']['results'],
+            results['category']['results'],
+        )
+
+
+class SearchConsumer(SearchMixin, AsyncWebsocketConsumer):
+    """
+    Search-as-you-type. Short queries are answered from the in-process
+    AutocompleteService; longer ones go to the full-text SearchService after a
+    short debounce. Each new query cancels the one still in flight on this
+    connection, so only the latest query's results are sent.
+    """
+
     async def connect(self):
-        self.user = None
+        # JWTAuthMiddleware has already resolved ?token=; fall back to the
+        # in-band "auth" message for clients that do not send it on connect
+        user = self.scope.get('user')
+        self.user = user if user is not None and user.is_authenticated else None
         await self.accept()
 
     async def disconnect(self, close_code):
-        pass
+        self.cancel_search()
 
     async def receive(self, text_data):
         try:
@@ -45,102 +121,284 @@ class SearchConsumer(AsyncWebsocketConsumer):
                     return
 
             query = data.get("query", "").strip()
+            self.cancel_search()
             if len(query) < 2:
-                await self.send(json.dumps({"users": [], "projects": [], "categories": []}))
+                await self.send(json.dumps({"query": query, "users": [], "projects": [], "categories": [], "skills": []}))
                 return
 
-            users, projects, categories = await self.perform_search(query)
-            await self.send(json.dumps({
-                "users": users,
-                "projects": projects,
-                "categories": categories
-            }))
+            self.start_search(query)
 
         except Exception as e:
             print(f"Error in SearchConsumer: {str(e)}")
             await self.send(json.dumps({"error": "An error occurred during search"}))
 
-    @sync_to_async
-    def authenticate_user(self, token):
-        """Decode JWT Token and return the authenticated user"""
-        if not token:
-            return None
+    async def send_search_results(self, query, results, ref=None):
+        await self.send(json.dumps({"query": query, **results}))
+
+    async def send_search_error(self, ref=None):
+        await self.send(json.dumps({"error": "An error occurred during search"}))
+
+    async def authenticate_user(self, token):
+        """Validate the JWT token and return the (cached) authenticated user"""
+        return await authenticate_token(token)
+
+
+class RealtimeConsumer(ChatActionsMixin, SearchMixin, AsyncWebsocketConsumer):
+    """
+    One socket per user, carrying several logical channels in a frame envelope.
+
+    Client frames::
+
+        {"action": "subscribe" | "unsubscribe" | "send" | "ping",
+         "channel": "chat" | "notifications" | "conversations" | "search",
+         "id": <conversation id, for the chat channel>,
+         "data": {...}, "ref": <optional client correlation id>}
+
+    Server frames::
 
+        {"channel": ..., "id": ..., "event": ..., "data": {...}}
+
+    The socket joins the ``user_<id>`` group on connect (notification counts and
+    conversation list updates); every other group is joined only while the
+    matching channel is subscribed. Freelancers' notifications channel also
+    carries the ``freelancer_notification_<id>`` group; notifications that
+    reach the socket through both groups are sent once.
+    """
+    CHANNELS = ('chat', 'notifications', 'conversations', 'search')
+    MAX_ROOM_SUBSCRIPTIONS = 20
+    RECENT_NOTIFICATIONS = 100
+
+    async def connect(self):
+        self.user = self.scope['user']
+        if not self.user.is_authenticated:
+            await self.close()
+            return
+
+        self.subscriptions = set()  # {(channel, id)}
+        self.recent_notification_ids = deque(maxlen=self.RECENT_NOTIFICATIONS)
+        self.init_chat_actions()
+        self.user_group_name = f"user_{self.user.id}"
+        await self.channel_layer.group_add(self.user_group_name, self.channel_name)
+        await self.accept()
+        await PresenceService.heartbeat(self.user.id, self.channel_name)
+
+    async def disconnect(self, close_code):
+        if not hasattr(self, 'user_group_name'):
+            return
+        self.cancel_search()
+        await PresenceService.go_offline(self.user.id, self.channel_name)
+        await self.channel_layer.group_discard(self.user_group_name, self.channel_name)
+        for channel, key in list(self.subscriptions):
+            for group in self.groups_for(channel, key):
+                await self.channel_layer.group_discard(group, self.channel_name)
+
+    async def receive(self, text_data):
         try:
-            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
-            return User.objects.get(id=payload["user_id"])
-        except (jwt.ExpiredSignatureError, jwt.DecodeError, User.DoesNotExist):
-            return None
+            frame = json.loads(text_data)
+        except ValueError:
+            await self.send_error("Invalid frame")
+            return
 
+        action = frame.get("action")
+        channel = frame.get("channel")
+        key = frame.get("id")
+        ref = frame.get("ref")
+        if action == "ping":
+            await PresenceService.heartbeat(self.user.id, self.channel_name)
+            await self.send_frame(None, "pong", ref=ref)
+            return
+        if channel not in self.CHANNELS:
+            await self.send_error("Unknown channel", ref)
+            return
+        if key is not None:
+            key = str(key)
+
+        if action == "subscribe":
+            await self.subscribe(channel, key, ref)
+        elif action == "unsubscribe":
+            await self.unsubscribe(channel, key, ref)
+        elif action == "send":
+            await self.handle_send(channel, key, frame.get("data") or {}, ref)
+        else:
+            await self.send_error("Unknown action", ref)
+
+    # Subscriptions
+
+    def groups_for(self, channel, key):
+        if channel == 'chat':
+            return [f"chat_{key}"]
+        if channel == 'notifications':
+            groups = [f"user_notification_{self.user.id}"]
+            if self.user.role in ('freelancer', 'student'):
+                groups.append(f"freelancer_notification_{self.user.id}")
+            return groups
+        return []  # conversations/search ride on the user group or need none
+
+    async def subscribe(self, channel, key, ref=None):
+        if channel == 'chat':
+            if key is None:
+                await self.send_error("Missing id", ref)
+                return
+            rooms = sum(1 for c, _ in self.subscriptions if c == 'chat')
+            if (channel, key) not in self.subscriptions and rooms >= self.MAX_ROOM_SUBSCRIPTIONS:
+                await self.send_error("Too many subscriptions", ref)
+                return
+            if not await self.can_access(key):
+                await self.send_error("Forbidden", ref, channel, key)
+                return
+        else:
+            key = None
+
+        if (channel, key) not in self.subscriptions:
+            for group in self.groups_for(channel, key):
+                await self.channel_layer.group_add(group, self.channel_name)
+            self.subscriptions.add((channel, key))
+        await self.send_frame(channel, "subscribed", key=key, ref=ref)
+
+        if channel == 'notifications':
+            unread_count, latest = await self.get_notification_state()
+            await self.send_frame('notifications', 'count', {"notifications_count": unread_count})
+            if latest:
+                await self.send_frame('notifications', 'notifications', {"notifications": [latest]})
+
+    async def unsubscribe(self, channel, key, ref=None):
+        if channel != 'chat':
+            key = None
+        if (channel, key) in self.subscriptions:
+            self.subscriptions.discard((channel, key))
+            for group in self.groups_for(channel, key):
+                await self.channel_layer.group_discard(group, self.channel_name)
+        await self.send_frame(channel, "unsubscribed", key=key, ref=ref)
 
     @sync_to_async
-    def perform_search(self, query):
-        print("Performing search",query)
-        """Perform search asynchronously using authenticated user"""
-        if not self.user:
-            return [], [], []  # Return empty results if not authenticated
+    def can_access(self, conversation_id):
+        if not conversation_id.isdigit():
+            return False
+        from chat.models import ConversationParticipant
+        return ConversationParticipant.objects.filter(
+            conversation_id=conversation_id, user_id=self.user.id, is_deleted=False
+        ).exists()
 
-        user = self.user
-        projects = []
-        seen_project_ids = set()
-        
-        # Query to get users
-        users = User.objects.filter(
-            Q(username__icontains=query) | Q(role__icontains=query)
-        ).values("id", "username", "role")[:10]  # No need to use list()
-
-        # Prepare users data
-        user_data_list = []
-        for fuser in users:
-            
-            # Fetch the User instance using fuser['id']
-            user_instance = User.objects.get(id=fuser['id'])
-            
-            # Determine pathrole
-            pathrole = 'freelancer' if fuser['role'] in ['freelancer', 'student'] else 'client'
-            
-            user_data = {
-                'id': fuser['id'],
-                'username': fuser['username'],
-                'role': fuser['role'],  # Keep original role
-                'pathrole': pathrole,   # Add pathrole for routing
-                'profile_picture': None,  # Default value for profile_picture
-            }
-        
-            if fuser["role"] == "client":
-                try:
-                    # Fetch the ClientProfile using the actual user_instance
-                    client_profile = ClientProfile.objects.get(user=user_instance)
-                    user_data['profile_picture'] = client_profile.profile_picture.url if client_profile.profile_picture else None
-                except ClientProfile.DoesNotExist:
-                    user_data['profile_picture'] = None  # Handle the case where the ClientProfile doesn't exist
+    @sync_to_async
+    def get_notification_state(self):
+        latest = Notification.objects.filter(user_id=self.user.id, is_read=False).order_by('-created_at').values(
+            'id', 'notification_text', 'created_at', 'related_model_id', 'type'
+        ).first()
+        if latest:
+            latest['created_at'] = latest['created_at'].isoformat()
+        return NotificationCounterService.get_total(self.user.id), latest
+
+    # Client -> server
+
+    async def handle_send(self, channel, key, data, ref=None):
+        if channel == 'chat':
+            if ('chat', key) not in self.subscriptions:
+                await self.send_error("Not subscribed", ref, channel, key)
+                return
+            await self.handle_chat_frame(key, data)
+        elif channel == 'search':
+            query = (data.get("query") or "").strip()
+            if len(query) < 2:
+                self.cancel_search()
+                await self.send_search_results(query, {"users": [], "projects": [], "categories": [], "skills": []}, ref)
             else:
-                try:
-                    # Fetch the FreelancerProfile using the actual user_instance
-                    freelancer_profile = FreelancerProfile.objects.get(user=user_instance)
-                    user_data['profile_picture'] = freelancer_profile.profile_picture.url if freelancer_profile.profile_picture else None
-                except FreelancerProfile.DoesNotExist:
-                    user_data['profile_picture'] = None  # Handle the case where the FreelancerProfile doesn't exist
-            
-            user_data_list.append(user_data)
-
-        # 🔹 Search Projects (Filter based on user role)
-        
-        if user.role == "client":
-            # For clients, search projects where the client is the user and match the query in the title or description
-            projects = Project.objects.filter(client=user).filter(
-                Q(title__icontains=query) | Q(description__icontains=query)
-            ).values("id", "title", "description")
+                self.start_search(query, ref)
         else:
-            # For freelancers, search projects where the user is assigned and match the query in the title or description
-            projects = Project.objects.filter(assigned_to=user).filter(
-                Q(title__icontains=query) | Q(description__icontains=query)
-            ).values("id", "title", "description")
-        
-        # 🔹 Search Categories
-        categories = Category.objects.filter(Q(name__icontains=query)).values("id", "name")
+            await self.send_error("Channel is receive-only", ref, channel, key)
+
+    async def reply_chat(self, conversation_id, payload):
+        # Direct chat replies (e.g. presence) go back through the envelope
+        payload = dict(payload)
+        await self.send_frame('chat', payload.pop("type"), payload, key=conversation_id)
+
+    async def send_search_results(self, query, results, ref=None):
+        await self.send_frame('search', 'results', results, ref=ref)
+
+    async def send_search_error(self, ref=None):
+        await self.send_error("An error occurred during search", ref, 'search')
+
+    # Server -> client
+
+    async def send_frame(self, channel, event, data=None, key=None, ref=None):
+        frame = {"channel": channel, "event": event}
+        if key is not None:
+            frame["id"] = key
+        if data is not None:
+            frame["data"] = data
+        if ref is not None:
+            frame["ref"] = ref
+        await self.send(text_data=json.dumps(frame, default=str))
+
+    async def send_error(self, error, ref=None, channel=None, key=None):
+        await self.send_frame(channel, "error", {"error": error}, key=key, ref=ref)
+
+    def is_subscribed(self, channel, key=None):
+        return (channel, None if key is None else str(key)) in self.subscriptions
+
+    # Channel layer handlers: same event types the single-purpose consumers use
+
+    async def chat_message(self, event):
+        key = event.get("conversation_id")
+        message = event["message"]
+        if self.is_subscribed('chat', key):
+            await self.send_frame('chat', 'message', message, key=str(key))
+
+    async def message_seen(self, event):
+        key = event.get("conversation_id")
+        if self.is_subscribed('chat', key):
+            await self.send_frame('chat', 'seen', {
+                "message_id": event["message_id"],
+                "user_id": event["user_id"],
+            }, key=str(key))
+
+    async def message_deleted(self, event):
+        key = event.get("conversation_id")
+        if self.is_subscribed('chat', key):
+            await self.send_frame('chat', 'message_deleted', {
+                "message_id": event["message_id"],
+                "deleted_for_everyone": event["deleted_for_everyone"],
+            }, key=str(key))
+
+    async def typing(self, event):
+        key = event.get("conversation_id")
+        if self.is_subscribed('chat', key) and event["user_id"] != self.user.id:
+            await self.send_frame('chat', 'typing', {
+                "user_id": event["user_id"],
+                "username": event["username"],
+                "is_typing": event["is_typing"],
+            }, key=str(key))
+
+    async def user_conversation_update(self, event):
+        if self.is_subscribed('conversations'):
+            data = {k: v for k, v in event.items() if k != 'type'}
+            await self.send_frame('conversations', 'update', data, key=str(event.get("conversation_id")))
+
+    conversation_update = user_conversation_update
+
+    async def send_notification_count(self, event):
+        if not self.is_subscribed('notifications'):
+            return
+        if 'notifications_count' in event:
+            await self.send_frame('notifications', 'count', {"notifications_count": event['notifications_count']})
+        elif 'message' in event:
+            await self.send_frame('notifications', 'message', event['message'])
 
-        # Return the results as lists (serialization)
-        return list(user_data_list), list(projects), list(categories)
+    def first_delivery(self, notification):
+        """False for a notification already sent through the socket's other notification group"""
+        if notification.get('id') in self.recent_notification_ids:
+            return False
+        self.recent_notification_ids.append(notification.get('id'))
+        return True
 
+    async def send_notification(self, event):
+        notification = event.get('notification')
+        if notification and self.is_subscribed('notifications') and self.first_delivery(notification):
+            await self.send_frame('notifications', 'notification', notification)
 
+    async def notification_batch(self, event):
+        if not self.is_subscribed('notifications'):
+            return
+        for notification in event['notifications']:
+            if self.first_delivery(notification):
+                await self.send_frame('notifications', 'notification', notification)
+        await self.send_frame('notifications', 'count', {"notifications_count": event['notifications_count']})
@@ -0,0 +1,59 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.services.notification_retention_service import NotificationRetentionService
+
+
+class Command(BaseCommand):
+    help = "Archive and delete expired notifications, then expire old archive partitions"
+
+    def add_arguments(self, parser):
+        defaults = NotificationRetentionService.get_settings()
+        parser.add_argument('--read-days', type=int, default=defaults['read_days'],
+                            help="Purge read notifications older than this many days")
+        parser.add_argument('--unread-days', type=int, default=defaults['unread_days'],
+                            help="Purge unread notifications older than this many days")
+        parser.add_argument('--archive-days', type=int, default=defaults['archive_days'],
+                            help="Drop archived notifications older than this many days")
+        parser.add_argument('--batch-size', type=int, default=defaults['batch_size'])
+        parser.add_argument('--no-archive', action='store_true',
+                            help="Delete expired notifications without copying them to the archive")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Only report how many notifications would be purged")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+
+        if options['dry_run']:
+            result = NotificationRetentionService.purge(
+                read_days=options['read_days'],
+                unread_days=options['unread_days'],
+                dry_run=True,
+            )
+            self.stdout.write(f"Would purge {result['purged']} notifications")
+            return
+
+        def progress(purged, archived):
+            self.stdout.write(f"  {purged} purged, {archived} archived")
+
+        result = NotificationRetentionService.purge(
+            read_days=options['read_days'],
+            unread_days=options['unread_days'],
+            archive=not options['no_archive'],
+            batch_size=options['batch_size'],
+            progress=progress if options['verbosity'] > 1 else None,
+        )
+        expired = NotificationRetentionService.expire_archive(
+            archive_days=options['archive_days'],
+            batch_size=options['batch_size'],
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Purged {result['purged']} notifications ({result['archived']} archived) "
+            f"in {result['batches']} batches, {time.monotonic() - started:.1f}s"
+        ))
+        if expired['partitions_dropped']:
+            self.stdout.write(f"Dropped archive partitions: {', '.join(expired['partitions_dropped'])}")
+        if expired['rows_deleted']:
+            self.stdout.write(f"Deleted {expired['rows_deleted']} expired archive rows")
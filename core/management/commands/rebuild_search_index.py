@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.services.search_service import SearchService
+
+
+class Command(BaseCommand):
+    help = "Rebuild the search documents for every user, project and category"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+
+        def progress(entity_type, done, total):
+            self.stdout.write(f"  {entity_type}: {done}/{total}")
+
+        counts = SearchService.rebuild(
+            batch_size=options['batch_size'],
+            progress=progress if options['verbosity'] > 1 else None,
+        )
+        summary = ', '.join(f"{count} {entity_type}s" for entity_type, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {summary} in {time.monotonic() - started:.1f}s"
+        ))
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.3 on 2026-10-19 05:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_alter_invitation_invitation_type'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='is_digest',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='item_count',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,126 @@
+# Generated by Django 5.2.3 on 2026-10-19 05:16
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+# The archive is range-partitioned by month on Postgres; the primary key has to
+# include the partition column. Monthly partitions are created on demand by
+# NotificationRetentionService; the default partition catches anything else.
+POSTGRES_FORWARD = [
+    """
+    CREATE TABLE IF NOT EXISTS core_notificationarchive (
+        id bigint NOT NULL,
+        user_id bigint NOT NULL,
+        type varchar(20) NOT NULL,
+        subtype varchar(50) NULL,
+        title varchar(200) NULL,
+        notification_text text NOT NULL,
+        is_read boolean NOT NULL,
+        created_at timestamp with time zone NOT NULL,
+        priority varchar(10) NOT NULL,
+        content_type_id integer NULL,
+        related_model_id integer NULL,
+        metadata jsonb NOT NULL,
+        is_digest boolean NOT NULL,
+        item_count integer NOT NULL,
+        archived_at timestamp with time zone NOT NULL,
+        PRIMARY KEY (id, created_at)
+    ) PARTITION BY RANGE (created_at)
+    """,
+    "CREATE TABLE IF NOT EXISTS core_notificationarchive_default PARTITION OF core_notificationarchive DEFAULT",
+    "CREATE INDEX IF NOT EXISTS core_notificationarchive_user_created ON core_notificationarchive (user_id, created_at DESC)",
+]
+
+POSTGRES_BACKWARD = [
+    "DROP TABLE IF EXISTS core_notificationarchive CASCADE",
+]
+
+DEFAULT_FORWARD = [
+    """
+    CREATE TABLE IF NOT EXISTS core_notificationarchive (
+        id bigint NOT NULL PRIMARY KEY,
+        user_id bigint NOT NULL,
+        type varchar(20) NOT NULL,
+        subtype varchar(50) NULL,
+        title varchar(200) NULL,
+        notification_text text NOT NULL,
+        is_read bool NOT NULL,
+        created_at datetime NOT NULL,
+        priority varchar(10) NOT NULL,
+        content_type_id integer NULL,
+        related_model_id integer NULL,
+        metadata text NOT NULL,
+        is_digest bool NOT NULL,
+        item_count integer NOT NULL,
+        archived_at datetime NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS core_notificationarchive_user_created ON core_notificationarchive (user_id, created_at)",
+]
+
+DEFAULT_BACKWARD = [
+    "DROP TABLE IF EXISTS core_notificationarchive",
+]
+
+
+def _run(postgres, default):
+    def run(apps, schema_editor):
+        statements = postgres if schema_editor.connection.vendor == 'postgresql' else default
+        for sql in statements:
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('core', '0010_notification_digest'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('type', models.CharField(max_length=20)),
+                ('subtype', models.CharField(blank=True, max_length=50, null=True)),
+                ('title', models.CharField(max_length=200, null=True)),
+                ('notification_text', models.TextField()),
+                ('is_read', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField()),
+                ('priority', models.CharField(default='info', max_length=10)),
+                ('related_model_id', models.PositiveIntegerField(blank=True, null=True)),
+                ('metadata', models.JSONField(blank=True, default=dict)),
+                ('is_digest', models.BooleanField(default=False)),
+                ('item_count', models.PositiveIntegerField(default=1)),
+                ('archived_at', models.DateTimeField()),
+                ('user', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, to=settings.AUTH_USER_MODEL)),
+                ('content_type', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, to='contenttypes.contenttype')),
+            ],
+            options={
+                'db_table': 'core_notificationarchive',
+                'ordering': ['-created_at'],
+                'managed': False,
+            },
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', '-created_at'], name='notif_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', 'is_read', '-created_at'], name='notif_user_read_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['is_read', 'created_at'], name='notif_read_created_idx'),
+        ),
+        migrations.RunPython(
+            _run(POSTGRES_FORWARD, DEFAULT_FORWARD),
+            _run(POSTGRES_BACKWARD, DEFAULT_BACKWARD),
+        ),
+    ]
@@ -926,16 +926,99 @@ class Notification(models.Model):
     # Flexible metadata for extra context (e.g., milestone title, revision number, etc.)
     metadata = models.JSONField(default=dict, blank=True)
 
+    # Digest rows replace a group of similar notifications (same user, type and
+    # subtype within one window); samples of the originals live in metadata
+    is_digest = models.BooleanField(default=False)
+    item_count = models.PositiveIntegerField(default=1)
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset-paginated listing, optionally unread only
+            models.Index(fields=['user', '-created_at'], name='notif_user_created_idx'),
+            models.Index(fields=['user', 'is_read', '-created_at'], name='notif_user_read_created_idx'),
+            # Retention purge scans by age across users
+            models.Index(fields=['is_read', 'created_at'], name='notif_read_created_idx'),
+        ]
 
     def __str__(self):
         return f"Notification for {self.user.username}: {self.notification_text}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored read state so the unread counters can tell a
+        # real read/unread transition from any other save
+        instance._loaded_is_read = instance.__dict__.get('is_read')
+        return instance
+
     def mark_as_read(self):
         self.is_read = True
         self.save()
 
+
+class NotificationArchive(models.Model):
+    """
+    Notifications moved out of the live table by the retention purge.
+
+    The table is created by migration 0011: on Postgres it is range-partitioned
+    by month on ``created_at`` (primary key ``(id, created_at)``), so expiring
+    archived months is a partition drop; other databases get a plain table.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.DO_NOTHING, db_constraint=False)
+    type = models.CharField(max_length=20)
+    subtype = models.CharField(max_length=50, blank=True, null=True)
+    title = models.CharField(null=True, max_length=200)
+    notification_text = models.TextField()
+    is_read = models.BooleanField(default=False)
+    created_at = models.DateTimeField()
+    priority = models.CharField(max_length=10, default='info')
+    content_type = models.ForeignKey(ContentType, on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True)
+    related_model_id = models.PositiveIntegerField(null=True, blank=True)
+    metadata = models.JSONField(default=dict, blank=True)
+    is_digest = models.BooleanField(default=False)
+    item_count = models.PositiveIntegerField(default=1)
+    archived_at = models.DateTimeField()
+
+    class Meta:
+        managed = False
+        db_table = 'core_notificationarchive'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Archived notification {self.id} for user {self.user_id}"
+
+class SearchDocument(models.Model):
+    """
+    One denormalized row per searchable object, kept current by the receivers
+    in ``core.signals`` and rebuilt by ``manage.py rebuild_search_index``.
+
+    ``title`` and ``body`` are what gets matched; ``payload`` is what a hit
+    returns, so results need no joins. Migration 0012 adds the full-text
+    machinery: a weighted ``search_vector`` column with GIN and trigram
+    indexes on Postgres, an FTS5 table on SQLite.
+    """
+    ENTITY_CHOICES = [
+        ('user', 'User'),
+        ('project', 'Project'),
+        ('category', 'Category'),
+    ]
+
+    entity_type = models.CharField(max_length=20, choices=ENTITY_CHOICES)
+    object_id = models.BigIntegerField()
+    title = models.CharField(max_length=255)
+    body = models.TextField(blank=True, default='')
+    payload = models.JSONField(default=dict, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('entity_type', 'object_id')
+
+    def __str__(self):
+        return f"{self.entity_type} #{self.object_id}: {self.title}"
+
+
 class Milestone(models.Model):
     MILESTONE_TYPE_CHOICES = [
         ('payment', 'Payment Only'),
@@ -1,6 +1,7 @@
 from django.urls import re_path
-from .consumers import SearchConsumer
+from .consumers import SearchConsumer, RealtimeConsumer
 
 websocket_urlpatterns = [
     re_path(r"ws/search/$", SearchConsumer.as_asgi()),
+    re_path(r"ws/realtime/$", RealtimeConsumer.as_asgi()),
 ]
@@ -2,8 +2,10 @@ from rest_framework import serializers
 from .models import *
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from rest_framework import exceptions
+from rest_framework.relations import MANY_RELATION_KWARGS
 from django.utils import timezone
 import logging
+from .services.catalog_service import CatalogService
 
 logger = logging.getLogger(__name__)
 
@@ -134,8 +136,58 @@ class TaskSerializer(serializers.ModelSerializer):
         read_only_fields = ['status', 'payment_status']
 
 
+class CatalogSkillField(serializers.PrimaryKeyRelatedField):
+    """
+    Skill id checked against the in-process catalog rather than one query per
+    id. With ``many=True`` the whole list is then loaded in a single query.
+    """
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return CatalogSkillListField(**list_kwargs)
+
+    def catalog_id(self, data):
+        """The validated skill id of ``data``"""
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            skill = CatalogService.get().skills_by_id.get(int(data))
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if skill is None:
+            self.fail('does_not_exist', pk_value=data)
+        return skill['id']
+
+    def to_internal_value(self, data):
+        skill_id = self.catalog_id(data)
+        skill = self.get_queryset().in_bulk([skill_id]).get(skill_id)
+        if skill is None:
+            self.fail('does_not_exist', pk_value=data)
+        return skill
+
+
+class CatalogSkillListField(serializers.ManyRelatedField):
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+
+        skill_ids = [self.child_relation.catalog_id(item) for item in data]
+        skills = self.child_relation.get_queryset().in_bulk(skill_ids)
+        for skill_id in skill_ids:
+            if skill_id not in skills:
+                # Deleted since the catalog was built
+                self.child_relation.fail('does_not_exist', pk_value=skill_id)
+        return [skills[skill_id] for skill_id in skill_ids]
+
+
 class TaskCreateSerializer(serializers.ModelSerializer):
-    skills_required_for_task = serializers.PrimaryKeyRelatedField(queryset=Skill.objects.all(), many=True)
+    skills_required_for_task = CatalogSkillField(queryset=Skill.objects.all(), many=True)
     milestones = serializers.PrimaryKeyRelatedField(queryset=Milestone.objects.all(), many=True, required=False)
 
     class Meta:
@@ -193,11 +245,39 @@ class SpendingDistributionByProjectSerializer(serializers.ModelSerializer):
         ]
 
 
+class ProjectSpendingSerializer(serializers.Serializer):
+    """A row of ``RollupService.by_project``: one project's totals for a user"""
+    project_id = serializers.IntegerField()
+    project_name = serializers.CharField(source='project__title')
+    amount = serializers.DecimalField(source='total', max_digits=14, decimal_places=2)
+    payment_count = serializers.IntegerField(source='count')
+    first_payment_date = serializers.DateField(source='first_day')
+    last_payment_date = serializers.DateField(source='last_day')
+
+
 
 class NotificationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Notification
-        fields = ['id', 'title','type', 'related_model_id', 'notification_text', 'is_read', 'created_at']
+        fields = ['id', 'title','type', 'related_model_id', 'notification_text', 'is_read', 'created_at',
+                  'is_digest', 'item_count', 'samples']
+
+    samples = serializers.SerializerMethodField()
+
+    def get_samples(self, obj):
+        # Only digests carry samples of the notifications they replaced
+        return obj.metadata.get('samples', []) if obj.is_digest else None
+
+
+class BulkDeleteNotificationsSerializer(serializers.Serializer):
+    """Body of notifications/bulk-delete/; ``types`` is read with notification_types_param"""
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=True)
+    read_only = serializers.BooleanField(required=False, default=False)
+
+
+class BulkMarkNotificationsAsReadSerializer(serializers.Serializer):
+    """Body of notifications/bulk-mark-read/"""
+    ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False)
 
 # Basic serializers for nested objects
 class SimpleUserSerializer(serializers.ModelSerializer):
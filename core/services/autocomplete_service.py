@@ -0,0 +1,289 @@
+import asyncio
+import logging
+import threading
+import time
+from bisect import bisect_left, insort
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+from ..models import Project, SearchDocument, Skill
+from .search_service import SearchService
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_AUTOCOMPLETE_SETTINGS = {
+    'full_text_min_length': 4,  # queries this long (or longer) go to SearchService
+    'limit': 10,  # results per entity type
+    'refresh_interval': 30,  # seconds between checks of the shared index versions
+    'debounce_seconds': 0.15,  # pause before a full-text query, so typing cancels it
+}
+
+
+class _PrefixIndex:
+    """
+    Sorted ``(token, id)`` pairs searched with bisect, plus the payload and
+    tokens of every id. One entry per word, so "shop" finds "Zeta shop".
+    Project indexes also keep the members of every project.
+
+    Published indexes are never modified: writers change a ``copy()`` and
+    swap it in, so lookups can read them without a lock.
+    """
+
+    def __init__(self, rows=(), members=None):
+        self.entries = []
+        self.tokens = {}
+        self.payloads = {}
+        self.members = members if members is not None else {}
+        for object_id, title, payload in rows:
+            tokens = tuple(set(SearchService.tokenize(title)))
+            self.tokens[object_id] = tokens
+            self.payloads[object_id] = payload
+            self.entries.extend((token, object_id) for token in tokens)
+        self.entries.sort()
+
+    def copy(self):
+        index = _PrefixIndex()
+        index.entries = self.entries.copy()
+        index.tokens = self.tokens.copy()
+        index.payloads = self.payloads.copy()
+        index.members = self.members.copy()
+        return index
+
+    def remove(self, object_id):
+        for token in self.tokens.pop(object_id, ()):
+            i = bisect_left(self.entries, (token, object_id))
+            if i < len(self.entries) and self.entries[i] == (token, object_id):
+                del self.entries[i]
+        self.payloads.pop(object_id, None)
+
+    def upsert(self, object_id, title, payload):
+        self.remove(object_id)
+        tokens = tuple(set(SearchService.tokenize(title)))
+        self.tokens[object_id] = tokens
+        self.payloads[object_id] = payload
+        for token in tokens:
+            insort(self.entries, (token, object_id))
+
+    def lookup(self, tokens, limit, allowed=None):
+        """Ids whose words start with every token; the first token drives the scan"""
+        first, rest = tokens[0], tokens[1:]
+        found = []
+        seen = set()
+        i = bisect_left(self.entries, (first,))
+        while i < len(self.entries) and len(found) < limit:
+            token, object_id = self.entries[i]
+            if not token.startswith(first):
+                break
+            i += 1
+            if object_id in seen or (allowed is not None and not allowed(object_id)):
+                continue
+            seen.add(object_id)
+            words = self.tokens[object_id]
+            if all(any(word.startswith(t) for word in words) for t in rest):
+                found.append(self.payloads[object_id])
+        return found
+
+
+class AutocompleteService:
+    """
+    Per-process prefix index of usernames, project titles, category names and
+    skill names for the search socket.
+
+    Users, projects and categories are loaded from the ``SearchDocument`` rows
+    (so the payloads match ``SearchService``); skills come straight from
+    ``Skill``. Saves in this process are applied incrementally from the model
+    signals. Other workers notice them through the per-entity index versions
+    kept by ``SearchService``, checked at most every ``refresh_interval``
+    seconds, and re-read just the ids logged for the new versions (a whole
+    entity type is reloaded only when that log has gaps).
+
+    Every change builds a new index from the database first and then swaps it
+    in, so lookups never take a lock and never touch the database or the
+    cache.
+    """
+    ENTITY_TYPES = ('user', 'project', 'category', 'skill')
+
+    _write_lock = threading.Lock()  # serializes index swaps; lookups don't take it
+    _refresh_lock = threading.Lock()  # one refresh_stale() at a time per process
+    _indexes = {}  # entity type -> _PrefixIndex, replaced as a whole
+    _versions = {}
+    _checked_at = None
+    _refresh_task = None
+
+    @staticmethod
+    def get_settings():
+        return {**DEFAULT_AUTOCOMPLETE_SETTINGS, **getattr(settings, 'SEARCH_AUTOCOMPLETE', {})}
+
+    @staticmethod
+    def handles(query):
+        """Short queries are answered from memory; longer ones need ranking"""
+        return len(query.strip()) < AutocompleteService.get_settings()['full_text_min_length']
+
+    # Loading
+
+    @staticmethod
+    def needs_refresh():
+        checked_at = AutocompleteService._checked_at
+        interval = AutocompleteService.get_settings()['refresh_interval']
+        return checked_at is None or time.monotonic() - checked_at >= interval
+
+    @staticmethod
+    async def ensure_fresh():
+        """
+        Start a background ``refresh_stale()`` when the versions are due for a
+        check. Concurrent callers share the same refresh, and only wait for it
+        while nothing has been loaded yet; otherwise they keep answering from
+        the current indexes.
+        """
+        if not AutocompleteService.needs_refresh():
+            return
+        task = AutocompleteService._refresh_task
+        if task is None or task.done() or task.get_loop() is not asyncio.get_running_loop():
+            task = asyncio.ensure_future(sync_to_async(AutocompleteService.refresh_stale)())
+            task.add_done_callback(AutocompleteService._log_refresh_error)
+            AutocompleteService._refresh_task = task
+        if not AutocompleteService._indexes:
+            await asyncio.shield(task)
+
+    @staticmethod
+    def _log_refresh_error(task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Autocomplete refresh failed", exc_info=task.exception())
+
+    @staticmethod
+    def refresh_stale():
+        """
+        Catch up with the entity types whose shared index version moved since
+        the last check. Calls made while another refresh is running return at
+        once instead of repeating it.
+        """
+        if not AutocompleteService._refresh_lock.acquire(blocking=False):
+            return
+        try:
+            keys = {SearchService.VERSION_KEY.format(t): t for t in AutocompleteService.ENTITY_TYPES}
+            current = cache.get_many(list(keys))
+            for key, entity_type in keys.items():
+                version = current.get(key, 1)
+                loaded = AutocompleteService._versions.get(entity_type)
+                if entity_type in AutocompleteService._indexes and loaded == version:
+                    continue
+                changed = None
+                if entity_type in AutocompleteService._indexes and loaded is not None:
+                    changed = SearchService.changed_ids(entity_type, loaded, version)
+                if changed is None:
+                    AutocompleteService._load(entity_type)
+                else:
+                    AutocompleteService.refresh(entity_type, changed)
+                AutocompleteService._versions[entity_type] = version
+            AutocompleteService._checked_at = time.monotonic()
+        finally:
+            AutocompleteService._refresh_lock.release()
+
+    @staticmethod
+    def _rows(entity_type, object_ids=None):
+        if entity_type == 'skill':
+            skills = Skill.objects.all()
+            if object_ids is not None:
+                skills = skills.filter(id__in=object_ids)
+            return [
+                (row['id'], row['name'], {'id': row['id'], 'name': row['name'], 'category': row['category__name']})
+                for row in skills.values('id', 'name', 'category__name')
+            ]
+        documents = SearchDocument.objects.filter(entity_type=entity_type)
+        if object_ids is not None:
+            documents = documents.filter(object_id__in=object_ids)
+        return list(documents.values_list('object_id', 'title', 'payload'))
+
+    @staticmethod
+    def _members(project_ids=None):
+        """Project id -> ids of the client and the assigned freelancers"""
+        projects = Project.objects.all()
+        assigned = Project.assigned_to.through.objects.all()
+        if project_ids is not None:
+            projects = projects.filter(id__in=project_ids)
+            assigned = assigned.filter(project_id__in=project_ids)
+        members = {project_id: {client_id} for project_id, client_id in projects.values_list('id', 'client_id')}
+        for project_id, user_id in assigned.values_list('project_id', 'user_id'):
+            members.setdefault(project_id, set()).add(user_id)
+        return members
+
+    @staticmethod
+    def _load(entity_type):
+        members = AutocompleteService._members() if entity_type == 'project' else None
+        index = _PrefixIndex(AutocompleteService._rows(entity_type), members)
+        with AutocompleteService._write_lock:
+            AutocompleteService._indexes = {**AutocompleteService._indexes, entity_type: index}
+
+    @staticmethod
+    def _update(entity_type, apply):
+        """Swap in a copy of the loaded index changed by ``apply(index)``"""
+        with AutocompleteService._write_lock:
+            index = AutocompleteService._indexes.get(entity_type)
+            if index is None:
+                return
+            index = index.copy()
+            apply(index)
+            AutocompleteService._indexes = {**AutocompleteService._indexes, entity_type: index}
+
+    @staticmethod
+    def refresh(entity_type, object_ids):
+        """Re-read ``object_ids`` into this process's index (no-op until it has been loaded)"""
+        if entity_type not in AutocompleteService._indexes:
+            return
+        object_ids = list(object_ids)
+        rows = AutocompleteService._rows(entity_type, object_ids)
+        members = AutocompleteService._members(object_ids) if entity_type == 'project' else {}
+
+        def apply(index):
+            found = set()
+            for object_id, title, payload in rows:
+                index.upsert(object_id, title, payload)
+                found.add(object_id)
+            for object_id in object_ids:
+                if object_id not in found:
+                    index.remove(object_id)
+                index.members.pop(object_id, None)
+            index.members.update(members)
+
+        AutocompleteService._update(entity_type, apply)
+
+    @staticmethod
+    def remove(entity_type, object_ids):
+        def apply(index):
+            for object_id in object_ids:
+                index.remove(object_id)
+                index.members.pop(object_id, None)
+
+        AutocompleteService._update(entity_type, apply)
+
+    # Lookups
+
+    @staticmethod
+    def lookup(query, entity_types=None, user=None, limit=None):
+        """
+        Return ``{entity_type: [payload]}`` for the words of ``query`` used as
+        prefixes. Projects are limited to the ones ``user`` owns or is
+        assigned to, like ``SearchService.search(scope='mine')``.
+        """
+        entity_types = entity_types or AutocompleteService.ENTITY_TYPES
+        limit = limit or AutocompleteService.get_settings()['limit']
+        tokens = SearchService.tokenize(query)
+        results = {entity_type: [] for entity_type in entity_types}
+        if not tokens:
+            return results
+
+        indexes = AutocompleteService._indexes
+        for entity_type in entity_types:
+            index = indexes.get(entity_type)
+            if index is None:
+                continue
+            allowed = None
+            if entity_type == 'project':
+                if user is None:
+                    continue
+                members = index.members
+                allowed = lambda project_id: user.id in members.get(project_id, ())
+            results[entity_type] = index.lookup(tokens, limit, allowed)
+        return results
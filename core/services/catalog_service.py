@@ -0,0 +1,86 @@
+import hashlib
+import json
+import threading
+from types import MappingProxyType
+
+from django.core.cache import cache
+
+from ..models import Category, Skill
+
+
+class Catalog:
+    """
+    Immutable snapshot of every skill and category.
+
+    ``skills`` and ``categories`` are in the shape of ``SkillSerializer`` and
+    ``CategorySerializer``; the maps give id -> name lookups and the skills of
+    each category. ``etag`` is derived from the content, so it stays stable
+    across processes and survives a reset of the version key.
+    """
+    __slots__ = ('version', 'etag', 'skills', 'categories', 'skills_by_id',
+                 'skill_names', 'category_names', 'skills_by_category')
+
+    def __init__(self, version, skills, categories):
+        skills_by_category = {}
+        for skill in skills:
+            skills_by_category.setdefault(skill['category'], []).append(skill)
+
+        set_ = object.__setattr__
+        set_(self, 'version', version)
+        set_(self, 'skills', tuple(skills))
+        set_(self, 'categories', tuple(categories))
+        set_(self, 'skills_by_id', MappingProxyType({skill['id']: skill for skill in skills}))
+        set_(self, 'skill_names', MappingProxyType({skill['id']: skill['name'] for skill in skills}))
+        set_(self, 'category_names', MappingProxyType({c['id']: c['name'] for c in categories}))
+        set_(self, 'skills_by_category', MappingProxyType({
+            category_id: tuple(items) for category_id, items in skills_by_category.items()
+        }))
+        content = json.dumps([skills, categories], sort_keys=True).encode()
+        set_(self, 'etag', f'"catalog-{hashlib.md5(content).hexdigest()}"')
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Catalog is immutable")
+
+
+class CatalogService:
+    """
+    Skills and categories, loaded once per process.
+
+    Every ``get()`` compares the snapshot's version with the shared
+    ``VERSION_KEY`` (one cache read) and rebuilds only when it moved;
+    ``invalidate()`` is called after commit whenever a skill or category is
+    saved or deleted.
+    """
+    VERSION_KEY = 'catalog:version'
+
+    _lock = threading.Lock()
+    _catalog = None
+
+    @staticmethod
+    def get():
+        version = cache.get(CatalogService.VERSION_KEY, 1)
+        catalog = CatalogService._catalog
+        if catalog is not None and catalog.version == version:
+            return catalog
+        with CatalogService._lock:
+            catalog = CatalogService._catalog
+            if catalog is None or catalog.version != version:
+                catalog = CatalogService._build(version)
+                CatalogService._catalog = catalog
+        return catalog
+
+    @staticmethod
+    def _build(version):
+        skills = [
+            {'id': row['id'], 'name': row['name'], 'description': row['description'], 'category': row['category_id']}
+            for row in Skill.objects.order_by('id').values('id', 'name', 'description', 'category_id')
+        ]
+        categories = list(Category.objects.order_by('id').values('id', 'name'))
+        return Catalog(version, skills, categories)
+
+    @staticmethod
+    def invalidate():
+        try:
+            cache.incr(CatalogService.VERSION_KEY)
+        except ValueError:
+            cache.set(CatalogService.VERSION_KEY, 2, timeout=None)
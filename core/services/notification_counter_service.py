@@ -0,0 +1,259 @@
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db.models import Count
+
+from ..models import Notification
+
+logger = logging.getLogger(__name__)
+
+# Adjust total and the per-type field together, but only if the hash has been
+# initialised from the database; otherwise the next read rebuilds it.
+_ADJUST_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return nil
+end
+redis.call('HINCRBY', KEYS[1], ARGV[1], ARGV[3])
+local total = redis.call('HINCRBY', KEYS[1], 'total', ARGV[3])
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+return total
+"""
+
+
+class NotificationCounterService:
+    """
+    Per-user unread notification counters kept in a Redis hash
+    (``total`` plus ``t:<type>`` fields).
+
+    Counters are created lazily from one grouped COUNT the first time they are
+    read, adjusted with an atomic script on create/read/delete, and corrected
+    by ``reconcile`` (``core.tasks.reconcile_notification_counters``). When the
+    cache is not Redis, every read falls back to COUNT queries.
+    """
+    KEY = 'notifications:unread:{}'
+    TTL = 60 * 60 * 24 * 7
+
+    @staticmethod
+    def _redis():
+        try:
+            from django_redis import get_redis_connection
+            return get_redis_connection('default')
+        except (ImportError, NotImplementedError):
+            return None
+
+    @staticmethod
+    def _type_field(notification_type):
+        return f"t:{notification_type}"
+
+    @staticmethod
+    def adjust(user_id, notification_type, delta):
+        """Atomically add ``delta`` to the user's counters; returns the new total or None"""
+        redis = NotificationCounterService._redis()
+        if redis is None:
+            return None
+        try:
+            total = redis.eval(
+                _ADJUST_SCRIPT, 1, NotificationCounterService.KEY.format(user_id),
+                NotificationCounterService._type_field(notification_type),
+                NotificationCounterService.TTL, delta,
+            )
+        except Exception as e:
+            logger.error(f"Failed to adjust notification counter for user {user_id}: {e}")
+            return None
+        return int(total) if total is not None else None
+
+    @staticmethod
+    def counts_from_db(user_id):
+        rows = (
+            Notification.objects.filter(user_id=user_id, is_read=False)
+            .order_by()
+            .values('type')
+            .annotate(count=Count('id'))
+        )
+        by_type = {row['type']: row['count'] for row in rows}
+        return {'total': sum(by_type.values()), 'by_type': by_type}
+
+    @staticmethod
+    def rebuild(user_id, redis=None):
+        """Replace the cached counters with the database truth"""
+        counts = NotificationCounterService.counts_from_db(user_id)
+        redis = redis or NotificationCounterService._redis()
+        if redis is not None:
+            mapping = {'total': counts['total']}
+            mapping.update({
+                NotificationCounterService._type_field(t): c for t, c in counts['by_type'].items()
+            })
+            NotificationCounterService._write_hashes(redis, {user_id: mapping})
+        return counts
+
+    @staticmethod
+    def get_counts(user_id):
+        """Return ``{'total': int, 'by_type': {type: int}}``"""
+        redis = NotificationCounterService._redis()
+        if redis is None:
+            return NotificationCounterService.counts_from_db(user_id)
+
+        raw = NotificationCounterService._decode(redis.hgetall(NotificationCounterService.KEY.format(user_id)))
+        if not raw:
+            return NotificationCounterService.rebuild(user_id, redis)
+
+        by_type = {field[2:]: value for field, value in raw.items() if field.startswith('t:') and value > 0}
+        return {'total': max(0, raw.get('total', 0)), 'by_type': by_type}
+
+    @staticmethod
+    def _decode(raw):
+        return {
+            (field.decode() if isinstance(field, bytes) else field): int(value)
+            for field, value in raw.items()
+        }
+
+    @staticmethod
+    def get_total(user_id, types=None):
+        counts = NotificationCounterService.get_counts(user_id)
+        if types is None:
+            return counts['total']
+        return sum(counts['by_type'].get(t, 0) for t in types)
+
+    @staticmethod
+    def push_count(user_id, total=None):
+        """Send the badge count to the user's ``user_<id>`` group"""
+        if total is None:
+            total = NotificationCounterService.get_total(user_id)
+        async_to_sync(get_channel_layer().group_send)(
+            f"user_{user_id}",
+            {
+                "type": "send_notification_count",
+                "notifications_count": max(0, total),
+            }
+        )
+
+    @staticmethod
+    def notification_changed(notification, delta):
+        """Apply a +1/-1 unread transition for ``notification`` and push the badge"""
+        total = NotificationCounterService.adjust(notification.user_id, notification.type, delta)
+        NotificationCounterService.push_count(notification.user_id, total)
+
+    @staticmethod
+    def mark_all_read(user_id, types=None, ids=None):
+        """
+        Mark every unread notification (optionally only ``ids`` and/or of
+        ``types``) read with one UPDATE; returns rows updated
+        """
+        unread = Notification.objects.filter(user_id=user_id, is_read=False)
+        if ids is not None:
+            unread = unread.filter(id__in=ids)
+        if types:
+            unread = unread.filter(type__in=types)
+        by_type = dict(
+            unread.order_by().values('type').annotate(count=Count('id')).values_list('type', 'count')
+        )
+        updated = unread.update(is_read=True)
+
+        totals = {}
+        if by_type:
+            totals = NotificationCounterService.adjust_many({user_id: {t: -c for t, c in by_type.items()}})
+        NotificationCounterService.push_count(user_id, totals.get(user_id))
+        return updated
+
+    @staticmethod
+    def reconcile(batch_size=500):
+        """
+        Compare every cached counter with the database and rewrite the ones
+        that drifted. Returns ``{'checked': n, 'corrected': n}``.
+        """
+        redis = NotificationCounterService._redis()
+        if redis is None:
+            return {'checked': 0, 'corrected': 0}
+
+        checked = corrected = 0
+        batch = []
+        pattern = NotificationCounterService.KEY.format('*')
+        for key in redis.scan_iter(match=pattern, count=batch_size):
+            key = key.decode() if isinstance(key, bytes) else key
+            batch.append(int(key.rsplit(':', 1)[1]))
+            if len(batch) >= batch_size:
+                c, f = NotificationCounterService._reconcile_batch(redis, batch)
+                checked, corrected = checked + c, corrected + f
+                batch = []
+        if batch:
+            c, f = NotificationCounterService._reconcile_batch(redis, batch)
+            checked, corrected = checked + c, corrected + f
+        return {'checked': checked, 'corrected': corrected}
+
+    @staticmethod
+    def _hash_fields_from_db(user_ids):
+        """``{user_id: {'total': n, 't:<type>': n}}`` from one grouped query"""
+        rows = (
+            Notification.objects.filter(user_id__in=user_ids, is_read=False)
+            .order_by()
+            .values('user_id', 'type')
+            .annotate(count=Count('id'))
+        )
+        expected = {user_id: {'total': 0} for user_id in user_ids}
+        for row in rows:
+            fields = expected[row['user_id']]
+            fields[NotificationCounterService._type_field(row['type'])] = row['count']
+            fields['total'] += row['count']
+        return expected
+
+    @staticmethod
+    def _write_hashes(redis, hashes):
+        pipe = redis.pipeline()
+        for user_id, fields in hashes.items():
+            key = NotificationCounterService.KEY.format(user_id)
+            pipe.delete(key)
+            pipe.hset(key, mapping=fields)
+            pipe.expire(key, NotificationCounterService.TTL)
+        pipe.execute()
+
+    @staticmethod
+    def adjust_many(deltas):
+        """
+        Apply ``{user_id: {type: delta}}`` in one pipeline and return
+        ``{user_id: total}``. Users without a cached hash are initialised from
+        one grouped query instead of being adjusted.
+        """
+        redis = NotificationCounterService._redis()
+        if redis is None:
+            return {}
+
+        script = redis.register_script(_ADJUST_SCRIPT)
+        pipe = redis.pipeline(transaction=False)
+        order = []
+        for user_id, by_type in deltas.items():
+            for notification_type, delta in by_type.items():
+                script(
+                    keys=[NotificationCounterService.KEY.format(user_id)],
+                    args=[NotificationCounterService._type_field(notification_type), NotificationCounterService.TTL, delta],
+                    client=pipe,
+                )
+                order.append(user_id)
+        totals = {}
+        for user_id, total in zip(order, pipe.execute()):
+            totals[user_id] = None if total is None else int(total)
+
+        missing = [user_id for user_id, total in totals.items() if total is None]
+        if missing:
+            hashes = NotificationCounterService._hash_fields_from_db(missing)
+            NotificationCounterService._write_hashes(redis, hashes)
+            totals.update({user_id: fields['total'] for user_id, fields in hashes.items()})
+        return totals
+
+    @staticmethod
+    def _reconcile_batch(redis, user_ids):
+        expected = NotificationCounterService._hash_fields_from_db(user_ids)
+
+        pipe = redis.pipeline()
+        for user_id in user_ids:
+            pipe.hgetall(NotificationCounterService.KEY.format(user_id))
+        cached = pipe.execute()
+
+        drifted = {}
+        for user_id, raw in zip(user_ids, cached):
+            actual = {k: v for k, v in NotificationCounterService._decode(raw).items() if v or k == 'total'}
+            if actual != expected[user_id]:
+                drifted[user_id] = expected[user_id]
+        if drifted:
+            NotificationCounterService._write_hashes(redis, drifted)
+        return len(user_ids), len(drifted)
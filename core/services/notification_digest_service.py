@@ -0,0 +1,192 @@
+import logging
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+from ..models import Notification
+from .notification_counter_service import NotificationCounterService
+from .notification_service import NotificationService
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DIGEST_SETTINGS = {
+    # (type, subtype) pairs that are safe to collapse: only the broadcast
+    # opportunity notifications. Other rows of the same types (assignment and
+    # interview replies, deadline reminders) and one-off events (payments,
+    # connections, messages) are never rolled up
+    'kinds': [('Projects', 'opportunity'), ('Tasks', 'opportunity'), ('obsp_opportunity', 'opportunity')],
+    'window': 'hour',  # Trunc kind used to bucket created_at
+    'min_items': 3,  # smallest group worth a digest
+    'sample_size': 5,  # originals kept in the digest's metadata
+    'lookback_days': 7,  # older unread rows are left alone
+    'batch_size': 500,  # groups handled per transaction
+}
+
+DIGEST_TITLES = {
+    ('Projects', 'opportunity'): "{count} new project opportunities",
+    ('Tasks', 'opportunity'): "{count} new task opportunities",
+    ('obsp_opportunity', 'opportunity'): "{count} new OBSP opportunities",
+}
+
+
+class NotificationDigestService:
+    """
+    Rolls groups of similar unread notifications up into digest rows.
+
+    A group is every unread, non-digest notification of one of the configured
+    ``kinds`` with the same user, type and subtype whose ``created_at`` falls in the same closed window (an hour
+    by default). Groups of at least ``min_items`` rows are replaced by one
+    digest ``Notification`` with ``is_digest=True``, ``item_count`` and a few
+    samples in ``metadata``; the originals are deleted. The unread counters
+    are adjusted in one pipeline and each affected user gets a single count
+    push.
+    """
+
+    @staticmethod
+    def get_settings():
+        return {**DEFAULT_DIGEST_SETTINGS, **getattr(settings, 'NOTIFICATION_DIGEST', {})}
+
+    @staticmethod
+    def rollup(now=None):
+        """Collapse every eligible closed window; returns ``{'digests': n, 'collapsed': n}``"""
+        config = NotificationDigestService.get_settings()
+        now = now or timezone.now()
+        # Only windows that have ended, so each window is rolled up once
+        window_start = NotificationDigestService._window_start(now, config['window'])
+        if not config['kinds']:
+            return {'digests': 0, 'collapsed': 0}
+        kinds = Q()
+        for notification_type, subtype in config['kinds']:
+            kinds |= Q(type=notification_type, subtype=subtype)
+
+        candidates = (
+            Notification.objects
+            .filter(
+                kinds,
+                is_read=False,
+                is_digest=False,
+                created_at__gte=now - timedelta(days=config['lookback_days']),
+                created_at__lt=window_start,
+            )
+            .annotate(bucket=Trunc('created_at', config['window']))
+        )
+        groups = list(
+            candidates.order_by()
+            .values('user_id', 'type', 'subtype', 'bucket')
+            .annotate(count=Count('id'))
+            .filter(count__gte=config['min_items'])
+        )
+
+        digests = collapsed = 0
+        for i in range(0, len(groups), config['batch_size']):
+            d, c = NotificationDigestService._rollup_groups(candidates, groups[i:i + config['batch_size']], config)
+            digests, collapsed = digests + d, collapsed + c
+        return {'digests': digests, 'collapsed': collapsed}
+
+    @staticmethod
+    def _window_start(now, kind):
+        now = timezone.localtime(now)
+        if kind == 'day':
+            return now.replace(hour=0, minute=0, second=0, microsecond=0)
+        if kind == 'hour':
+            return now.replace(minute=0, second=0, microsecond=0)
+        if kind == 'minute':
+            return now.replace(second=0, microsecond=0)
+        raise ValueError(f"Unsupported digest window: {kind}")
+
+    @staticmethod
+    def _rollup_groups(candidates, groups, config):
+        keys = {(g['user_id'], g['type'], g['subtype'], g['bucket']) for g in groups}
+
+        with transaction.atomic():
+            rows = (
+                candidates
+                .filter(user_id__in={g['user_id'] for g in groups}, type__in={g['type'] for g in groups})
+                .select_for_update()
+                .order_by('-created_at')
+                .values('id', 'user_id', 'type', 'subtype', 'bucket', 'title',
+                        'notification_text', 'related_model_id', 'created_at')
+            )
+            members = defaultdict(list)
+            for row in rows:
+                key = (row['user_id'], row['type'], row['subtype'], row['bucket'])
+                if key in keys:
+                    members[key].append(row)
+
+            digests = []
+            deleted_ids = []
+            deltas = defaultdict(Counter)
+            for (user_id, notification_type, subtype, bucket), items in members.items():
+                if len(items) < config['min_items']:
+                    continue  # read or deleted since the grouping query
+                digests.append(NotificationDigestService._build_digest(
+                    user_id, notification_type, subtype, bucket, items, config
+                ))
+                deleted_ids.extend(item['id'] for item in items)
+                deltas[user_id][notification_type] += 1 - len(items)
+
+            if not digests:
+                return 0, 0
+
+            digests = Notification.objects.bulk_create(digests)
+            # Keep created_at on the newest original so digests sort in place
+            for digest in digests:
+                digest.created_at = digest._digest_last
+            Notification.objects.bulk_update(digests, ['created_at'])
+            # The originals are replaced, not read: skip the per-row post_delete
+            # receivers and settle the counters below in one pipeline
+            NotificationService.delete_rows(Notification, deleted_ids)
+
+            transaction.on_commit(lambda: NotificationDigestService._after_commit(deltas))
+
+        logger.info(f"Rolled {len(deleted_ids)} notifications into {len(digests)} digests")
+        return len(digests), len(deleted_ids)
+
+    @staticmethod
+    def _build_digest(user_id, notification_type, subtype, bucket, items, config):
+        count = len(items)
+        title = DIGEST_TITLES.get((notification_type, subtype), "{count} new {type} notifications").format(
+            count=count, type=notification_type
+        )
+        samples = [
+            {
+                'id': item['id'],
+                'title': item['title'],
+                'notification_text': item['notification_text'],
+                'related_model_id': item['related_model_id'],
+                'created_at': item['created_at'].isoformat(),
+            }
+            for item in items[:config['sample_size']]
+        ]
+        digest = Notification(
+            user_id=user_id,
+            type=notification_type,
+            subtype=subtype,
+            title=title,
+            notification_text=title,
+            is_digest=True,
+            item_count=count,
+            related_model_id=items[0]['related_model_id'],
+            metadata={
+                'samples': samples,
+                'related_model_ids': [item['related_model_id'] for item in items],
+                'window_start': bucket.isoformat(),
+            },
+        )
+        digest._digest_last = items[0]['created_at']
+        return digest
+
+    @staticmethod
+    def _after_commit(deltas):
+        try:
+            totals = NotificationCounterService.adjust_many(deltas)
+        except Exception as e:
+            logger.error(f"Failed to adjust notification counters after rollup: {e}")
+            totals = {}
+        for user_id in deltas:
+            NotificationCounterService.push_count(user_id, totals.get(user_id))
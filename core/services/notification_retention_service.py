@@ -0,0 +1,199 @@
+import logging
+import re
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from ..models import Notification, NotificationArchive
+from .notification_counter_service import NotificationCounterService
+from .notification_service import NotificationService
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RETENTION_SETTINGS = {
+    'read_days': 90,  # read notifications leave the live table after this
+    'unread_days': 365,  # unread ones are kept longer
+    'archive': True,  # copy purged rows to core_notificationarchive first
+    'archive_days': 730,  # archived rows (partitions on Postgres) expire after this
+    'batch_size': 2000,
+}
+
+# Columns copied from core_notification into the archive, in table order
+ARCHIVE_COLUMNS = [
+    'id', 'user_id', 'type', 'subtype', 'title', 'notification_text', 'is_read',
+    'created_at', 'priority', 'content_type_id', 'related_model_id', 'metadata',
+    'is_digest', 'item_count',
+]
+
+_PARTITION_NAME = re.compile(r'^core_notificationarchive_y(\d{4})m(\d{2})$')
+
+
+class NotificationRetentionService:
+    """
+    Keeps the live notification table small.
+
+    ``purge`` moves expired rows (read after ``read_days``, unread after
+    ``unread_days``) out of ``core_notification`` in id-ordered batches: one
+    ``INSERT ... SELECT`` into the archive and one ``DELETE`` per batch, with
+    the unread counters settled once per batch. ``expire_archive`` drops whole
+    monthly partitions on Postgres and falls back to batched deletes elsewhere.
+    """
+
+    @staticmethod
+    def get_settings():
+        return {**DEFAULT_RETENTION_SETTINGS, **getattr(settings, 'NOTIFICATION_RETENTION', {})}
+
+    @staticmethod
+    def expired(read_days, unread_days, now=None):
+        now = now or timezone.now()
+        return Notification.objects.filter(
+            Q(is_read=True, created_at__lt=now - timedelta(days=read_days))
+            | Q(is_read=False, created_at__lt=now - timedelta(days=unread_days))
+        )
+
+    @staticmethod
+    def purge(read_days=None, unread_days=None, archive=None, batch_size=None, dry_run=False, progress=None):
+        """
+        Archive (optionally) and delete expired notifications.
+        Returns ``{'purged': n, 'archived': n, 'batches': n}``; with ``dry_run``
+        only counts what would be purged.
+        """
+        config = NotificationRetentionService.get_settings()
+        read_days = config['read_days'] if read_days is None else read_days
+        unread_days = config['unread_days'] if unread_days is None else unread_days
+        archive = config['archive'] if archive is None else archive
+        batch_size = batch_size or config['batch_size']
+
+        expired = NotificationRetentionService.expired(read_days, unread_days)
+        if dry_run:
+            return {'purged': expired.count(), 'archived': 0, 'batches': 0}
+
+        purged = archived = batches = 0
+        now = timezone.now()
+        while True:
+            with transaction.atomic():
+                ids = list(
+                    expired.order_by('id').select_for_update(skip_locked=True)
+                    .values_list('id', flat=True)[:batch_size]
+                )
+                if not ids:
+                    break
+
+                unread = (
+                    Notification.objects.filter(id__in=ids, is_read=False)
+                    .order_by().values('user_id', 'type').annotate(count=Count('id'))
+                )
+                deltas = defaultdict(Counter)
+                for row in unread:
+                    deltas[row['user_id']][row['type']] -= row['count']
+
+                if archive:
+                    archived += NotificationRetentionService._archive(ids, now)
+                purged += NotificationService.delete_rows(Notification, ids)
+
+                if deltas:
+                    transaction.on_commit(lambda deltas=deltas: NotificationCounterService.adjust_many(deltas))
+
+            batches += 1
+            if progress:
+                progress(purged, archived)
+            if len(ids) < batch_size:
+                break
+
+        logger.info(f"Purged {purged} notifications ({archived} archived) in {batches} batches")
+        return {'purged': purged, 'archived': archived, 'batches': batches}
+
+    @staticmethod
+    def _archive(ids, archived_at):
+        if connection.vendor == 'postgresql':
+            bounds = Notification.objects.filter(id__in=ids).order_by().values_list('created_at', flat=True)
+            NotificationRetentionService.ensure_partitions({
+                (created_at.year, created_at.month) for created_at in bounds
+            })
+
+        columns = ', '.join(ARCHIVE_COLUMNS)
+        placeholders = ', '.join(['%s'] * len(ids))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {NotificationArchive._meta.db_table} ({columns}, archived_at) "
+                f"SELECT {columns}, %s FROM {Notification._meta.db_table} WHERE id IN ({placeholders})",
+                [archived_at, *ids],
+            )
+            return cursor.rowcount
+
+    @staticmethod
+    def partition_name(year, month):
+        return f"{NotificationArchive._meta.db_table}_y{year:04d}m{month:02d}"
+
+    @staticmethod
+    def ensure_partitions(months):
+        """Create the monthly archive partitions for ``{(year, month)}`` (Postgres only)"""
+        if connection.vendor != 'postgresql':
+            return
+        table = NotificationArchive._meta.db_table
+        with connection.cursor() as cursor:
+            for year, month in sorted(months):
+                next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+                try:
+                    with transaction.atomic():
+                        cursor.execute(
+                            f"CREATE TABLE IF NOT EXISTS {NotificationRetentionService.partition_name(year, month)} "
+                            f"PARTITION OF {table} "
+                            f"FOR VALUES FROM ('{year:04d}-{month:02d}-01') TO ('{next_year:04d}-{next_month:02d}-01')"
+                        )
+                except DatabaseError as e:
+                    # The default partition already holds rows for this month;
+                    # they (and this batch) simply stay there
+                    logger.warning(f"Could not create archive partition for {year}-{month:02d}: {e}")
+
+    @staticmethod
+    def expire_archive(archive_days=None, batch_size=None):
+        """Remove archived notifications older than ``archive_days``; returns what was dropped"""
+        config = NotificationRetentionService.get_settings()
+        archive_days = config['archive_days'] if archive_days is None else archive_days
+        batch_size = batch_size or config['batch_size']
+        cutoff = timezone.now() - timedelta(days=archive_days)
+
+        if connection.vendor == 'postgresql':
+            return {'partitions_dropped': NotificationRetentionService._drop_partitions(cutoff), 'rows_deleted': 0}
+
+        deleted = 0
+        while True:
+            ids = list(
+                NotificationArchive.objects.filter(created_at__lt=cutoff)
+                .order_by('id').values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            deleted += NotificationService.delete_rows(NotificationArchive, ids)
+        return {'partitions_dropped': [], 'rows_deleted': deleted}
+
+    @staticmethod
+    def _drop_partitions(cutoff):
+        """Drop the monthly partitions that end before ``cutoff``"""
+        table = NotificationArchive._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT c.relname FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid "
+                "JOIN pg_class p ON p.oid = i.inhparent "
+                "WHERE p.relname = %s",
+                [table],
+            )
+            partitions = [row[0] for row in cursor.fetchall()]
+
+            dropped = []
+            for name in partitions:
+                match = _PARTITION_NAME.match(name)
+                if not match:
+                    continue  # the default partition is never dropped
+                year, month = int(match.group(1)), int(match.group(2))
+                ends = (year + 1, 1) if month == 12 else (year, month + 1)
+                if ends <= (cutoff.year, cutoff.month):
+                    cursor.execute(f"DROP TABLE IF EXISTS {name}")
+                    dropped.append(name)
+        return dropped
@@ -0,0 +1,256 @@
+import logging
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import connections, router, transaction
+from django.db.models import Count, Q
+
+from ..models import Notification
+from .notification_counter_service import NotificationCounterService
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationService:
+    """
+    Fan-out of one notification to many users.
+
+    ``Notification.objects.create`` in a loop costs one INSERT, one counter
+    script and two channel-layer messages per recipient (the post_save
+    receivers in ``client.signals``). ``send_many`` renders the text once,
+    inserts every row with ``bulk_create`` inside one transaction (which fires
+    no per-row signals), adjusts all unread counters in one Redis pipeline and,
+    after commit, sends a single ``notification_batch`` event per recipient.
+
+    It also serves the keyset-paginated notification list and bulk deletes.
+    """
+    DEFAULT_PAGE_SIZE = 30
+    MAX_PAGE_SIZE = 100
+
+    @staticmethod
+    def send_many(users, type, notification_text, title=None, subtype=None, priority='info',
+                  related_model_id=None, content_type=None, metadata=None, context=None,
+                  batch_size=1000):
+        """
+        Create the same notification for every user in ``users`` (users or ids).
+
+        ``title`` and ``notification_text`` are rendered once with
+        ``str.format(**context)`` when ``context`` is given. Returns the
+        created notifications.
+        """
+        user_ids = list(dict.fromkeys(getattr(user, 'pk', user) for user in users))
+        if not user_ids:
+            return []
+
+        if context:
+            notification_text = notification_text.format(**context)
+            title = title.format(**context) if title else title
+
+        notifications = [
+            Notification(
+                user_id=user_id,
+                type=type,
+                subtype=subtype,
+                title=title,
+                notification_text=notification_text,
+                priority=priority,
+                related_model_id=related_model_id,
+                content_type=content_type,
+                metadata=metadata or {},
+            )
+            for user_id in user_ids
+        ]
+
+        return NotificationService.create_many(notifications, batch_size=batch_size)
+
+    @staticmethod
+    def create_many(notifications, batch_size=1000):
+        """
+        Insert prepared (unsaved) ``Notification`` instances in one transaction
+        and publish them per recipient once it commits.
+        """
+        if not notifications:
+            return []
+        with transaction.atomic():
+            notifications = Notification.objects.bulk_create(notifications, batch_size=batch_size)
+            transaction.on_commit(lambda: NotificationService._after_commit(notifications))
+        return notifications
+
+    @staticmethod
+    def _after_commit(notifications):
+        deltas = defaultdict(Counter)
+        for notification in notifications:
+            deltas[notification.user_id][notification.type] += 1
+
+        try:
+            totals = NotificationCounterService.adjust_many(deltas)
+        except Exception as e:
+            logger.error(f"Failed to adjust notification counters for {len(deltas)} users: {e}")
+            totals = {}
+        missing = [user_id for user_id in deltas if totals.get(user_id) is None]
+        if missing:
+            totals.update({
+                user_id: fields['total']
+                for user_id, fields in NotificationCounterService._hash_fields_from_db(missing).items()
+            })
+
+        by_user = defaultdict(list)
+        for notification in notifications:
+            by_user[notification.user_id].append(NotificationService.serialize(notification))
+
+        NotificationService.publish_batches(by_user, totals)
+
+    @staticmethod
+    def serialize(notification):
+        return {
+            'id': notification.id,
+            'title': notification.title,
+            'notification_text': notification.notification_text,
+            'created_at': notification.created_at.isoformat(),
+            'related_model_id': notification.related_model_id,
+            'type': notification.type,
+        }
+
+    @staticmethod
+    def publish_batches(by_user, totals):
+        """Send one ``notification_batch`` per user to ``user_notification_<id>``"""
+        channel_layer = get_channel_layer()
+
+        async def send_all():
+            for user_id, items in by_user.items():
+                await channel_layer.group_send(
+                    f"user_notification_{user_id}",
+                    {
+                        "type": "notification_batch",
+                        "notifications": items,
+                        "notifications_count": max(0, totals.get(user_id, 0)),
+                    }
+                )
+
+        async_to_sync(send_all)()
+
+    @staticmethod
+    def delete_rows(model, ids, batch_size=1000):
+        """
+        Delete ``model`` rows by primary key with plain ``DELETE ... WHERE id
+        IN (...)`` statements; returns rows deleted. Unlike
+        ``QuerySet.delete()`` nothing is loaded and no delete signals run, so
+        callers settle the unread counters themselves. Notification and
+        archive rows have nothing that cascades from them.
+        """
+        ids = list(ids)
+        connection = connections[router.db_for_write(model)]
+        table = connection.ops.quote_name(model._meta.db_table)
+        pk = connection.ops.quote_name(model._meta.pk.column)
+        deleted = 0
+        with connection.cursor() as cursor:
+            for start in range(0, len(ids), batch_size):
+                chunk = ids[start:start + batch_size]
+                cursor.execute(f"DELETE FROM {table} WHERE {pk} IN ({', '.join(['%s'] * len(chunk))})", chunk)
+                deleted += cursor.rowcount
+        return deleted
+
+    @staticmethod
+    def publish_to_groups(notifications, group, count_group=None, count_types=None):
+        """
+        Send each notification as ``send_notification`` to ``group.format(user_id)``
+        and, with ``count_group``, each recipient's unread count of
+        ``count_types`` as ``send_notification_count``. For consumers that
+        listen on their own groups besides ``notification_batch`` (the
+        freelancer ones); call it after commit.
+        """
+        channel_layer = get_channel_layer()
+        counts = {}
+        if count_group:
+            counts = {
+                user_id: NotificationCounterService.get_total(user_id, types=count_types)
+                for user_id in dict.fromkeys(notification.user_id for notification in notifications)
+            }
+
+        async def send_all():
+            for notification in notifications:
+                await channel_layer.group_send(
+                    group.format(notification.user_id),
+                    {"type": "send_notification", "notification": NotificationService.serialize(notification)}
+                )
+            for user_id, total in counts.items():
+                await channel_layer.group_send(
+                    count_group.format(user_id),
+                    {"type": "send_notification_count", "notifications_count": total}
+                )
+
+        async_to_sync(send_all)()
+
+    @staticmethod
+    def encode_cursor(notification):
+        micros = (notification.created_at - _EPOCH) // timedelta(microseconds=1)
+        return f"{micros}_{notification.id}"
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """Return ``(created_at, id)``; raises ValueError for a malformed cursor"""
+        micros, notification_id = cursor.split('_')
+        return _EPOCH + timedelta(microseconds=int(micros)), int(notification_id)
+
+    @staticmethod
+    def list_page(user_id, cursor=None, limit=None, types=None, unread_only=False):
+        """
+        One page of the user's notifications, newest first.
+
+        Pages are keyed on ``(created_at, id)`` so every page is an index range
+        scan on (user, [is_read,] created_at), however deep it is. Returns
+        ``{'results': [Notification], 'next_cursor': str|None}``.
+        """
+        limit = min(int(limit or NotificationService.DEFAULT_PAGE_SIZE), NotificationService.MAX_PAGE_SIZE)
+        if limit <= 0:
+            raise ValueError("limit must be positive")
+
+        notifications = Notification.objects.filter(user_id=user_id)
+        if unread_only:
+            notifications = notifications.filter(is_read=False)
+        if types:
+            notifications = notifications.filter(type__in=types)
+        if cursor:
+            created_at, notification_id = NotificationService.decode_cursor(cursor)
+            notifications = notifications.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=notification_id)
+            )
+
+        rows = list(notifications.order_by('-created_at', '-id')[:limit + 1])
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        return {
+            'results': rows,
+            'next_cursor': NotificationService.encode_cursor(rows[-1]) if has_more else None,
+        }
+
+    @staticmethod
+    def delete_many(user_id, ids=None, types=None, read_only=False):
+        """
+        Delete the user's notifications matching ``ids``/``types`` (and only
+        read ones with ``read_only``) in one statement; returns rows deleted.
+        """
+        notifications = Notification.objects.filter(user_id=user_id)
+        if ids is not None:
+            notifications = notifications.filter(id__in=ids)
+        if types:
+            notifications = notifications.filter(type__in=types)
+        if read_only:
+            notifications = notifications.filter(is_read=True)
+
+        with transaction.atomic():
+            rows = list(notifications.select_for_update().order_by().values_list('id', 'type', 'is_read'))
+            unread = Counter(notification_type for _, notification_type, is_read in rows if not is_read)
+            # Skip the per-row post_delete receivers; the counters are
+            # adjusted once per type below
+            deleted = NotificationService.delete_rows(Notification, [row[0] for row in rows])
+
+        if unread:
+            totals = NotificationCounterService.adjust_many({user_id: {t: -c for t, c in unread.items()}})
+            NotificationCounterService.push_count(user_id, totals.get(user_id))
+        return deleted
+
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
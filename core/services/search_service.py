@@ -0,0 +1,341 @@
+import hashlib
+import json
+import re
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Q
+
+from ..models import Category, Project, SearchDocument, User
+
+# Queries are reduced to word tokens, which keeps user input out of the
+# tsquery/FTS5 syntax
+_TOKEN = re.compile(r'\w+')
+
+
+class SearchService:
+    """
+    Ranked search over ``SearchDocument`` rows, one result list per entity type.
+
+    Postgres ranks ``ts_rank`` on the weighted ``search_vector`` plus trigram
+    similarity on the title (so partial words still match); SQLite uses BM25
+    over the FTS5 table; anything else falls back to ``icontains``. Each entity
+    type is paginated by its own ``(score, id)`` cursor, and pages are cached
+    under a key that includes the entity type's index version, scope, user,
+    cursor and limit.
+    """
+    ENTITY_TYPES = ('user', 'project', 'category')
+    DEFAULT_LIMIT = 10
+    MAX_LIMIT = 50
+    CACHE_TIMEOUT = 60 * 5
+    VERSION_KEY = 'search:index_version:{}'
+    # Ids changed by each version bump, so per-process indexes can catch up
+    # without reloading a whole entity type
+    CHANGES_KEY = 'search:index_changes:{}:{}'
+    CHANGE_LOG_TIMEOUT = 60 * 60
+    MAX_REPLAYED_VERSIONS = 500
+    MAX_REPLAYED_IDS = 5000
+
+    # Indexing
+
+    @staticmethod
+    def user_documents(user_ids):
+        users = (
+            User.objects.filter(id__in=user_ids)
+            .select_related('client_profile', 'freelancer_profile')
+        )
+        documents = []
+        for user in users:
+            profile = getattr(user, 'client_profile', None) if user.role == 'client' \
+                else getattr(user, 'freelancer_profile', None)
+            picture = profile.profile_picture.url if profile and profile.profile_picture else None
+            full_name = f"{user.first_name or ''} {user.last_name or ''}".strip()
+            documents.append(SearchDocument(
+                entity_type='user',
+                object_id=user.id,
+                title=user.username,
+                body=' '.join(filter(None, [full_name, user.role])),
+                payload={
+                    'id': user.id,
+                    'username': user.username,
+                    'role': user.role,
+                    'pathrole': 'freelancer' if user.role in ['freelancer', 'student'] else 'client',
+                    'profile_picture': picture,
+                },
+            ))
+        return documents
+
+    @staticmethod
+    def project_documents(project_ids):
+        projects = (
+            Project.objects.filter(id__in=project_ids)
+            .select_related('domain')
+            .prefetch_related('skills_required')
+        )
+        documents = []
+        for project in projects:
+            skills = [skill.name for skill in project.skills_required.all()]
+            documents.append(SearchDocument(
+                entity_type='project',
+                object_id=project.id,
+                title=project.title,
+                body=' '.join(filter(None, [project.description, project.domain.name, ' '.join(skills)])),
+                payload={
+                    'id': project.id,
+                    'title': project.title,
+                    'description': (project.description or '')[:300],
+                    'budget': str(project.budget) if project.budget is not None else None,
+                    'deadline': project.deadline.isoformat() if project.deadline else None,
+                    'domain': project.domain.name,
+                    'skills_required': skills,
+                    'status': project.status,
+                },
+            ))
+        return documents
+
+    @staticmethod
+    def category_documents(category_ids):
+        return [
+            SearchDocument(
+                entity_type='category',
+                object_id=category.id,
+                title=category.name,
+                body=category.description or '',
+                payload={'id': category.id, 'name': category.name},
+            )
+            for category in Category.objects.filter(id__in=category_ids)
+        ]
+
+    BUILDERS = {
+        'user': 'user_documents',
+        'project': 'project_documents',
+        'category': 'category_documents',
+    }
+
+    @staticmethod
+    def index(entity_type, object_ids):
+        """Insert or refresh the documents for ``object_ids``; missing objects are removed"""
+        object_ids = list(object_ids)
+        if not object_ids:
+            return 0
+        builder = getattr(SearchService, SearchService.BUILDERS[entity_type])
+        documents = builder(object_ids)
+        if documents:
+            SearchDocument.objects.bulk_create(
+                documents,
+                update_conflicts=True,
+                unique_fields=['entity_type', 'object_id'],
+                update_fields=['title', 'body', 'payload', 'updated_at'],
+            )
+        found = {document.object_id for document in documents}
+        SearchService.remove(entity_type, [i for i in object_ids if i not in found])
+        SearchService.bump_version(entity_type, object_ids)
+        return len(documents)
+
+    @staticmethod
+    def remove(entity_type, object_ids):
+        if object_ids:
+            SearchDocument.objects.filter(entity_type=entity_type, object_id__in=object_ids).delete()
+            SearchService.bump_version(entity_type, object_ids)
+
+    @staticmethod
+    def rebuild(batch_size=1000, progress=None):
+        """Reindex every user, project and category; returns ``{entity_type: count}``"""
+        models = {'user': User, 'project': Project, 'category': Category}
+        counts = {}
+        for entity_type, model in models.items():
+            ids = list(model.objects.order_by('id').values_list('id', flat=True))
+            SearchDocument.objects.filter(entity_type=entity_type).exclude(object_id__in=ids).delete()
+            counts[entity_type] = 0
+            for i in range(0, len(ids), batch_size):
+                counts[entity_type] += SearchService.index(entity_type, ids[i:i + batch_size])
+                if progress:
+                    progress(entity_type, counts[entity_type], len(ids))
+        return counts
+
+    @staticmethod
+    def bump_version(entity_type, object_ids=None):
+        """
+        Invalidate the cached pages of one entity type. With ``object_ids``
+        the new version also logs which objects changed (see ``changed_ids``).
+        """
+        key = SearchService.VERSION_KEY.format(entity_type)
+        try:
+            version = cache.incr(key)
+        except ValueError:
+            version = 2
+            cache.set(key, version, timeout=None)
+        if object_ids is not None:
+            cache.set(
+                SearchService.CHANGES_KEY.format(entity_type, version),
+                list(object_ids),
+                timeout=SearchService.CHANGE_LOG_TIMEOUT,
+            )
+
+    @staticmethod
+    def changed_ids(entity_type, since, until):
+        """
+        The ids changed by the versions after ``since`` up to ``until``, or
+        None when the log cannot tell (missing or expired entries, or more
+        changes than are worth replaying).
+        """
+        if until < since or until - since > SearchService.MAX_REPLAYED_VERSIONS:
+            return None
+        keys = [SearchService.CHANGES_KEY.format(entity_type, v) for v in range(since + 1, until + 1)]
+        logged = cache.get_many(keys)
+        if len(logged) < len(keys):
+            return None
+        object_ids = {object_id for ids in logged.values() for object_id in ids}
+        return object_ids if len(object_ids) <= SearchService.MAX_REPLAYED_IDS else None
+
+    # Querying
+
+    @staticmethod
+    def tokenize(query):
+        return _TOKEN.findall((query or '').lower())
+
+    @staticmethod
+    def encode_cursor(score, document_id):
+        return f"{score!r}_{document_id}"
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """Return ``(score, id)``; raises ValueError for a malformed cursor"""
+        score, document_id = cursor.rsplit('_', 1)
+        return float(score), int(document_id)
+
+    @staticmethod
+    def cache_key(query, entity_type, scope, user, cursor, limit):
+        digest = hashlib.md5(query.strip().lower().encode()).hexdigest()
+        version = cache.get(SearchService.VERSION_KEY.format(entity_type), 1)
+        owner = user.id if scope == 'mine' and user is not None else 'all'
+        return f"search:v{version}:{scope}:{owner}:{entity_type}:{limit}:{cursor or ''}:{digest}"
+
+    @staticmethod
+    def search(query, entity_types=None, cursors=None, limit=None, scope='all', user=None):
+        """
+        Return ``{entity_type: {'results': [payload], 'next_cursor': str|None}}``.
+
+        ``cursors`` maps an entity type to the cursor of its next page, so each
+        list pages independently. With ``scope='mine'`` projects are limited to
+        the ones ``user`` owns (clients) or is assigned to (freelancers).
+        """
+        entity_types = [t for t in (entity_types or SearchService.ENTITY_TYPES) if t in SearchService.ENTITY_TYPES]
+        cursors = cursors or {}
+        limit = min(int(limit or SearchService.DEFAULT_LIMIT), SearchService.MAX_LIMIT)
+        if limit <= 0:
+            raise ValueError("limit must be positive")
+
+        results = {}
+        for entity_type in entity_types:
+            cursor = cursors.get(entity_type)
+            after = SearchService.decode_cursor(cursor) if cursor else None
+            key = SearchService.cache_key(query, entity_type, scope, user, cursor, limit)
+            page = cache.get(key)
+            if page is None:
+                page = SearchService._search_entity(query, entity_type, after, limit, scope, user)
+                cache.set(key, page, timeout=SearchService.CACHE_TIMEOUT)
+            results[entity_type] = page
+        return results
+
+    @staticmethod
+    def _search_entity(query, entity_type, after, limit, scope, user):
+        tokens = SearchService.tokenize(query)
+        if not tokens:
+            return {'results': [], 'next_cursor': None}
+
+        vendor = connection.vendor
+        scope_sql, scope_params = SearchService._scope_sql(entity_type, scope, user)
+        if vendor == 'postgresql':
+            rows = SearchService._search_postgres(query, tokens, entity_type, after, limit + 1, scope_sql, scope_params)
+        elif vendor == 'sqlite':
+            rows = SearchService._search_sqlite(tokens, entity_type, after, limit + 1, scope_sql, scope_params)
+        else:
+            rows = SearchService._search_fallback(query, entity_type, after, limit + 1, scope, user)
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        return {
+            'results': [SearchService._load_payload(row[2]) for row in rows],
+            'next_cursor': SearchService.encode_cursor(rows[-1][1], rows[-1][0]) if has_more else None,
+        }
+
+    @staticmethod
+    def _load_payload(payload):
+        # Raw cursors return JSON columns as text on SQLite
+        if isinstance(payload, str):
+            return json.loads(payload)
+        return payload
+
+    @staticmethod
+    def _scope_sql(entity_type, scope, user):
+        """Extra WHERE fragment (alias ``d``) restricting projects to the user's own"""
+        if entity_type != 'project' or scope != 'mine':
+            return '', []
+        if user is None:
+            return ' AND 1 = 0', []
+        if user.role == 'client':
+            return f" AND d.object_id IN (SELECT id FROM {Project._meta.db_table} WHERE client_id = %s)", [user.id]
+        assigned = Project.assigned_to.through._meta.db_table
+        return f" AND d.object_id IN (SELECT project_id FROM {assigned} WHERE user_id = %s)", [user.id]
+
+    @staticmethod
+    def _page_sql(inner_sql, after):
+        sql = f"SELECT id, score, payload FROM ({inner_sql}) s"
+        params = []
+        if after:
+            sql += " WHERE s.score < %s OR (s.score = %s AND s.id < %s)"
+            params = [after[0], after[0], after[1]]
+        return sql + " ORDER BY s.score DESC, s.id DESC LIMIT %s", params
+
+    @staticmethod
+    def _search_postgres(query, tokens, entity_type, after, limit, scope_sql, scope_params):
+        table = SearchDocument._meta.db_table
+        tsquery = ' & '.join(f"{token}:*" for token in tokens)
+        like_pattern = '%' + re.sub(r'([\\%_])', r'\\\1', query.strip()) + '%'
+        inner = f"""
+            SELECT d.id, d.payload,
+                   (ts_rank(d.search_vector, to_tsquery('simple', %s)) + similarity(d.title, %s))::float8 AS score
+            FROM {table} d
+            WHERE d.entity_type = %s
+              AND (d.search_vector @@ to_tsquery('simple', %s) OR d.title ILIKE %s){scope_sql}
+        """
+        page_sql, page_params = SearchService._page_sql(inner, after)
+        params = [tsquery, query.strip(), entity_type, tsquery, like_pattern, *scope_params, *page_params, limit]
+        with connection.cursor() as cursor:
+            cursor.execute(page_sql, params)
+            return [(row[0], row[1], row[2]) for row in cursor.fetchall()]
+
+    @staticmethod
+    def _search_sqlite(tokens, entity_type, after, limit, scope_sql, scope_params):
+        table = SearchDocument._meta.db_table
+        match = ' '.join(f'"{token}"*' for token in tokens)
+        # bm25() is lower-is-better; negate it so every backend sorts score DESC.
+        # Title matches weigh ten times body matches.
+        inner = f"""
+            SELECT d.id, d.payload, -bm25({table}_fts, 10.0, 1.0) AS score
+            FROM {table}_fts
+            JOIN {table} d ON d.id = {table}_fts.rowid
+            WHERE {table}_fts MATCH %s AND d.entity_type = %s{scope_sql}
+        """
+        page_sql, page_params = SearchService._page_sql(inner, after)
+        params = [match, entity_type, *scope_params, *page_params, limit]
+        with connection.cursor() as cursor:
+            cursor.execute(page_sql, params)
+            return [(row[0], row[1], row[2]) for row in cursor.fetchall()]
+
+    @staticmethod
+    def _search_fallback(query, entity_type, after, limit, scope, user):
+        """Unranked icontains search for databases without a dedicated backend"""
+        documents = SearchDocument.objects.filter(entity_type=entity_type).filter(
+            Q(title__icontains=query.strip()) | Q(body__icontains=query.strip())
+        )
+        if entity_type == 'project' and scope == 'mine':
+            if user is None:
+                return []
+            owned = Project.objects.filter(client=user) if user.role == 'client' \
+                else Project.objects.filter(assigned_to=user)
+            documents = documents.filter(object_id__in=owned.values('id'))
+        if after:
+            documents = documents.filter(id__lt=after[1])
+        return [(d.id, 0.0, d.payload) for d in documents.order_by('-id')[:limit]]
@@ -1,14 +1,23 @@
 # signals.py
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, m2m_changed
 from django.dispatch import receiver
-from .models import Connection, Notification,User,Project,Task,Payment
-from Profile.models import FreelancerProfile
+from .models import Connection, Notification,User,Project,Task,Payment,Category,Skill
+from Profile.models import ClientProfile, FreelancerProfile
 from django.utils.translation import gettext_lazy as _
 from django.db.models import Count
 from .serializers import UserSerializer
 from financeapp.models.transaction import Transaction
+from financeapp.models import CommissionTier, SpecialCommissionRate, Hold, Wallet
 from financeapp.models.wallet import WalletTransaction
+from financeapp.services.commission_resolver import CommissionResolver
+from financeapp.services.rollup_service import RollupService
+from financeapp.services.wallet_summary_service import WalletSummaryService
 from .services.automated_reward_service import AutomatedRewardService
+from .services.autocomplete_service import AutocompleteService
+from .services.catalog_service import CatalogService
+from .services.notification_service import NotificationService
+from .services.search_service import SearchService
 
 from django.urls import reverse
 
@@ -39,8 +48,6 @@ def create_connection_notification(sender, instance, created, **kwargs):
         )
 
 
-
-from django.db.models.signals import m2m_changed
 @receiver(m2m_changed, sender=Project.skills_required.through)
 def create_project_notification(sender, instance, action, **kwargs):
     if action == "post_add":  # This triggers after skills are added
@@ -64,6 +71,7 @@ def create_project_notification(sender, instance, action, **kwargs):
 def send_skill_based_notifications(project_instance, required_skills, task_instance):
     # For each freelancer, check if their skills align with the project or task
     freelancers = User.objects.filter(role='freelancer')
+    notifications = []
 
     for freelancer in freelancers:
         # Get or create freelancer profile
@@ -90,12 +98,17 @@ def send_skill_based_notifications(project_instance, required_skills, task_insta
             )
 
             # Create the notification with the plain string
-            Notification.objects.create(
+            notifications.append(Notification(
                 user=freelancer,
                 type='Projects' if not task_instance else 'Tasks',
+                subtype='opportunity',
                 related_model_id=project_instance.id if not task_instance else task_instance.id,
                 notification_text=notification_text
-            )
+            ))
+
+    # One insert for all matches; the digest rollup later folds repeated
+    # opportunities for the same freelancer into a single row
+    NotificationService.create_many(notifications)
 
 @receiver(m2m_changed, sender=Task.skills_required_for_task.through)
 def create_task_notification(sender, instance, action, **kwargs):
@@ -264,6 +277,14 @@ def trigger_referral_reward_on_transaction(sender, instance, created, **kwargs):
         if instance.to_user:
             AutomatedRewardService.check_and_grant_referral_rewards(instance.to_user)
 
+@receiver(post_save, sender=Transaction)
+def update_transaction_rollups(sender, instance, **kwargs):
+    """
+    Keep the daily earnings/spending rollups in step with completed
+    transactions; runs in the saving transaction so both commit together
+    """
+    RollupService.sync(instance)
+
 @receiver(post_save, sender=WalletTransaction)
 def trigger_referral_reward_on_wallet_transaction(sender, instance, created, **kwargs):
     """
@@ -273,3 +294,116 @@ def trigger_referral_reward_on_wallet_transaction(sender, instance, created, **k
         # Check for referral rewards for the wallet owner
         AutomatedRewardService.check_and_grant_referral_rewards(instance.wallet.user)
 
+
+
+# Keep the search documents in step with the objects they describe. Indexing
+# runs after commit so a rolled-back save never reaches the index.
+
+
+def _reindex(entity_type, object_ids):
+    def run():
+        SearchService.index(entity_type, object_ids)
+        AutocompleteService.refresh(entity_type, object_ids)
+    transaction.on_commit(run)
+
+
+@receiver(post_save, sender=User)
+def index_user(sender, instance, update_fields=None, **kwargs):
+    # Logins only touch last_login, which is not indexed
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    _reindex('user', [instance.id])
+
+
+@receiver(post_save, sender=ClientProfile)
+@receiver(post_save, sender=FreelancerProfile)
+def index_profile_user(sender, instance, **kwargs):
+    _reindex('user', [instance.user_id])
+
+
+@receiver(post_save, sender=Project)
+def index_project(sender, instance, **kwargs):
+    _reindex('project', [instance.id])
+
+
+@receiver(m2m_changed, sender=Project.skills_required.through)
+def index_project_skills(sender, instance, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear') and isinstance(instance, Project):
+        _reindex('project', [instance.id])
+
+
+@receiver(m2m_changed, sender=Project.assigned_to.through)
+def refresh_project_members(sender, instance, action, **kwargs):
+    # Membership does not change the document, only which users see it in
+    # scoped results (cached search pages and autocomplete)
+    if action in ('post_add', 'post_remove', 'post_clear') and isinstance(instance, Project):
+        project_id = instance.id
+
+        def run():
+            SearchService.bump_version('project', [project_id])
+            AutocompleteService.refresh('project', [project_id])
+        transaction.on_commit(run)
+
+
+@receiver(post_save, sender=Category)
+def index_category(sender, instance, **kwargs):
+    _reindex('category', [instance.id])
+    # Project documents carry the category (domain) name
+    _reindex('project', list(Project.objects.filter(domain=instance).values_list('id', flat=True)))
+
+
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=Project)
+@receiver(post_delete, sender=Category)
+def remove_search_document(sender, instance, **kwargs):
+    entity_type = {User: 'user', Project: 'project', Category: 'category'}[sender]
+    object_id = instance.id
+
+    def run():
+        SearchService.remove(entity_type, [object_id])
+        AutocompleteService.remove(entity_type, [object_id])
+    transaction.on_commit(run)
+
+
+# Skills are only used for autocomplete; bumping their version makes the other
+# workers re-read them
+@receiver(post_save, sender=Skill)
+@receiver(post_delete, sender=Skill)
+def refresh_skill_autocomplete(sender, instance, **kwargs):
+    skill_id = instance.id
+
+    def run():
+        SearchService.bump_version('skill', [skill_id])
+        AutocompleteService.refresh('skill', [skill_id])
+    transaction.on_commit(run)
+
+
+# Skills and categories are served from the per-process catalog
+@receiver(post_save, sender=Skill)
+@receiver(post_delete, sender=Skill)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_catalog(sender, instance, **kwargs):
+    transaction.on_commit(CatalogService.invalidate)
+
+
+# Commission tiers and special rates are resolved from a per-process table
+@receiver(post_save, sender=CommissionTier)
+@receiver(post_delete, sender=CommissionTier)
+@receiver(post_save, sender=SpecialCommissionRate)
+@receiver(post_delete, sender=SpecialCommissionRate)
+def invalidate_commission_table(sender, instance, **kwargs):
+    transaction.on_commit(CommissionResolver.invalidate)
+
+
+# Wallet summaries are cached per wallet; LedgerService drops them for the
+# wallets it changes, these cover every other write
+@receiver(post_save, sender=Wallet)
+@receiver(post_delete, sender=Wallet)
+@receiver(post_save, sender=Hold)
+@receiver(post_delete, sender=Hold)
+@receiver(post_save, sender=WalletTransaction)
+@receiver(post_delete, sender=WalletTransaction)
+def invalidate_wallet_summary(sender, instance, **kwargs):
+    wallet_id = instance.id if sender is Wallet else instance.wallet_id
+    transaction.on_commit(lambda: WalletSummaryService.invalidate([wallet_id]))
@@ -0,0 +1,31 @@
+from celery import shared_task
+
+from .services.notification_counter_service import NotificationCounterService
+from .services.notification_digest_service import NotificationDigestService
+from .services.notification_retention_service import NotificationRetentionService
+
+
+@shared_task
+def reconcile_notification_counters():
+    """Correct drift between the Redis unread counters and the Notification table"""
+    result = NotificationCounterService.reconcile()
+    return f"Checked {result['checked']} notification counters, corrected {result['corrected']}"
+
+
+@shared_task
+def rollup_notification_digests():
+    """Collapse groups of similar unread notifications into digest rows"""
+    result = NotificationDigestService.rollup()
+    return f"Rolled {result['collapsed']} notifications into {result['digests']} digests"
+
+
+@shared_task
+def purge_expired_notifications():
+    """Apply the NOTIFICATION_RETENTION policy to the live table and the archive"""
+    result = NotificationRetentionService.purge()
+    expired = NotificationRetentionService.expire_archive()
+    return (
+        f"Purged {result['purged']} notifications ({result['archived']} archived), "
+        f"dropped {len(expired['partitions_dropped'])} archive partitions, "
+        f"deleted {expired['rows_deleted']} archive rows"
+    )
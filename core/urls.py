@@ -43,6 +43,10 @@ urlpatterns = [
 
     # Endpoint to mark a specific notification as read
     path('notifications/<int:notification_id>/mark-as-read/', MarkNotificationAsRead.as_view(), name='mark-notification-as-read'),
+    path('notifications/mark-all-as-read/', MarkAllNotificationsAsRead.as_view(), name='mark-all-notifications-as-read'),
+    path('notifications/unread-count/', NotificationUnreadCountView.as_view(), name='notification-unread-count'),
+    path('notifications/bulk-mark-read/', BulkMarkNotificationsAsRead.as_view(), name='bulk-mark-notifications-as-read'),
+    path('notifications/bulk-delete/', BulkDeleteNotifications.as_view(), name='bulk-delete-notifications'),
 
     # Endpoint to delete a specific notification
     path('notifications/<int:notification_id>/', DeleteNotification.as_view(), name='delete-notification'),
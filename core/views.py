@@ -38,6 +38,10 @@ from dateutil import parser
 from rest_framework import serializers
 from .serializers import SkillSerializer,ProjectResponseSerializer, TaskResponseSerializer
 import traceback
+from .services.catalog_service import CatalogService
+from .services.notification_counter_service import NotificationCounterService
+from .services.notification_service import NotificationService
+from .services.search_service import SearchService
 from django.utils.dateparse import parse_date
 from django.db import IntegrityError
 from django.core.validators import validate_email
@@ -45,14 +49,33 @@ from decimal import Decimal
 from django.core.validators import MinValueValidator, MaxValueValidator
 from financeapp.models.hold import Hold
 from financeapp.models import Wallet
+from financeapp.services.journal_service import JournalService
+from financeapp.services.ledger_service import LedgerService
 from freelancer.obsp_eligibility import OBSPEligibilityCalculator
 from rest_framework import generics
 from .models import Skill  # Assuming Skills model is defined in core/models.py
 from rest_framework import serializers  # For creating a simple serializer
 
-class SkillsListView(generics.ListAPIView):
-    queryset = Skill.objects.all()
-    serializer_class = SkillSerializer
+def catalog_response(request, data, catalog):
+    """
+    Respond with catalog data, tagged with the catalog's ETag; a matching
+    If-None-Match gets an empty 304 instead.
+    """
+    headers = {'ETag': catalog.etag, 'Cache-Control': 'private, no-cache'}
+    if_none_match = request.headers.get('If-None-Match', '')
+    tags = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+    if catalog.etag in tags or '*' in tags:
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(data, headers=headers)
+
+
+class SkillsListView(APIView):
+    def get(self, request):
+        """
+        Returns every skill, from the in-process catalog.
+        """
+        catalog = CatalogService.get()
+        return catalog_response(request, catalog.skills, catalog)
 
 class CustomTokenObtainPairView(TokenObtainPairView):
     serializer_class = CustomTokenObtainPairSerializer
@@ -514,8 +537,12 @@ class CreateProjectView(APIView):
                               status=status.HTTP_400_BAD_REQUEST)
             else:
                 wallet = Wallet.objects.get(user=client)
-                wallet.hold_balance += total_auto_payment
-                wallet.save()
+                # Commitments reserve hold balance without debiting the balance
+                LedgerService.apply(
+                    {wallet.id: (Decimal('0.00'), Decimal(str(total_auto_payment)))},
+                    counterpart=JournalService.COMMITMENTS,
+                    kind='auto_pay_commitment',
+                )
 
         # Create Project with error handling
         try:
@@ -684,9 +711,8 @@ class CategoryListView(APIView):
         """
         Returns a list of all categories (domains).
         """
-        categories = Category.objects.all()
-        serializer = CategorySerializer(categories, many=True)
-        return Response(serializer.data)
+        catalog = CatalogService.get()
+        return catalog_response(request, catalog.categories, catalog)
 
 
 class SkillsByCategoryView(APIView):
@@ -696,9 +722,8 @@ class SkillsByCategoryView(APIView):
         """
         Returns a list of skills that belong to the selected category (domain).
         """
-        skills = Skill.objects.filter(category_id=category_id)
-        serializer = SkillSerializer(skills, many=True)
-        return Response(serializer.data)
+        catalog = CatalogService.get()
+        return catalog_response(request, catalog.skills_by_category.get(category_id, ()), catalog)
 
 
 
@@ -712,135 +737,71 @@ class CustomPagination(PageNumberPagination):
 @api_view(['GET'])
 @permission_classes([])  # Open API, modify as needed
 def search_partial(request):
+    """
+    Ranked search over users, projects and categories.
+
+    ?query=&types=users,projects,categories&limit=&users_cursor=&projects_cursor=&categories_cursor=
+    Each list carries its own next_cursor, so one type can be paged without
+    re-running the others.
+    """
     query = request.GET.get('query', '').strip()
     if not query:
         return Response({"error": "Search query is required"}, status=status.HTTP_400_BAD_REQUEST)
 
-    # Check cache first
-    cached_results = cache.get(query)
-    if cached_results:
-        return Response(cached_results)
-
-    paginator = CustomPagination()
-    # Search Users (by username & role)
-    users = User.objects.filter(
-        Q(username__icontains=query) | Q(role__icontains=query)
-    ).order_by('id')
-
-    # Paginate Users
-    paginated_users = paginator.paginate_queryset(users, request)
-
-    # Manually serialize the users with a Python dict
-    serialized_users = []
-    projects = []
-    seen_project_ids = set()  # To track unique project IDs
-
-    for user in paginated_users:
-        user_data = {
-            'id': user.id,
-            'username': user.username,
-            'role': user.role,
-            'profile_picture': None,  # Default value for profile_picture
-        }
+    names = {'users': 'user', 'projects': 'project', 'categories': 'category'}
+    requested = [t for t in request.GET.get('types', '').split(',') if t in names] or list(names)
+    try:
+        results = SearchService.search(
+            query,
+            entity_types=[names[t] for t in requested],
+            cursors={names[t]: request.GET.get(f'{t}_cursor') for t in requested if request.GET.get(f'{t}_cursor')},
+            limit=request.GET.get('limit'),
+        )
+    except ValueError:
+        return Response({"error": "Invalid cursor or limit"}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Add the profile_picture based on the role
-        if user.role == 'client':
-            try:
-                client_profile = ClientProfile.objects.get(user=user)
-                user_data['profile_picture'] = client_profile.profile_picture.url if client_profile.profile_picture else None
-                # Query for projects assigned to this client
-                client_projects = Project.objects.filter(
-                    Q(client=user) |  # Projects assigned to this client
-                    Q(title__icontains=query) | 
-                    Q(description__icontains=query) | 
-                    Q(domain__name__icontains=query)
-                ).distinct().order_by('id')
-
-                # Add only unique projects by ID
-                for project in client_projects:
-                    if project.id not in seen_project_ids:
-                        seen_project_ids.add(project.id)
-                        projects.append(project)
+    return Response({t: results[names[t]] for t in requested})
 
-            except ClientProfile.DoesNotExist:
-                user_data['profile_picture'] = None
-        elif user.role == 'freelancer':
-            try:
-                freelancer_profile = FreelancerProfile.objects.get(user=user)
-                # Query for projects assigned to this freelancer
-                freelancer_projects = Project.objects.filter(
-                    Q(assigned_to=user) |  # Correct for ManyToManyField lookup
-                    Q(title__icontains=query) | 
-                    Q(description__icontains=query) | 
-                    Q(domain__name__icontains=query)
-                ).distinct().order_by('id')
-
-                # Add only unique projects by ID
-                for project in freelancer_projects:
-                    if project.id not in seen_project_ids:
-                        seen_project_ids.add(project.id)
-                        projects.append(project)
-
-                user_data['profile_picture'] = freelancer_profile.profile_picture.url if freelancer_profile.profile_picture else None
-            except FreelancerProfile.DoesNotExist:
-                user_data['profile_picture'] = None
 
-        serialized_users.append(user_data)
-
-    # Paginate Projects
-    if projects:
-        paginated_projects = paginator.paginate_queryset(projects, request)
-        serialized_projects = ProjectSerializer(paginated_projects, many=True)
-        project_count = len(projects)  # Count the total number of projects
+def notification_types_param(data):
+    """
+    The ``types`` filter of query params or a request body: a list of types,
+    or a comma-separated string (``types=a,b``). None when no type is given.
+    """
+    if hasattr(data, 'getlist'):
+        values = data.getlist('types')
     else:
-        project_count = 0
-
-    # Search Categories (by name)
-    categories = Category.objects.filter(
-        Q(name__icontains=query)
-    ).order_by('id')
-
-    # Paginate Categories
-    paginated_categories = paginator.paginate_queryset(categories, request)
-    serialized_categories = CategorySerializer(paginated_categories, many=True)
-
-    # Prepare the final response data, including pagination info
-    response_data = {
-        "users": {
-            "count": users.count(),
-            "next": paginator.get_next_link(),
-            "previous": paginator.get_previous_link(),
-            "results": serialized_users
-        },
-        "projects": {
-            "count": project_count,
-            "next": paginator.get_next_link(),
-            "previous": paginator.get_previous_link(),
-            "results": serialized_projects.data if projects else []
-        },
-        "categories": {
-            "count": categories.count(),
-            "next": paginator.get_next_link(),
-            "previous": paginator.get_previous_link(),
-            "results": serialized_categories.data
-        }
-    }
-    print(response_data)
-
-    # Cache the results for 15 minutes
-    cache.set(query, response_data, timeout=60*15)
+        values = data.get('types') or []
+        if isinstance(values, str):
+            values = [values]
+    if not isinstance(values, list) or not all(isinstance(value, str) for value in values):
+        raise ValueError("types must be a list or a comma-separated string")
+    return [t.strip() for value in values for t in value.split(',') if t.strip()] or None
 
-    # Return the paginated response
-    return Response(response_data)
 
+def notification_page_response(request, unread_only=False):
+    """Keyset-paginated notification list: ?cursor=&limit=&types=a,b"""
+    types = notification_types_param(request.query_params)
+    try:
+        page = NotificationService.list_page(
+            request.user.id,
+            cursor=request.query_params.get('cursor'),
+            limit=request.query_params.get('limit'),
+            types=types,
+            unread_only=unread_only,
+        )
+    except ValueError:
+        return Response({'error': 'Invalid cursor or limit'}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({
+        'results': NotificationSerializer(page['results'], many=True).data,
+        'next_cursor': page['next_cursor'],
+    })
 
 
 class NotificationListView(APIView):
     permission_classes=[IsAuthenticated]
     def get(self, request):
-        notifications = Notification.objects.filter(user=request.user).order_by('-created_at')
-        serializer = NotificationSerializer(notifications, many=True)
-        return Response(serializer.data)
+        return notification_page_response(request)
 
 
 # Mark a specific notification as read
@@ -857,6 +818,59 @@ class MarkNotificationAsRead(APIView):
             return Response(status=status.HTTP_404_NOT_FOUND)
 
 
+# Mark all (or all of some types) of the user's notifications as read
+class MarkAllNotificationsAsRead(APIView):
+    permission_classes=[IsAuthenticated]
+
+    def patch(self, request):
+        try:
+            types = notification_types_param(request.data)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        updated = NotificationCounterService.mark_all_read(request.user.id, types=types)
+        return Response({'updated': updated}, status=status.HTTP_200_OK)
+
+
+# Mark a list of notifications as read with one UPDATE
+class BulkMarkNotificationsAsRead(APIView):
+    permission_classes=[IsAuthenticated]
+
+    def patch(self, request):
+        serializer = BulkMarkNotificationsAsReadSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        updated = NotificationCounterService.mark_all_read(request.user.id, ids=serializer.validated_data['ids'])
+        return Response({'updated': updated}, status=status.HTTP_200_OK)
+
+
+# Delete notifications by ids and/or types (optionally only read ones) with one DELETE
+class BulkDeleteNotifications(APIView):
+    permission_classes=[IsAuthenticated]
+
+    def post(self, request):
+        serializer = BulkDeleteNotificationsSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            types = notification_types_param(request.data)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        ids = serializer.validated_data.get('ids')
+        read_only = serializer.validated_data['read_only']
+        if not ids and not types and not read_only:
+            return Response({'error': 'Provide ids, types or read_only'}, status=status.HTTP_400_BAD_REQUEST)
+        deleted = NotificationService.delete_many(request.user.id, ids=ids or None, types=types, read_only=read_only)
+        return Response({'deleted': deleted}, status=status.HTTP_200_OK)
+
+
+# Unread badge counts (total and per type) served from the counters
+class NotificationUnreadCountView(APIView):
+    permission_classes=[IsAuthenticated]
+
+    def get(self, request):
+        return Response(NotificationCounterService.get_counts(request.user.id))
+
+
 # Delete a specific notification
 class DeleteNotification(APIView):
     permission_classes=[IsAuthenticated]
@@ -888,14 +902,8 @@ class UnmarkedNotificationListView(APIView):
     permission_classes=[IsAuthenticated]
 
     def get(self, request):
-        # Filter notifications by the current logged-in user and those that are unread
-        notifications = Notification.objects.filter(user=request.user, is_read=False)
-        
-        # Serialize the notifications
-        serializer = NotificationSerializer(notifications, many=True)
-        
-        # Return the serialized data as the response
-        return Response(serializer.data)
+        # Unread notifications of the current user, one keyset page at a time
+        return notification_page_response(request, unread_only=True)
 
 
 from django.core.exceptions import ObjectDoesNotExist
@@ -2,24 +2,32 @@ from django.contrib import admin
 from financeapp.models import (
     SubscriptionPlan,
     UserSubscription,
+    SubscriptionRenewal,
     Wallet,
     WalletTransaction,
     Transaction,
     CommissionTier,
     Commission,
+    SpecialCommissionRate,
     PaymentMethod,
     PaymentGatewayLog,
-    Hold
+    Hold,
+    ReconciliationRun,
+    ReconciliationMismatch,
 )
 
 # Register your models here
 admin.site.register(SubscriptionPlan)
 admin.site.register(UserSubscription)
+admin.site.register(SubscriptionRenewal)
 admin.site.register(Wallet)
 admin.site.register(Hold)
 admin.site.register(WalletTransaction)
 admin.site.register(Transaction)
 admin.site.register(CommissionTier)
 admin.site.register(Commission)
+admin.site.register(SpecialCommissionRate)
 admin.site.register(PaymentMethod)
-admin.site.register(PaymentGatewayLog)
\ No newline at end of file
+admin.site.register(PaymentGatewayLog)
+admin.site.register(ReconciliationRun)
+admin.site.register(ReconciliationMismatch)
\ No newline at end of file
@@ -1,69 +1,161 @@
-from django.core.management.base import BaseCommand
-from core.models import Project, Milestone
+import time
+from collections import defaultdict
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Subquery
+
+from core.models import Milestone
 from financeapp.models import Wallet
 from financeapp.models.hold import Hold
-from django.db import transaction
+from financeapp.services.journal_service import JournalService
+from financeapp.services.ledger_service import LedgerService
+from financeapp.services.wallet_summary_service import WalletSummaryService
+
+ZERO = Decimal('0.00')
+
 
 class Command(BaseCommand):
-    help = "Force update Hold model for all auto-pay milestones"
+    help = (
+        "Create the missing Hold for every auto-pay milestone and reserve its amount in the "
+        "client's hold balance. Works in chunks of milestones; safe to re-run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Report what would be created without writing")
+        parser.add_argument('--project', type=int, action='append', dest='projects',
+                            help="Only this project id (repeatable)")
+        parser.add_argument('--chunk-size', type=int, default=1000, help="Milestones per chunk and transaction")
+        parser.add_argument('--skip-hold-balance', action='store_true',
+                            help="Create the holds but leave Wallet.hold_balance alone "
+                                 "(for commitments that already reserved it)")
 
     def handle(self, *args, **options):
-        created_count = 0
-        updated_count = 0
-        skipped_count = 0
-
-        for project in Project.objects.all():
-            client = project.client
-            try:
-                wallet = Wallet.objects.get(user=client)
-            except Wallet.DoesNotExist:
-                self.stdout.write(self.style.WARNING(f"No wallet for client {client.username} (Project: {project.title})"))
-                continue
-
-            milestones = Milestone.objects.filter(project=project,is_automated=True)
-            for milestone in milestones:
-                # Check if a Hold already exists for this milestone
-                hold_qs = Hold.objects.filter(
-                    wallet=wallet,
-                    project=project,
-                    milestone=milestone,
-                    hold_type='project_milestone'
-                )
-                if hold_qs.exists():
-                    skipped_count += 1
-                    continue
+        if options['chunk_size'] < 1:
+            raise CommandError("--chunk-size must be at least 1")
+        started = time.monotonic()
+        dry_run = options['dry_run']
 
-                # Calculate escrow amount
-                if project.pricing_strategy == 'fixed':
-                    amount = milestone.amount
-                elif project.pricing_strategy == 'hourly':
-                    amount = (milestone.max_hours or 0) * (project.hourly_rate or 0)
-                else:
-                    amount = 0
+        automated = Milestone.objects.filter(is_automated=True, project__isnull=False)
+        if options['projects']:
+            automated = automated.filter(project_id__in=options['projects'])
+        missing = self._missing(automated)
 
-                if not amount or amount <= 0:
-                    self.stdout.write(self.style.WARNING(
-                        f"Skipping milestone '{milestone.title}' (Project: {project.title}) due to zero amount."
-                    ))
-                    continue
+        existing = automated.filter(Exists(self._holds())).count()
+        no_wallet = missing.filter(wallet_id__isnull=True).count()
+        total = missing.filter(wallet_id__isnull=False).count()
+        self.stdout.write(
+            f"{total} auto-pay milestones without a hold, {existing} already held, "
+            f"{no_wallet} skipped for clients without a wallet"
+            + (" (dry run)" if dry_run else "")
+        )
 
-                # Create the Hold
-                with transaction.atomic():
-                    Hold.objects.create(
-                        wallet=wallet,
-                        user=client,
-                        project=project,
-                        milestone=milestone,
-                        amount=amount,
-                        hold_type='project_milestone',
-                        title=f"Auto-pay hold for {milestone.title}",
-                        description=f"Auto-pay hold for milestone '{milestone.title}' in project '{project.title}'"
-                    )
-                    created_count += 1
-                    self.stdout.write(self.style.SUCCESS(
-                        f"Created Hold for milestone '{milestone.title}' (Project: {project.title})"
-                    ))
+        totals = defaultdict(lambda: ZERO)
+        counts = defaultdict(int)
+        last_id = 0
+        while True:
+            chunk = list(
+                missing.filter(wallet_id__isnull=False, id__gt=last_id)
+                .order_by('id').values_list('id', flat=True)[:options['chunk_size']]
+            )
+            if not chunk:
+                break
+            last_id = chunk[-1]
+            chunk_started = time.monotonic()
+            created, zero, amounts = self._process(chunk, dry_run, options['skip_hold_balance'])
+            counts['created'] += created
+            counts['zero'] += zero
+            for wallet_id, amount in amounts.items():
+                totals[wallet_id] += amount
+            self.stdout.write(
+                f"  {counts['created'] + counts['zero']}/{total}: "
+                f"{'would create' if dry_run else 'created'} {created} holds over {len(amounts)} wallets "
+                f"({sum(amounts.values(), ZERO)}), {zero} zero-amount skipped, "
+                f"{time.monotonic() - chunk_started:.2f}s"
+            )
 
+        verb = "Would create" if dry_run else "Created"
         self.stdout.write(self.style.SUCCESS(
-            f"Done! Created: {created_count}, Skipped (already exists): {skipped_count}"
+            f"Done! {verb}: {counts['created']} holds totalling {sum(totals.values(), ZERO)} over "
+            f"{len(totals)} wallets, Skipped (already exists): {existing}, zero amount: {counts['zero']}, "
+            f"no wallet: {no_wallet}, {time.monotonic() - started:.1f}s"
         ))
+
+    @staticmethod
+    def _holds():
+        """The project_milestone holds of an outer milestone, on its client's wallet"""
+        return Hold.objects.filter(
+            milestone_id=OuterRef('pk'),
+            project_id=OuterRef('project_id'),
+            wallet__user_id=OuterRef('project__client_id'),
+            hold_type='project_milestone',
+        )
+
+    def _missing(self, milestones):
+        """Anti-join: the milestones without a hold, with their client's wallet id"""
+        return (
+            milestones
+            .annotate(wallet_id=Subquery(Wallet.objects.filter(user_id=OuterRef('project__client_id')).values('id')[:1]))
+            .filter(~Exists(self._holds()))
+        )
+
+    def _process(self, milestone_ids, dry_run, skip_hold_balance):
+        """Create the holds for one chunk; returns (created, zero-amount skipped, {wallet_id: amount})"""
+        with transaction.atomic():
+            # Lock the chunk and re-run the anti-join, so a hold created since
+            # the chunk was read is not duplicated
+            list(Milestone.objects.select_for_update().filter(id__in=milestone_ids).values_list('id'))
+            rows = self._missing(Milestone.objects.filter(id__in=milestone_ids)).values(
+                'id', 'title', 'amount', 'max_hours', 'wallet_id',
+                'project_id', 'project__title', 'project__client_id',
+                'project__pricing_strategy', 'project__hourly_rate',
+            )
+
+            holds, amounts, zero = [], defaultdict(lambda: ZERO), 0
+            reference_ids = set()
+            for row in rows:
+                amount = self._amount(row)
+                if not amount or amount <= 0:
+                    zero += 1
+                    continue
+                reference_id = Hold.generate_reference_id()
+                while reference_id in reference_ids:
+                    reference_id = Hold.generate_reference_id()
+                reference_ids.add(reference_id)
+                holds.append(Hold(
+                    wallet_id=row['wallet_id'],
+                    user_id=row['project__client_id'],
+                    project_id=row['project_id'],
+                    milestone_id=row['id'],
+                    amount=amount,
+                    hold_type='project_milestone',
+                    title=f"Auto-pay hold for {row['title']}",
+                    description=f"Auto-pay hold for milestone '{row['title']}' in project '{row['project__title']}'",
+                    reference_id=reference_id,
+                ))
+                amounts[row['wallet_id']] += amount
+
+            if dry_run or not holds:
+                return len(holds), zero, amounts
+
+            Hold.objects.bulk_create(holds)
+            wallet_ids = list(amounts)
+            transaction.on_commit(lambda: WalletSummaryService.invalidate(wallet_ids))
+            if not skip_hold_balance:
+                # Like auto-pay commitments, the holds reserve hold balance without debiting the balance
+                LedgerService.apply(
+                    {wallet_id: (ZERO, amount) for wallet_id, amount in amounts.items()},
+                    counterpart=JournalService.COMMITMENTS,
+                    kind='milestone_hold_backfill',
+                    metadata={'milestone_ids': [hold.milestone_id for hold in holds]},
+                )
+        return len(holds), zero, amounts
+
+    @staticmethod
+    def _amount(row):
+        if row['project__pricing_strategy'] == 'fixed':
+            return row['amount']
+        if row['project__pricing_strategy'] == 'hourly':
+            return (row['max_hours'] or 0) * (row['project__hourly_rate'] or 0)
+        return 0
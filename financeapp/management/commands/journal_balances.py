@@ -0,0 +1,55 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from financeapp.services.journal_service import JournalService
+
+
+class Command(BaseCommand):
+    help = "Snapshot journal balances, verify wallets against the journal, or show an account's balance"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--snapshot', action='store_true',
+                            help="Checkpoint every account that moved since the last snapshot")
+        parser.add_argument('--lag-seconds', type=int, default=None,
+                            help="Leave out postings newer than this (defaults to WALLET_JOURNAL)")
+        parser.add_argument('--verify', action='store_true',
+                            help="Compare wallet, hold and platform shard balances with the journal")
+        parser.add_argument('--account', help="Account key, e.g. wallet:<id> or platform:commission")
+        parser.add_argument('--as-of', help="ISO datetime for --account (default: now)")
+
+    def handle(self, *args, **options):
+        if not (options['snapshot'] or options['verify'] or options['account']):
+            raise CommandError("Pass --snapshot, --verify and/or --account")
+        started = time.monotonic()
+
+        if options['snapshot']:
+            result = JournalService.snapshot(lag_seconds=options['lag_seconds'])
+            self.stdout.write(f"Snapshotted {result['accounts']} accounts at posting {result['posting_id']}")
+
+        if options['account']:
+            as_of = None
+            if options['as_of']:
+                as_of = parse_datetime(options['as_of'])
+                if as_of is None:
+                    raise CommandError(f"Invalid --as-of: {options['as_of']}")
+                if timezone.is_naive(as_of):
+                    as_of = timezone.make_aware(as_of)
+            balance = JournalService.balance(options['account'], as_of=as_of)
+            self.stdout.write(f"{options['account']}: {balance}" + (f" at {as_of.isoformat()}" if as_of else ""))
+
+        if options['verify']:
+            result = JournalService.verify()
+            for mismatch in result['mismatches']:
+                self.stdout.write(self.style.WARNING(
+                    f"  {mismatch['account']}: cached {mismatch['cached']}, journal {mismatch['journal']}"
+                ))
+            message = (
+                f"Verified {result['accounts']} accounts, {len(result['mismatches'])} mismatches, "
+                f"{time.monotonic() - started:.1f}s"
+            )
+            if result['mismatches']:
+                raise CommandError(message)
+            self.stdout.write(self.style.SUCCESS(message))
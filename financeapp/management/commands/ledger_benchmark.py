@@ -0,0 +1,205 @@
+import random
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from django.db.models import F
+from django.test.utils import override_settings
+
+from core.models import User
+from financeapp.models import PlatformWalletShard, Wallet, WalletTransaction
+from financeapp.services.journal_service import JournalService
+from financeapp.services.ledger_service import LedgerService
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive concurrent wallet transfers through LedgerService and verify that no update "
+        "was lost. Creates throwaway users and wallets and removes them afterwards, with a "
+        "journal entry that reverses the benchmark's postings so journal_balances --verify still passes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--wallets', type=int, default=50, help='Wallets taking part (fewer means more contention)')
+        parser.add_argument('--workers', type=int, default=16, help='Concurrent threads, each with its own connection')
+        parser.add_argument('--transfers', type=int, default=5000, help='Total transfers attempted')
+        parser.add_argument('--initial-balance', type=Decimal, default=Decimal('10000.00'))
+        parser.add_argument('--max-amount', type=int, default=500, help='Transfers are 1..max-amount')
+        parser.add_argument('--commission-rate', type=Decimal, default=Decimal('0.10'),
+                            help='Share of each transfer credited to the platform shards')
+        parser.add_argument('--naive', action='store_true',
+                            help='Use an unlocked read-modify-write instead, to show the lost updates')
+        parser.add_argument('--keep', action='store_true', help='Keep the benchmark users and wallets')
+        parser.add_argument('--any-database', action='store_true',
+                            help='Run on a database other than PostgreSQL (SQLite serialises writers)')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql' and not options['any_database']:
+            raise CommandError("The benchmark needs PostgreSQL; pass --any-database to run anyway")
+        if options['wallets'] < 2:
+            raise CommandError("--wallets must be at least 2")
+
+        run = uuid.uuid4().hex[:8]
+        initial = options['initial_balance']
+        wallet_ids, platform_user = self._setup(run, options['wallets'], initial)
+        shards_before = self._shard_totals()
+        shard_credits = Counter()
+
+        try:
+            with override_settings(PLATFORM_WALLET_USERNAME=platform_user.username):
+                started = time.perf_counter()
+                deltas, shard_credits, stats = self._run(wallet_ids, options)
+                elapsed = time.perf_counter() - started
+            self._report(wallet_ids, initial, deltas, shard_credits, shards_before, stats, elapsed, options)
+        finally:
+            if not options['keep']:
+                self._cleanup(run, wallet_ids, shard_credits)
+
+    # Setup and teardown
+
+    def _setup(self, run, count, initial):
+        users = User.objects.bulk_create([
+            User(username=f"ledger_bench_{run}_{i}", role='freelancer') for i in range(count)
+        ])
+        if not all(user.pk for user in users):
+            users = list(User.objects.filter(username__startswith=f"ledger_bench_{run}_").order_by('id'))
+        wallets = Wallet.objects.bulk_create([Wallet(user=user) for user in users])
+        # Funded through the ledger, so the journal matches the wallets
+        LedgerService.apply(
+            {wallet.id: (initial, Decimal('0.00')) for wallet in wallets},
+            kind='deposit', metadata={'benchmark': run},
+        )
+        platform_user = User.objects.create(username=f"ledger_bench_{run}_platform", role='client')
+        Wallet.objects.create(user=platform_user)
+        self.stdout.write(f"Created {len(wallets)} wallets with {initial} each (run {run})")
+        return [wallet.id for wallet in wallets], platform_user
+
+    def _cleanup(self, run, wallet_ids, shard_credits):
+        """
+        Take the benchmark's commissions back off the shared platform shards
+        and post one entry that zeroes the benchmark's journal accounts, so
+        the journal keeps matching the remaining wallets and shards.
+        """
+        accounts = [JournalService.wallet_account(wallet_id) for wallet_id in wallet_ids]
+        accounts += [JournalService.hold_account(wallet_id) for wallet_id in wallet_ids]
+        with transaction.atomic():
+            for shard, amount in shard_credits.items():
+                PlatformWalletShard.objects.filter(shard=shard).update(balance=F('balance') - amount)
+            postings = {account: -balance for account, balance in JournalService.balances(accounts).items()}
+            postings[JournalService.PLATFORM_COMMISSION] = -sum(shard_credits.values(), Decimal('0.00'))
+            postings[JournalService.EXTERNAL] = -sum(postings.values(), Decimal('0.00'))
+            JournalService.post(
+                'adjustment', postings, description="Ledger benchmark cleanup", metadata={'benchmark': run}
+            )
+            User.objects.filter(username__startswith=f"ledger_bench_{run}_").delete()
+
+    @staticmethod
+    def _shard_totals():
+        return dict(PlatformWalletShard.objects.values_list('shard', 'balance'))
+
+    # Load
+
+    def _run(self, wallet_ids, options):
+        workers = options['workers']
+        per_worker = [options['transfers'] // workers + (1 if i < options['transfers'] % workers else 0)
+                      for i in range(workers)]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(lambda n: self._worker(wallet_ids, n, options), per_worker))
+
+        deltas, shard_credits, stats = Counter(), Counter(), Counter()
+        for worker_deltas, worker_shards, worker_stats in results:
+            deltas.update(worker_deltas)
+            shard_credits.update(worker_shards)
+            stats.update(worker_stats)
+        return deltas, shard_credits, stats
+
+    def _worker(self, wallet_ids, count, options):
+        deltas, shard_credits, stats = Counter(), Counter(), Counter()
+        rng = random.Random()
+        wallets = {wallet.id: wallet for wallet in Wallet.objects.filter(id__in=wallet_ids).select_related('user')}
+        try:
+            for _ in range(count):
+                source, target = rng.sample(wallet_ids, 2)
+                amount = Decimal(rng.randint(1, options['max_amount']))
+                try:
+                    if options['naive']:
+                        self._naive_transfer(source, target, amount)
+                        commission = Decimal('0.00')
+                    else:
+                        commission = (amount * options['commission_rate']).quantize(Decimal('0.01'))
+                        # The shard is chosen here so the benchmark knows where each commission went
+                        shard = rng.randrange(settings.PLATFORM_WALLET_SHARDS)
+                        LedgerService.transfer(
+                            wallets[source], wallets[target], amount, commission=commission,
+                            description="Ledger benchmark", metadata={'benchmark': True}, shard=shard
+                        )
+                        if commission:
+                            shard_credits[shard] += commission
+                except ValueError:
+                    stats['rejected'] += 1
+                    continue
+                deltas[source] -= amount
+                deltas[target] += amount - commission
+                stats['completed'] += 1
+        finally:
+            connections.close_all()
+        return deltas, shard_credits, stats
+
+    @staticmethod
+    def _naive_transfer(source_id, target_id, amount):
+        """The pre-ledger pattern: read, change in Python, save()"""
+        source = Wallet.objects.get(id=source_id)
+        if source.balance < amount:
+            raise ValueError("Insufficient funds")
+        source.balance -= amount
+        source.save()
+        target = Wallet.objects.get(id=target_id)
+        target.balance += amount
+        target.save()
+
+    # Verification
+
+    def _report(self, wallet_ids, initial, deltas, shard_credits, shards_before, stats, elapsed, options):
+        balances = dict(Wallet.objects.filter(id__in=wallet_ids).values_list('id', 'balance'))
+        mismatched = [
+            wallet_id for wallet_id in wallet_ids
+            if balances[wallet_id] != initial + deltas.get(wallet_id, 0)
+        ]
+        commissions = sum(shard_credits.values(), Decimal('0.00'))
+        expected_total = initial * len(wallet_ids) - commissions
+        actual_total = sum(balances.values(), Decimal('0.00'))
+
+        shards_after = self._shard_totals()
+        shard_errors = [
+            shard for shard, amount in shard_credits.items()
+            if shards_after.get(shard, 0) - shards_before.get(shard, 0) != amount
+        ]
+        entries = WalletTransaction.objects.filter(wallet_id__in=wallet_ids).count()
+
+        completed = stats['completed']
+        self.stdout.write(
+            f"{completed} transfers completed, {stats['rejected']} rejected for insufficient funds "
+            f"in {elapsed:.2f}s ({completed / elapsed if elapsed else 0:.0f}/s) "
+            f"with {options['workers']} workers over {len(wallet_ids)} wallets"
+        )
+        self.stdout.write(
+            f"Wallet total {actual_total} (expected {expected_total}), "
+            f"commissions {commissions} over {len(shard_credits)} shards, {entries} wallet entries"
+        )
+
+        missing_entries = 0 if options['naive'] else 2 * completed - entries
+        if mismatched or actual_total != expected_total or shard_errors or missing_entries:
+            message = (
+                f"Lost updates: {len(mismatched)} wallets off, total drift {actual_total - expected_total}, "
+                f"{len(shard_errors)} shards off, {missing_entries} wallet entries missing"
+            )
+            if options['naive']:
+                self.stdout.write(self.style.WARNING(message))
+                return
+            raise CommandError(message)
+        self.stdout.write(self.style.SUCCESS("No lost updates"))
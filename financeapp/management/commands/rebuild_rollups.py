@@ -0,0 +1,46 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from financeapp.services.rollup_service import RollupService
+
+
+class Command(BaseCommand):
+    help = "Recompute the daily earnings/spending rollups from completed transactions"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help="First day to rebuild (YYYY-MM-DD, default: first transaction)")
+        parser.add_argument('--end', help="Last day to rebuild (YYYY-MM-DD, default: today)")
+        parser.add_argument('--days', type=int, help="Rebuild only the last N days, including today")
+
+    def handle(self, *args, **options):
+        start = self._date(options, 'start')
+        end = self._date(options, 'end')
+        if options['days'] is not None:
+            if start:
+                raise CommandError("Pass either --days or --start")
+            if options['days'] < 1:
+                raise CommandError("--days must be at least 1")
+            start = (end or timezone.localdate()) - timedelta(days=options['days'] - 1)
+        if start and end and start > end:
+            raise CommandError("--start is after --end")
+
+        started = time.monotonic()
+        result = RollupService.rebuild(start=start, end=end, stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {result['days']} days from {result['transactions']} transactions: "
+            f"{result['user_rows']} user rows, {result['project_rows']} project rows, "
+            f"{time.monotonic() - started:.1f}s"
+        ))
+
+    @staticmethod
+    def _date(options, key):
+        if not options[key]:
+            return None
+        value = parse_date(options[key])
+        if value is None:
+            raise CommandError(f"Invalid --{key}: {options[key]}")
+        return value
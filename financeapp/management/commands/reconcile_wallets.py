@@ -0,0 +1,55 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from financeapp.models import ReconciliationRun
+from financeapp.services.reconciliation_service import ReconciliationService
+
+
+class Command(BaseCommand):
+    help = (
+        "Check every wallet's balance and hold balance against the journal and its active holds. "
+        "Mismatches are stored on the run (and optionally appended to a JSONL file)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=1, help="Worker processes (default: 1, in-process)")
+        parser.add_argument('--chunk-size', type=int, default=ReconciliationService.CHUNK_SIZE,
+                            help="Wallets per chunk")
+        parser.add_argument('--resume', metavar='RUN_ID', help="Continue an interrupted run after its checkpoint")
+        parser.add_argument('--resume-last', action='store_true', help="Continue the latest unfinished run")
+        parser.add_argument('--jsonl', metavar='PATH', help="Also append the mismatches to this JSON Lines file")
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1 or options['chunk_size'] < 1:
+            raise CommandError("--workers and --chunk-size must be at least 1")
+        started = time.monotonic()
+
+        if options['resume'] or options['resume_last']:
+            runs = ReconciliationRun.objects.exclude(status='completed')
+            run = runs.filter(id=options['resume']).first() if options['resume'] else runs.first()
+            if run is None:
+                raise CommandError("No unfinished reconciliation run to resume")
+            self.stdout.write(
+                f"Resuming run {run.id} after wallet {run.last_wallet_id} "
+                f"({run.wallets_checked} wallets checked, {run.mismatch_count} mismatches so far)"
+            )
+        else:
+            run = ReconciliationService.start(chunk_size=options['chunk_size'])
+            self.stdout.write(f"Started run {run.id}")
+
+        jsonl = open(options['jsonl'], 'a') if options['jsonl'] else None
+        try:
+            run = ReconciliationService.run(run, workers=options['workers'], jsonl=jsonl, stdout=self.stdout)
+        finally:
+            if jsonl:
+                jsonl.close()
+
+        elapsed = time.monotonic() - started
+        message = (
+            f"Reconciled {run.wallets_checked} wallets, {run.mismatch_count} mismatches "
+            f"(run {run.id}), {elapsed:.1f}s"
+        )
+        if run.mismatch_count:
+            raise CommandError(message)
+        self.stdout.write(self.style.SUCCESS(message))
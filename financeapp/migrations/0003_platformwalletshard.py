@@ -0,0 +1,30 @@
+# Generated by Django 5.2.3 on 2026-10-19 05:26
+
+import django.core.validators
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('financeapp', '0002_transaction_obsp_assignment_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlatformWalletShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveSmallIntegerField(unique=True)),
+                ('balance', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14, validators=[django.core.validators.MinValueValidator(Decimal('0.00'))])),
+                ('currency', models.CharField(default='INR', max_length=3)),
+                ('last_updated', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Platform Wallet Shard',
+                'verbose_name_plural': 'Platform Wallet Shards',
+                'ordering': ['shard'],
+            },
+        ),
+    ]
@@ -0,0 +1,100 @@
+# Generated by Django 5.2.3 on 2026-10-19 05:32
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Sum
+from django.utils import timezone
+
+
+def post_opening_balances(apps, schema_editor):
+    """Open the journal with the current wallet, hold and platform shard balances"""
+    Wallet = apps.get_model('financeapp', 'Wallet')
+    PlatformWalletShard = apps.get_model('financeapp', 'PlatformWalletShard')
+    JournalEntry = apps.get_model('financeapp', 'JournalEntry')
+    JournalPosting = apps.get_model('financeapp', 'JournalPosting')
+
+    now = timezone.now()
+
+    def post(postings):
+        postings = {account: amount for account, amount in postings.items() if amount}
+        if not postings:
+            return
+        postings['external'] = -sum(postings.values())
+        entry = JournalEntry.objects.create(
+            kind='opening', description="Opening balances", created_at=now
+        )
+        JournalPosting.objects.bulk_create([
+            JournalPosting(entry=entry, account=account, amount=amount, created_at=now)
+            for account, amount in postings.items()
+        ])
+
+    wallets = Wallet.objects.order_by('id').values_list('id', 'balance', 'hold_balance')
+    postings = {}
+    for wallet_id, balance, hold_balance in wallets.iterator(chunk_size=1000):
+        postings[f"wallet:{wallet_id}"] = balance
+        postings[f"wallet:{wallet_id}:hold"] = hold_balance
+        if len(postings) >= 2000:
+            post(postings)
+            postings = {}
+    post(postings)
+    post({'platform:commission': PlatformWalletShard.objects.aggregate(total=Sum('balance'))['total']})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('financeapp', '0003_platformwalletshard'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JournalEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=32)),
+                ('description', models.TextField(blank=True)),
+                ('reference_ids', models.JSONField(default=list, help_text='WalletTransaction reference ids of this movement')),
+                ('metadata', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Journal Entry',
+                'verbose_name_plural': 'Journal Entries',
+                'ordering': ['-id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='BalanceSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('account', models.CharField(max_length=64)),
+                ('posting_id', models.BigIntegerField()),
+                ('as_of', models.DateTimeField(help_text='created_at of posting_id')),
+                ('balance', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+            ],
+            options={
+                'verbose_name': 'Balance Snapshot',
+                'verbose_name_plural': 'Balance Snapshots',
+                'indexes': [models.Index(fields=['account', 'as_of'], name='balance_snapshot_acct_time_idx'), models.Index(fields=['posting_id'], name='balance_snapshot_posting_idx')],
+                'unique_together': {('account', 'posting_id')},
+            },
+        ),
+        migrations.CreateModel(
+            name='JournalPosting',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('account', models.CharField(max_length=64)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('created_at', models.DateTimeField()),
+                ('entry', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='postings', to='financeapp.journalentry')),
+            ],
+            options={
+                'verbose_name': 'Journal Posting',
+                'verbose_name_plural': 'Journal Postings',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['account', 'id'], name='journal_posting_account_idx'), models.Index(fields=['account', 'created_at'], name='journal_posting_acct_time_idx')],
+            },
+        ),
+        migrations.RunPython(post_opening_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.3 on 2026-10-19 05:51
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('OBSP', '0013_obspmilestone_is_automated'),
+        ('core', '0012_search_document'),
+        ('financeapp', '0006_daily_rollups'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='hold',
+            index=models.Index(fields=['status', 'expires_at'], name='financeapp__status_62cfbd_idx'),
+        ),
+    ]
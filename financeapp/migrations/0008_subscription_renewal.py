@@ -0,0 +1,40 @@
+# Generated by Django 5.2.3 on 2026-10-19 05:54
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('financeapp', '0007_hold_status_expires_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubscriptionRenewal',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('idempotency_key', models.CharField(max_length=100, unique=True)),
+                ('period_end', models.DateTimeField(help_text="The subscription's end_date when this renewal was due")),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('status', models.CharField(choices=[('renewed', 'Renewed'), ('retry_scheduled', 'Retry Scheduled'), ('insufficient_funds', 'Insufficient Funds'), ('failed', 'Failed')], max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('next_retry_at', models.DateTimeField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('new_end_date', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('plan', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='renewals', to='financeapp.subscriptionplan')),
+                ('subscription', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='renewals', to='financeapp.usersubscription')),
+                ('wallet_transaction', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='subscription_renewals', to='financeapp.wallettransaction')),
+            ],
+            options={
+                'verbose_name': 'Subscription Renewal',
+                'verbose_name_plural': 'Subscription Renewals',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['subscription', 'period_end'], name='financeapp__subscri_428ea2_idx'), models.Index(fields=['status', 'next_retry_at'], name='financeapp__status_8936ed_idx'), models.Index(fields=['updated_at'], name='financeapp__updated_8f6422_idx')],
+            },
+        ),
+    ]
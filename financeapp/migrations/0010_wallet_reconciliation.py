@@ -0,0 +1,54 @@
+# Generated by Django 5.2.3 on 2026-10-19 06:00
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('financeapp', '0009_hold_wallet_page_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReconciliationRun',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='running', max_length=20)),
+                ('chunk_size', models.PositiveIntegerField()),
+                ('last_wallet_id', models.UUIDField(blank=True, null=True)),
+                ('wallets_checked', models.PositiveIntegerField(default=0)),
+                ('mismatch_count', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Reconciliation Run',
+                'verbose_name_plural': 'Reconciliation Runs',
+                'ordering': ['-started_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ReconciliationMismatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('check_type', models.CharField(choices=[('balance', 'Balance vs journal'), ('hold_balance', 'Hold balance vs journal'), ('hold_rows', 'Active holds exceed hold balance')], max_length=20)),
+                ('cached', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('expected', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('difference', models.DecimalField(decimal_places=2, help_text='cached - expected', max_digits=14)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('wallet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reconciliation_mismatches', to='financeapp.wallet')),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mismatches', to='financeapp.reconciliationrun')),
+            ],
+            options={
+                'verbose_name': 'Reconciliation Mismatch',
+                'verbose_name_plural': 'Reconciliation Mismatches',
+                'ordering': ['run', 'wallet', 'check_type'],
+                'indexes': [models.Index(fields=['run', 'check_type'], name='financeapp__run_id_20bbf4_idx')],
+            },
+        ),
+    ]
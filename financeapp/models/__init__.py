@@ -1,9 +1,15 @@
-from .subscription import SubscriptionPlan, SubscriptionPlanManager, UserSubscription, UserSubscriptionManager
-from .wallet import Wallet, WalletTransaction, WalletManager, WalletTransactionManager
+from .subscription import (
+    SubscriptionPlan, SubscriptionPlanManager, UserSubscription, UserSubscriptionManager, SubscriptionRenewal
+)
+from .wallet import Wallet, WalletTransaction, WalletManager, WalletTransactionManager, PlatformWalletShard
 from .transaction import Transaction, TransactionManager
-from .commission import CommissionTier, Commission
+from .commission import CommissionTier, Commission, SpecialCommissionRate
 from .payment import PaymentMethod, PaymentGatewayLog
 from .hold import Hold
+from .journal import JournalEntry, JournalPosting, BalanceSnapshot
+from .statement import StatementExport
+from .rollup import UserDailyRollup, ProjectDailyRollup, RolledUpTransaction
+from .reconciliation import ReconciliationRun, ReconciliationMismatch
 
 # Make models available when importing from financeapp.models
 __all__ = [
@@ -11,15 +17,27 @@ __all__ = [
     'UserSubscription',
     'SubscriptionPlanManager',
     'UserSubscriptionManager',
+    'SubscriptionRenewal',
     'Wallet',
     'WalletTransaction',
     'WalletManager',
     'WalletTransactionManager',
+    'PlatformWalletShard',
     'Transaction',
     'TransactionManager',
     'CommissionTier',
     'Commission',
+    'SpecialCommissionRate',
     'PaymentMethod',
     'PaymentGatewayLog',
     'Hold',
+    'JournalEntry',
+    'JournalPosting',
+    'BalanceSnapshot',
+    'StatementExport',
+    'UserDailyRollup',
+    'ProjectDailyRollup',
+    'RolledUpTransaction',
+    'ReconciliationRun',
+    'ReconciliationMismatch',
 ]
\ No newline at end of file
@@ -6,12 +6,9 @@ import uuid
 
 class CommissionTierManager(models.Manager):
     def get_for_amount(self, amount):
-        """Get appropriate tier for a given amount"""
-        return self.filter(
-            min_amount__lte=amount,
-            max_amount__gte=amount,
-            is_active=True
-        ).first()
+        """Get appropriate tier for a given amount (from the cached CommissionResolver table)"""
+        from ..services.commission_resolver import CommissionResolver
+        return CommissionResolver.get_tier(amount)
     
     def active_tiers(self):
         """Get all active commission tiers"""
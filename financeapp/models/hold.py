@@ -91,6 +91,8 @@ class Hold(models.Model):
             models.Index(fields=['hold_type', 'status']),
             models.Index(fields=['created_at']),
             models.Index(fields=['expires_at']),
+            models.Index(fields=['status', 'expires_at']),
+            models.Index(fields=['wallet', 'status', '-created_at']),
         ]
     
     def __str__(self):
@@ -107,49 +109,51 @@ class Hold(models.Model):
             self.reference_id = self.generate_reference_id()
         super().save(*args, **kwargs)
     
+    def _lock_active(self, action):
+        """Re-read this hold under a row lock so it is released or cancelled once"""
+        current = type(self).objects.select_for_update().only('status').get(pk=self.pk)
+        if current.status != 'active':
+            raise ValueError(f"Cannot {action} hold with status: {current.status}")
+    
     def release(self, reason="Manual release"):
         """Release this hold"""
-        if self.status != 'active':
-            raise ValueError(f"Cannot release hold with status: {self.status}")
-        
-        self.status = 'released'
-        self.released_at = timezone.now()
-        self.metadata['release_reason'] = reason
-        self.save()
+        from django.db import transaction
+        from ..services.ledger_service import LedgerService
         
-        # Update wallet hold balance
-        self.wallet.hold_balance -= self.amount
-        self.wallet.save()
-        
-        # Create wallet transaction for the release
-        from .wallet import WalletTransaction
-        WalletTransaction.objects.create(
-            wallet=self.wallet,
-            amount=self.amount,
-            transaction_type='release',
-            reference_id=WalletTransaction.generate_reference_id(),
-            description=f"Hold released: {self.title}",
-            status='completed',
-            metadata={
-                'hold_id': str(self.id),
-                'hold_type': self.hold_type,
-                'release_reason': reason
-            }
-        )
+        with transaction.atomic():
+            self._lock_active('release')
+            self.status = 'released'
+            self.released_at = timezone.now()
+            self.metadata['release_reason'] = reason
+            self.save()
+            
+            # Take the amount off the wallet's hold balance and record the release
+            LedgerService.release_hold(
+                self.wallet,
+                self.amount,
+                to_balance=False,
+                description=f"Hold released: {self.title}",
+                metadata={
+                    'hold_id': str(self.id),
+                    'hold_type': self.hold_type,
+                    'release_reason': reason
+                }
+            )
     
     def cancel(self, reason="Hold cancelled"):
         """Cancel this hold"""
-        if self.status != 'active':
-            raise ValueError(f"Cannot cancel hold with status: {self.status}")
-        
-        self.status = 'cancelled'
-        self.released_at = timezone.now()
-        self.metadata['cancel_reason'] = reason
-        self.save()
+        from django.db import transaction
+        from ..services.ledger_service import LedgerService
         
-        # Update wallet hold balance
-        self.wallet.hold_balance -= self.amount
-        self.wallet.save()
+        with transaction.atomic():
+            self._lock_active('cancel')
+            self.status = 'cancelled'
+            self.released_at = timezone.now()
+            self.metadata['cancel_reason'] = reason
+            self.save()
+            
+            # Update wallet hold balance
+            LedgerService.release_hold(self.wallet, self.amount, to_balance=False, record=False)
     
     @property
     def is_expired(self):
@@ -0,0 +1,93 @@
+from django.db import models
+from decimal import Decimal
+
+
+class AppendOnlyModel(models.Model):
+    """Rows are inserted once and never changed or deleted through the ORM"""
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError(f"{type(self).__name__} rows are append-only")
+        kwargs['force_insert'] = True
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError(f"{type(self).__name__} rows are append-only")
+
+
+class JournalEntry(AppendOnlyModel):
+    """
+    One money movement: a set of postings whose amounts sum to zero.
+
+    Written by LedgerService in the same database transaction as the
+    wallet balance change it records.
+    """
+    kind = models.CharField(max_length=32)
+    description = models.TextField(blank=True)
+    reference_ids = models.JSONField(default=list, help_text="WalletTransaction reference ids of this movement")
+    metadata = models.JSONField(default=dict)
+    created_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        verbose_name = "Journal Entry"
+        verbose_name_plural = "Journal Entries"
+        ordering = ['-id']
+
+    def __str__(self):
+        return f"Journal entry {self.id} ({self.kind})"
+
+
+class JournalPosting(AppendOnlyModel):
+    """
+    A signed change to one account's balance.
+
+    Accounts are plain keys: ``wallet:<id>`` (available balance),
+    ``wallet:<id>:hold`` (held balance), ``platform:commission`` (the
+    platform wallet shards), ``commitments`` (auto-pay commitments) and
+    ``external`` (money entering or leaving the platform).
+    """
+    entry = models.ForeignKey(JournalEntry, on_delete=models.PROTECT, related_name='postings')
+    account = models.CharField(max_length=64)
+    amount = models.DecimalField(max_digits=14, decimal_places=2)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "Journal Posting"
+        verbose_name_plural = "Journal Postings"
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['account', 'id'], name='journal_posting_account_idx'),
+            models.Index(fields=['account', 'created_at'], name='journal_posting_acct_time_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.account} {self.amount:+}"
+
+
+class BalanceSnapshot(AppendOnlyModel):
+    """
+    An account's balance after every posting up to and including ``posting_id``.
+
+    Snapshots are taken together for all accounts that moved since the
+    previous run, so point-in-time balances only sum the postings after the
+    nearest snapshot.
+    """
+    account = models.CharField(max_length=64)
+    posting_id = models.BigIntegerField()
+    as_of = models.DateTimeField(help_text="created_at of posting_id")
+    balance = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+
+    class Meta:
+        verbose_name = "Balance Snapshot"
+        verbose_name_plural = "Balance Snapshots"
+        unique_together = ('account', 'posting_id')
+        indexes = [
+            models.Index(fields=['account', 'as_of'], name='balance_snapshot_acct_time_idx'),
+            models.Index(fields=['posting_id'], name='balance_snapshot_posting_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.account} = {self.balance} at posting {self.posting_id}"
@@ -0,0 +1,63 @@
+from django.db import models
+import uuid
+
+
+class ReconciliationRun(models.Model):
+    """
+    One run of ``manage.py reconcile_wallets``.
+
+    Wallets are checked in id order; ``last_wallet_id`` is the highest id
+    whose chunk has been recorded, so an interrupted run resumes after it.
+    """
+    STATUS_CHOICES = [
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='running')
+    chunk_size = models.PositiveIntegerField()
+    last_wallet_id = models.UUIDField(null=True, blank=True)
+    wallets_checked = models.PositiveIntegerField(default=0)
+    mismatch_count = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    started_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Reconciliation Run"
+        verbose_name_plural = "Reconciliation Runs"
+        ordering = ['-started_at']
+
+    def __str__(self):
+        return f"Reconciliation {self.id} - {self.status} ({self.wallets_checked} wallets, {self.mismatch_count} mismatches)"
+
+
+class ReconciliationMismatch(models.Model):
+    """A wallet whose cached balance disagrees with what its journal or holds add up to"""
+    CHECK_CHOICES = [
+        ('balance', 'Balance vs journal'),
+        ('hold_balance', 'Hold balance vs journal'),
+        ('hold_rows', 'Active holds exceed hold balance'),
+    ]
+
+    run = models.ForeignKey(ReconciliationRun, on_delete=models.CASCADE, related_name='mismatches')
+    wallet = models.ForeignKey('financeapp.Wallet', on_delete=models.CASCADE, related_name='reconciliation_mismatches')
+    check_type = models.CharField(max_length=20, choices=CHECK_CHOICES)
+    cached = models.DecimalField(max_digits=14, decimal_places=2)
+    expected = models.DecimalField(max_digits=14, decimal_places=2)
+    difference = models.DecimalField(max_digits=14, decimal_places=2, help_text="cached - expected")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Reconciliation Mismatch"
+        verbose_name_plural = "Reconciliation Mismatches"
+        ordering = ['run', 'wallet', 'check_type']
+        indexes = [
+            models.Index(fields=['run', 'check_type']),
+        ]
+
+    def __str__(self):
+        return f"{self.check_type} mismatch on wallet {self.wallet_id}: {self.cached} vs {self.expected}"
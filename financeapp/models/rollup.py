@@ -0,0 +1,83 @@
+from django.db import models
+from django.conf import settings
+from decimal import Decimal
+
+
+class DailyRollupFields(models.Model):
+    """
+    Totals of a user's completed transactions on one day (in TIME_ZONE).
+
+    ``credits`` are net amounts received, ``debits`` amounts paid and
+    ``commission`` the platform fees taken from the amounts received.
+    """
+    day = models.DateField()
+    credits = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    debits = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    commission = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    credit_count = models.IntegerField(default=0)
+    debit_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        abstract = True
+
+
+class UserDailyRollup(DailyRollupFields):
+    """Per-user daily totals, maintained by ``RollupService`` as transactions complete"""
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='daily_rollups')
+
+    class Meta:
+        verbose_name = "User Daily Rollup"
+        verbose_name_plural = "User Daily Rollups"
+        unique_together = ('user', 'day')
+        ordering = ['-day']
+
+    def __str__(self):
+        return f"{self.user.username} {self.day}: +{self.credits} -{self.debits}"
+
+
+class ProjectDailyRollup(DailyRollupFields):
+    """Per-user, per-project daily totals for transactions linked to a project"""
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='project_daily_rollups')
+    project = models.ForeignKey('core.Project', on_delete=models.CASCADE, related_name='daily_rollups')
+
+    class Meta:
+        verbose_name = "Project Daily Rollup"
+        verbose_name_plural = "Project Daily Rollups"
+        unique_together = ('user', 'project', 'day')
+        ordering = ['-day']
+        indexes = [
+            models.Index(fields=['project', 'day'], name='project_rollup_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} / project {self.project_id} {self.day}: +{self.credits} -{self.debits}"
+
+
+class RolledUpTransaction(models.Model):
+    """
+    A completed transaction as counted in the rollups.
+
+    Keeps the values that were added, so a transaction that stops being
+    completed (or whose amounts change) is taken out exactly as it went in.
+    """
+    transaction = models.OneToOneField(
+        'financeapp.Transaction', on_delete=models.CASCADE, primary_key=True, related_name='rollup_entry'
+    )
+    day = models.DateField()
+    from_user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    to_user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    project = models.ForeignKey('core.Project', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    net_amount = models.DecimalField(max_digits=12, decimal_places=2)
+    platform_fee_amount = models.DecimalField(max_digits=12, decimal_places=2)
+
+    class Meta:
+        verbose_name = "Rolled Up Transaction"
+        verbose_name_plural = "Rolled Up Transactions"
+        indexes = [
+            models.Index(fields=['day'], name='rolled_up_transaction_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"Transaction {self.transaction_id} counted on {self.day}"
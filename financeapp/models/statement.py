@@ -0,0 +1,49 @@
+from django.db import models
+from django.conf import settings
+import uuid
+
+
+class StatementExport(models.Model):
+    """
+    A statement export written in the background by
+    ``financeapp.tasks.generate_statement_export`` to STATEMENT_EXPORT_ROOT.
+    """
+    SOURCE_CHOICES = [
+        ('wallet', 'Wallet Transactions'),
+        ('platform', 'Platform Transactions'),
+    ]
+
+    FORMAT_CHOICES = [
+        ('csv', 'CSV'),
+        ('jsonl', 'JSON Lines'),
+    ]
+
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='statement_exports')
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES)
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES)
+    filters = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    file_name = models.CharField(max_length=255, blank=True)
+    row_count = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Statement Export"
+        verbose_name_plural = "Statement Exports"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_source_display()} export ({self.format}) for {self.user.username} - {self.status}"
@@ -214,4 +214,63 @@ class UserSubscription(models.Model):
         self.is_active = False
         self.auto_renew = False
         self.save()
-        return True
\ No newline at end of file
+        return True
+
+class SubscriptionRenewal(models.Model):
+    """
+    The renewal of one subscription period, written by
+    ``financeapp.services.renewal_service.RenewalService``.
+
+    ``idempotency_key`` identifies the period being renewed (the
+    subscription and the ``end_date`` it had), and is also the reference of
+    the wallet charge, so a period is charged at most once however often the
+    renewal is retried.
+    """
+    STATUS_CHOICES = [
+        ('renewed', 'Renewed'),
+        ('retry_scheduled', 'Retry Scheduled'),
+        ('insufficient_funds', 'Insufficient Funds'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    subscription = models.ForeignKey(
+        UserSubscription,
+        on_delete=models.CASCADE,
+        related_name='renewals'
+    )
+    plan = models.ForeignKey(
+        SubscriptionPlan,
+        on_delete=models.PROTECT,
+        related_name='renewals'
+    )
+    idempotency_key = models.CharField(max_length=100, unique=True)
+    period_end = models.DateTimeField(help_text="The subscription's end_date when this renewal was due")
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES)
+    attempts = models.PositiveIntegerField(default=0)
+    next_retry_at = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    wallet_transaction = models.ForeignKey(
+        'financeapp.WalletTransaction',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='subscription_renewals'
+    )
+    new_end_date = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Subscription Renewal"
+        verbose_name_plural = "Subscription Renewals"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['subscription', 'period_end']),
+            models.Index(fields=['status', 'next_retry_at']),
+            models.Index(fields=['updated_at']),
+        ]
+
+    def __str__(self):
+        return f"Renewal of {self.subscription_id} for {self.period_end:%Y-%m-%d} - {self.status}"
@@ -305,6 +305,9 @@ class Transaction(models.Model):
             models.Index(fields=['id_verified']),
             models.Index(fields=['commission_tier']),
             models.Index(fields=['subscription']),
+            # Keyset history for either side of a transaction
+            models.Index(fields=['to_user', '-created_at', '-id'], name='txn_to_user_history_idx'),
+            models.Index(fields=['from_user', '-created_at', '-id'], name='txn_from_user_history_idx'),
         ]
     
     def __str__(self):
@@ -66,113 +66,43 @@ class Wallet(models.Model):
     def __str__(self):
         return f"{self.user.username}'s Wallet ({self.currency} {self.balance})"
     
+    # Balance changes go through LedgerService, which locks the row and
+    # applies them with F() updates; the instance is refreshed afterwards.
+
     def deposit(self, amount, description="Deposit", reference_id=None):
         """Add funds to wallet"""
-        if amount <= 0:
-            raise ValueError("Amount must be positive")
-        
-        self.balance += Decimal(str(amount))
-        self.last_updated = timezone.now()
-        self.save()
-        
-        # Create transaction record
-        tx = WalletTransaction.objects.create(
-            wallet=self,
-            amount=amount,
-            transaction_type='credit',
-            status='completed',
-            description=description,
-            reference_id=reference_id
+        from ..services.ledger_service import LedgerService
+        return LedgerService.credit(
+            self, amount, transaction_type='credit', description=description, reference_id=reference_id
         )
-        return tx
     
     def withdraw(self, amount, description="Withdrawal"):
         """Remove funds from wallet"""
-        amount = Decimal(str(amount))
-        if amount <= 0:
-            raise ValueError("Amount must be positive")
-        
-        if self.balance < amount:
-            raise ValueError("Insufficient funds")
-        
-        self.balance -= amount
-        self.save()
-        
-        # Create transaction record
-        WalletTransaction.objects.create(
-            wallet=self,
-            amount=amount,
-            transaction_type='withdrawal',
-            reference_id=WalletTransaction.generate_reference_id(),
-            description=description,
-            status='completed'
-        )
+        from ..services.ledger_service import LedgerService
+        LedgerService.debit(self, amount, transaction_type='withdrawal', description=description)
         return True
     
     def hold(self, amount, description="Payment hold"):
         """Place a hold on funds for pending transactions"""
-        amount = Decimal(str(amount))
-        if amount <= 0:
-            raise ValueError("Amount must be positive")
-        
-        if self.balance < amount:
-            raise ValueError("Insufficient funds")
-        
-        self.balance -= amount
-        self.hold_balance += amount
-        self.save()
-        
-        # Create transaction record
-        WalletTransaction.objects.create(
-            wallet=self,
-            amount=amount,
-            transaction_type='hold',
-            reference_id=WalletTransaction.generate_reference_id(),
-            description=description,
-            status='pending'
-        )
+        from ..services.ledger_service import LedgerService
+        LedgerService.hold(self, amount, description=description)
         return True
     
     def release_hold(self, amount, description="Hold released"):
         """Release held funds back to available balance"""
-        amount = Decimal(str(amount))
-        if amount <= 0:
-            raise ValueError("Amount must be positive")
-        
-        if self.hold_balance < amount:
-            raise ValueError("Hold amount exceeds held balance")
-        
-        self.hold_balance -= amount
-        self.balance += amount
-        self.save()
-        
-        # Create transaction record
-        WalletTransaction.objects.create(
-            wallet=self,
-            amount=amount,
-            transaction_type='release',
-            reference_id=WalletTransaction.generate_reference_id(),
-            description=description,
-            status='completed'
-        )
+        from ..services.ledger_service import LedgerService
+        LedgerService.release_hold(self, amount, description=description)
         return True
     
     def transfer(self, to_wallet, amount, description="Wallet transfer"):
         """Transfer funds to another wallet"""
-        from django.db import transaction
-        
-        amount = Decimal(str(amount))
-        if amount <= 0:
-            raise ValueError("Amount must be positive")
-        
-        if self.balance < amount:
-            raise ValueError("Insufficient funds")
-        
-        # Ensure atomic transaction
-        with transaction.atomic():
-            self.withdraw(amount, f"Transfer to {to_wallet.user.username}")
-            to_wallet.deposit(amount, f"Transfer from {self.user.username}")
-        
+        from ..services.ledger_service import LedgerService
+        LedgerService.transfer(
+            self, to_wallet, amount,
+            description=f"Transfer to {to_wallet.user.username}",
+            credit_description=f"Transfer from {self.user.username}",
+            debit_type='withdrawal', credit_type='credit'
+        )
         return True
     
     @property
@@ -194,66 +124,41 @@ class Wallet(models.Model):
     
     def process_obsp_purchase(self, amount, description="OBSP Purchase"):
         """Process OBSP purchase from wallet"""
-        amount = Decimal(str(amount))
-        if amount <= 0:
-            raise ValueError("Amount must be positive")
-        
-        if self.balance < amount:
-            raise ValueError("Insufficient funds")
-        
-        self.balance -= amount
-        self.save()
-        
-        # Create transaction record with new type
-        tx = WalletTransaction.objects.create(
-            wallet=self,
-            amount=amount,
-            transaction_type='obsp_purchase',  # Use new type
-            reference_id=WalletTransaction.generate_reference_id(),
-            description=description,
-            status='completed'
-        )
-        return tx
+        from ..services.ledger_service import LedgerService
+        return LedgerService.debit(self, amount, transaction_type='obsp_purchase', description=description)
     
     def create_hold(self, hold_type, amount, title, description, **kwargs):
         """Create a new hold on wallet funds"""
+        from django.db import transaction
         from .hold import Hold
+        from ..services.ledger_service import LedgerService
         
         amount = Decimal(str(amount))
         if amount <= 0:
             raise ValueError("Amount must be positive")
         
-        if self.balance < amount:
-            raise ValueError("Insufficient funds")
-        
-        # Create the hold record
-        hold = Hold.objects.create(
-            wallet=self,
-            hold_type=hold_type,
-            amount=amount,
-            title=title,
-            description=description,
-            **kwargs
-        )
-        
-        # Update wallet balance
-        self.balance -= amount
-        self.hold_balance += amount
-        self.save()
-        
-        # Create wallet transaction
-        WalletTransaction.objects.create(
-            wallet=self,
-            amount=amount,
-            transaction_type='hold',
-            reference_id=WalletTransaction.generate_reference_id(),
-            description=f"Hold created: {title}",
-            status='pending',
-            metadata={
-                'hold_id': str(hold.id),
-                'hold_type': hold_type
-            }
-        )
+        with transaction.atomic():
+            # Create the hold record
+            hold = Hold.objects.create(
+                wallet=self,
+                hold_type=hold_type,
+                amount=amount,
+                title=title,
+                description=description,
+                **kwargs
+            )
+            
+            # Move the funds and record the wallet transaction; raises (and
+            # rolls back the hold) if the balance is insufficient
+            LedgerService.hold(
+                self,
+                amount,
+                description=f"Hold created: {title}",
+                metadata={
+                    'hold_id': str(hold.id),
+                    'hold_type': hold_type
+                }
+            )
         
         return hold
     
@@ -344,6 +249,7 @@ class WalletTransaction(models.Model):
             models.Index(fields=['wallet', 'transaction_type']),
             models.Index(fields=['status', 'timestamp']),
             models.Index(fields=['reference_id']),
+            models.Index(fields=['wallet', '-timestamp', '-id'], name='wallet_tx_history_idx'),
         ]
     
     def __str__(self):
@@ -378,4 +284,32 @@ class WalletTransaction(models.Model):
     @property
     def is_debit(self):
         """Check if transaction removes money from wallet"""
-        return self.transaction_type in ['withdrawal', 'payment', 'hold', 'commission', 'subscription']
\ No newline at end of file
+        return self.transaction_type in ['withdrawal', 'payment', 'hold', 'commission', 'subscription']
+
+class PlatformWalletShard(models.Model):
+    """
+    One of ``PLATFORM_WALLET_SHARDS`` sub-accounts of the platform
+    commission wallet.
+
+    Every wallet payment credits its commission to the platform. With a single
+    row that credit serialises all payments on one lock, so commissions are
+    spread over the shards instead. The platform balance is the ``platform``
+    user's wallet plus the sum of the shards.
+    """
+    shard = models.PositiveSmallIntegerField(unique=True)
+    balance = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        validators=[MinValueValidator(Decimal('0.00'))]
+    )
+    currency = models.CharField(max_length=3, default='INR')
+    last_updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Platform Wallet Shard"
+        verbose_name_plural = "Platform Wallet Shards"
+        ordering = ['shard']
+
+    def __str__(self):
+        return f"Platform shard {self.shard} ({self.currency} {self.balance})"
@@ -0,0 +1,182 @@
+import threading
+from bisect import bisect_left, bisect_right
+from decimal import Decimal, InvalidOperation
+
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+
+from ..models import CommissionTier, SpecialCommissionRate
+
+
+def _amount(amount):
+    try:
+        amount = Decimal(str(amount))
+    except InvalidOperation:
+        raise ValueError(f"Invalid amount: {amount}")
+    if not amount.is_finite():
+        raise ValueError(f"Invalid amount: {amount}")
+    return amount
+
+
+class CommissionTable:
+    """
+    Immutable snapshot of the active commission tiers and special rates.
+
+    Tiers are sorted by ``(min_amount, id)``. ``tier_for()`` returns the same
+    tier as ``CommissionTier.objects.get_for_amount()``, the first by
+    ``min_amount`` whose range contains the amount, with two bisections: one
+    over the minimums, one over the running maximum of the maximums (the
+    first tier whose running maximum reaches the amount is the first whose
+    own maximum does).
+
+    The tier and rate instances are shared between threads and must be
+    treated as read-only.
+    """
+    __slots__ = ('version', 'tiers', 'mins', 'running_max', 'user_rates', 'category_rates')
+
+    def __init__(self, version, tiers, special_rates):
+        tiers = sorted(tiers, key=lambda tier: (tier.min_amount, str(tier.id)))
+        running_max, highest = [], None
+        for tier in tiers:
+            highest = tier.max_amount if highest is None else max(highest, tier.max_amount)
+            running_max.append(highest)
+
+        user_rates, category_rates = {}, {}
+        # Newest first, so the newest rate that has not ended wins
+        for rate in sorted(special_rates, key=lambda rate: rate.start_date, reverse=True):
+            if rate.user_id:
+                user_rates.setdefault(rate.user_id, []).append(rate)
+            elif rate.category_id:
+                category_rates.setdefault(rate.category_id, []).append(rate)
+
+        set_ = object.__setattr__
+        set_(self, 'version', version)
+        set_(self, 'tiers', tuple(tiers))
+        set_(self, 'mins', tuple(tier.min_amount for tier in tiers))
+        set_(self, 'running_max', tuple(running_max))
+        set_(self, 'user_rates', {key: tuple(rates) for key, rates in user_rates.items()})
+        set_(self, 'category_rates', {key: tuple(rates) for key, rates in category_rates.items()})
+
+    def __setattr__(self, name, value):
+        raise AttributeError("CommissionTable is immutable")
+
+    def tier_for(self, amount):
+        last_candidate = bisect_right(self.mins, amount) - 1
+        first_covering = bisect_left(self.running_max, amount)
+        if first_covering <= last_candidate:
+            return self.tiers[first_covering]
+        return None
+
+    def special_rate_for(self, user_id=None, category_id=None, now=None):
+        """The user's special rate, else the category's, that has started and not ended"""
+        now = now or timezone.now()
+        for rates in (self.user_rates.get(user_id, ()), self.category_rates.get(category_id, ())):
+            for rate in rates:
+                if rate.start_date <= now and (rate.end_date is None or rate.end_date > now):
+                    return rate
+        return None
+
+
+class CommissionResolver:
+    """
+    Commission tiers and special rates, loaded once per process.
+
+    Every ``table()`` compares the snapshot's version with the shared
+    ``VERSION_KEY`` (one cache read) and reloads only when it moved;
+    ``invalidate()`` is called after commit whenever a tier or special rate
+    is saved or deleted. Resolving an amount then needs no queries.
+    """
+    VERSION_KEY = 'commission:version'
+
+    _lock = threading.Lock()
+    _table = None
+
+    @staticmethod
+    def table():
+        version = cache.get(CommissionResolver.VERSION_KEY, 1)
+        table = CommissionResolver._table
+        if table is not None and table.version == version:
+            return table
+        with CommissionResolver._lock:
+            table = CommissionResolver._table
+            if table is None or table.version != version:
+                table = CommissionResolver._build(version)
+                CommissionResolver._table = table
+        return table
+
+    @staticmethod
+    def _build(version):
+        tiers = list(CommissionTier.objects.filter(is_active=True))
+        special_rates = list(
+            SpecialCommissionRate.objects.filter(is_active=True)
+            .filter(Q(end_date__isnull=True) | Q(end_date__gt=timezone.now()))
+        )
+        return CommissionTable(version, tiers, special_rates)
+
+    @staticmethod
+    def invalidate():
+        try:
+            cache.incr(CommissionResolver.VERSION_KEY)
+        except ValueError:
+            cache.set(CommissionResolver.VERSION_KEY, 2, timeout=None)
+
+    @staticmethod
+    def get_tier(amount):
+        """The active tier whose range contains ``amount``, or None"""
+        return CommissionResolver.table().tier_for(_amount(amount))
+
+    @staticmethod
+    def quote(amount, user_type=None, user=None, category=None, table=None):
+        """
+        The commission on ``amount``: a special rate for ``user`` or
+        ``category`` if one applies, otherwise the tier's percentage, flat fee
+        and ``user_type`` discount. Raises ValueError if no tier covers it.
+        """
+        table = table or CommissionResolver.table()
+        amount = _amount(amount)
+        special_rate = table.special_rate_for(
+            user_id=getattr(user, 'pk', user), category_id=getattr(category, 'pk', category)
+        )
+        if special_rate is not None:
+            commission = special_rate.calculate_commission(amount).quantize(Decimal('0.01'))
+            tier, percentage = None, special_rate.percentage
+        else:
+            tier = table.tier_for(amount)
+            if tier is None:
+                raise ValueError(f"No applicable commission tier for {amount}")
+            commission = tier.calculate_commission(amount, user_type)
+            percentage = tier.percentage
+        return {
+            'amount': amount,
+            'user_type': user_type,
+            'commission': commission,
+            'net_amount': amount - commission,
+            'percentage': percentage,
+            'tier': tier,
+            'special_rate': special_rate,
+        }
+
+    @staticmethod
+    def quote_commissions(amounts, user_types=None, user=None, category=None):
+        """
+        Quote many amounts against one snapshot, for checkout previews and bulk
+        payouts. ``user_types`` is one type for every amount or a sequence
+        parallel to ``amounts``. An amount no tier covers gets an ``error``.
+        """
+        amounts = list(amounts)
+        if user_types is None or isinstance(user_types, str):
+            user_types = [user_types] * len(amounts)
+        else:
+            user_types = list(user_types)
+            if len(user_types) != len(amounts):
+                raise ValueError("user_types must match amounts")
+
+        table = CommissionResolver.table()
+        quotes = []
+        for amount, user_type in zip(amounts, user_types):
+            try:
+                quotes.append(CommissionResolver.quote(amount, user_type, user, category, table=table))
+            except ValueError as e:
+                quotes.append({'amount': amount, 'user_type': user_type, 'error': str(e)})
+        return quotes
@@ -1,18 +1,15 @@
 from decimal import Decimal
-from django.db import transaction
+from django.db import models, transaction
 from ..models import CommissionTier, Commission, Transaction
 from django.core.exceptions import ValidationError
+from .commission_resolver import CommissionResolver
 
 class CommissionService:
     @staticmethod
     def get_applicable_tier(amount):
         """Get the appropriate commission tier for a given amount"""
         try:
-            tier = CommissionTier.objects.filter(
-                min_amount__lte=amount,
-                max_amount__gte=amount,
-                is_active=True
-            ).first()
+            tier = CommissionResolver.get_tier(amount)
             
             if not tier:
                 raise ValidationError("No applicable commission tier found")
@@ -21,22 +18,47 @@ class CommissionService:
         except Exception as e:
             raise ValidationError(f"Error determining commission tier: {str(e)}")
 
+    @staticmethod
+    def quote_commissions(amounts, user_types=None, user=None, category=None):
+        """Quote the commission on many amounts at once (see CommissionResolver.quote_commissions)"""
+        return CommissionResolver.quote_commissions(amounts, user_types, user=user, category=category)
+
+    @staticmethod
+    def quote_payment(amount, to_user, category=None):
+        """
+        The commission on a payment of ``amount`` to ``to_user``, the payee it
+        is charged to: their special rate, or the project category's, else the
+        tier with the discount for their role. ``calculate_commission`` bills
+        exactly this quote.
+        """
+        return CommissionResolver.quote(
+            amount,
+            user_type=getattr(to_user, 'role', None),
+            user=to_user,
+            category=category,
+        )
+
     @staticmethod
     @transaction.atomic
     def calculate_commission(transaction_obj):
-        """Calculate commission for a transaction"""
-        amount = transaction_obj.amount
-        tier = CommissionService.get_applicable_tier(amount)
-        
-        # Calculate commission amount
-        commission_amount = (Decimal(str(amount)) * Decimal(str(tier.percentage))) / Decimal('100.0')
+        """Calculate commission for a transaction, charged to the receiving user"""
+        project = transaction_obj.project
+        try:
+            quote = CommissionService.quote_payment(
+                transaction_obj.amount,
+                transaction_obj.to_user,
+                category=project.domain_id if project else None,
+            )
+        except ValueError as e:
+            raise ValidationError(f"Error determining commission tier: {str(e)}")
         
         # Create commission record
         commission = Commission.objects.create(
             transaction=transaction_obj,
-            amount=commission_amount,
-            percentage=tier.percentage,
-            tier=tier
+            amount=quote['commission'],
+            percentage=quote['percentage'],
+            tier=quote['tier'],
+            special_rate=quote['special_rate']
         )
         
         return commission
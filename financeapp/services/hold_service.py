@@ -0,0 +1,158 @@
+import logging
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from ..models import Wallet, WalletTransaction
+from ..models.hold import Hold
+from .journal_service import JournalService
+from .ledger_service import LedgerService
+
+logger = logging.getLogger(__name__)
+
+ZERO = Decimal('0.00')
+
+
+class HoldService:
+    """
+    Expires active holds whose ``expires_at`` has passed.
+
+    The sweeper walks the ``(status, expires_at)`` index a chunk at a time.
+    Each chunk is one database transaction: the holds are locked with
+    ``SKIP LOCKED`` (a hold being released or cancelled right now is left to
+    that request), marked expired with a single UPDATE, taken off their
+    wallets' hold balances with grouped ``LedgerService.apply()`` calls and
+    recorded as bulk-created ``release`` wallet transactions. Only active
+    holds are picked, so running it again, or concurrently, expires nothing
+    twice.
+
+    An expired hold unwinds the way it was made. Funded holds (created with
+    ``Wallet.create_hold``) moved money from the balance, which gets it back,
+    like ``Wallet.release_hold``. Commitment holds only reserved hold balance
+    against the commitments account, so that reservation is reversed.
+    """
+    CHUNK_SIZE = 500
+    COMMITMENT_HOLD_TYPES = ('project_milestone', 'auto_pay_commitment')
+
+    @staticmethod
+    def expire_due(now=None, chunk_size=None, stdout=None):
+        """
+        Expire every active hold with ``expires_at <= now``. Returns
+        ``{'holds': n, 'amount': Decimal, 'wallets': n, 'skipped': n, 'chunks': n}``;
+        ``skipped`` counts holds left active because their wallet's hold
+        balance is smaller than what they hold.
+        """
+        now = now or timezone.now()
+        chunk_size = chunk_size or HoldService.CHUNK_SIZE
+        totals = {'holds': 0, 'amount': ZERO, 'wallets': 0, 'skipped': 0, 'chunks': 0}
+        wallet_ids = set()
+        cursor = None
+        while True:
+            result = HoldService._expire_chunk(now, chunk_size, cursor)
+            if result is None:
+                break
+            cursor = result['cursor']
+            wallet_ids |= result['wallet_ids']
+            totals['chunks'] += 1
+            for key in ('holds', 'amount', 'skipped'):
+                totals[key] += result[key]
+            if stdout:
+                stdout.write(
+                    f"Chunk {totals['chunks']}: expired {result['holds']} holds ({result['amount']}) "
+                    f"on {len(result['wallet_ids'])} wallets, skipped {result['skipped']}"
+                )
+        totals['wallets'] = len(wallet_ids)
+        if totals['holds'] or totals['skipped']:
+            logger.info(f"Expired holds due by {now.isoformat()}: {totals}")
+        return totals
+
+    @staticmethod
+    def _expire_chunk(now, chunk_size, cursor):
+        """Expire the next chunk after ``cursor`` ((expires_at, id)); returns None when nothing is due"""
+        with transaction.atomic():
+            due = Hold.objects.filter(status='active', expires_at__lte=now)
+            if cursor:
+                due = due.filter(Q(expires_at__gt=cursor[0]) | Q(expires_at=cursor[0], id__gt=cursor[1]))
+            holds = list(
+                due.select_for_update(skip_locked=True)
+                .order_by('expires_at', 'id')
+                .values('id', 'wallet_id', 'amount', 'hold_type', 'title', 'expires_at')[:chunk_size]
+            )
+            if not holds:
+                return None
+
+            by_wallet = defaultdict(list)
+            for hold in holds:
+                by_wallet[hold['wallet_id']].append(hold)
+            hold_balances = dict(
+                Wallet.objects.select_for_update().filter(id__in=list(by_wallet))
+                .order_by('id').values_list('id', 'hold_balance')
+            )
+
+            expired, skipped = [], 0
+            changes = {'funded': defaultdict(lambda: ZERO), 'commitment': defaultdict(lambda: ZERO)}
+            for wallet_id, wallet_holds in by_wallet.items():
+                amount = sum((hold['amount'] for hold in wallet_holds), ZERO)
+                if amount > hold_balances.get(wallet_id, ZERO):
+                    logger.warning(
+                        f"Not expiring {len(wallet_holds)} holds on wallet {wallet_id}: "
+                        f"they hold {amount}, the wallet's hold balance is {hold_balances.get(wallet_id)}"
+                    )
+                    skipped += len(wallet_holds)
+                    continue
+                for hold in wallet_holds:
+                    changes[HoldService._kind(hold)][wallet_id] += hold['amount']
+                expired.extend(wallet_holds)
+
+            if expired:
+                Hold.objects.filter(id__in=[hold['id'] for hold in expired], status='active').update(
+                    status='expired', released_at=now
+                )
+                reference_ids = set()
+                entries = {'funded': [], 'commitment': []}
+                for hold in expired:
+                    reference_id = WalletTransaction.generate_reference_id()
+                    while reference_id in reference_ids:
+                        reference_id = WalletTransaction.generate_reference_id()
+                    reference_ids.add(reference_id)
+                    entries[HoldService._kind(hold)].append(WalletTransaction(
+                        wallet_id=hold['wallet_id'],
+                        amount=hold['amount'],
+                        transaction_type='release',
+                        status='completed',
+                        description=f"Hold expired: {hold['title']}",
+                        reference_id=reference_id,
+                        metadata={
+                            'hold_id': str(hold['id']),
+                            'hold_type': hold['hold_type'],
+                            'release_reason': 'expired',
+                        },
+                    ))
+                if changes['funded']:
+                    # Back to the available balance; the entry only moves money within the wallets
+                    LedgerService.apply(
+                        {wallet_id: (amount, -amount) for wallet_id, amount in changes['funded'].items()},
+                        entries['funded'], kind='hold_expiry', bulk_entries=True,
+                    )
+                if changes['commitment']:
+                    LedgerService.apply(
+                        {wallet_id: (ZERO, -amount) for wallet_id, amount in changes['commitment'].items()},
+                        entries['commitment'], counterpart=JournalService.COMMITMENTS, kind='hold_expiry',
+                        bulk_entries=True,
+                    )
+
+        last = holds[-1]
+        return {
+            'cursor': (last['expires_at'], last['id']),
+            'holds': len(expired),
+            'amount': sum((hold['amount'] for hold in expired), ZERO),
+            'wallet_ids': set(changes['funded']) | set(changes['commitment']),
+            'skipped': skipped,
+        }
+
+    @staticmethod
+    def _kind(hold):
+        return 'commitment' if hold['hold_type'] in HoldService.COMMITMENT_HOLD_TYPES else 'funded'
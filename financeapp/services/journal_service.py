@@ -0,0 +1,210 @@
+import logging
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Sum
+from django.utils import timezone
+
+from ..models import BalanceSnapshot, JournalEntry, JournalPosting, PlatformWalletShard, Wallet
+
+logger = logging.getLogger(__name__)
+
+ZERO = Decimal('0.00')
+
+DEFAULT_JOURNAL_SETTINGS = {
+    # Postings newer than this are left out of a snapshot, so a transaction
+    # that commits after a later id has been snapshotted is not skipped
+    'snapshot_lag_seconds': 300,
+    'batch_size': 5000,  # accounts per snapshot/verify query
+}
+
+
+class JournalService:
+    """
+    Append-only double-entry journal behind the wallet balances.
+
+    Every LedgerService change posts one ``JournalEntry`` whose postings sum
+    to zero, so ``Wallet.balance``, ``Wallet.hold_balance`` and the platform
+    shards are projections of the journal. ``snapshot()`` checkpoints the
+    balance of every account that moved since the previous run; a balance at
+    any time is the nearest earlier snapshot plus the postings after it.
+    """
+    EXTERNAL = 'external'
+    PLATFORM_COMMISSION = 'platform:commission'
+    COMMITMENTS = 'commitments'
+
+    @staticmethod
+    def get_settings():
+        return {**DEFAULT_JOURNAL_SETTINGS, **getattr(settings, 'WALLET_JOURNAL', {})}
+
+    @staticmethod
+    def wallet_account(wallet_id):
+        return f"wallet:{wallet_id}"
+
+    @staticmethod
+    def hold_account(wallet_id):
+        return f"wallet:{wallet_id}:hold"
+
+    # Posting
+
+    @staticmethod
+    def post(kind, postings, description='', reference_ids=(), metadata=None):
+        """
+        Record ``{account: amount}`` as one entry; zero amounts are dropped.
+        Raises ValueError unless the amounts sum to zero.
+        """
+        postings = {account: Decimal(amount) for account, amount in postings.items() if amount}
+        if not postings:
+            return None
+        if sum(postings.values()) != 0:
+            raise ValueError(f"Journal entry does not balance: {postings}")
+
+        now = timezone.now()
+        with transaction.atomic():
+            entry = JournalEntry.objects.create(
+                kind=kind,
+                description=description,
+                reference_ids=list(reference_ids),
+                metadata=metadata or {},
+                created_at=now,
+            )
+            JournalPosting.objects.bulk_create([
+                JournalPosting(entry=entry, account=account, amount=amount, created_at=now)
+                for account, amount in sorted(postings.items())
+            ])
+        return entry
+
+    # Snapshots
+
+    @staticmethod
+    def snapshot(lag_seconds=None):
+        """
+        Checkpoint every account with postings since the last snapshot.
+        Returns ``{'accounts': n, 'posting_id': watermark}``.
+        """
+        config = JournalService.get_settings()
+        lag_seconds = config['snapshot_lag_seconds'] if lag_seconds is None else lag_seconds
+        previous = BalanceSnapshot.objects.aggregate(watermark=Max('posting_id'))['watermark'] or 0
+        last = (
+            JournalPosting.objects
+            .filter(id__gt=previous, created_at__lte=timezone.now() - timedelta(seconds=lag_seconds))
+            .order_by('-id').values('id', 'created_at').first()
+        )
+        if last is None:
+            return {'accounts': 0, 'posting_id': previous}
+
+        moved = dict(
+            JournalPosting.objects.filter(id__gt=previous, id__lte=last['id'])
+            .order_by().values_list('account').annotate(total=Sum('amount'))
+        )
+        accounts = list(moved)
+        snapshots = []
+        for i in range(0, len(accounts), config['batch_size']):
+            chunk = accounts[i:i + config['batch_size']]
+            prior = JournalService._latest_snapshots(chunk)
+            snapshots.extend(
+                BalanceSnapshot(
+                    account=account,
+                    posting_id=last['id'],
+                    as_of=last['created_at'],
+                    balance=(prior[account].balance if account in prior else ZERO) + moved[account],
+                )
+                for account in chunk
+            )
+        BalanceSnapshot.objects.bulk_create(snapshots, batch_size=config['batch_size'])
+        logger.info(f"Snapshotted {len(snapshots)} journal accounts at posting {last['id']}")
+        return {'accounts': len(snapshots), 'posting_id': last['id']}
+
+    @staticmethod
+    def _latest_snapshots(accounts, as_of=None):
+        """``{account: BalanceSnapshot}``, the newest one (at or before ``as_of``) per account"""
+        snapshots = BalanceSnapshot.objects.filter(account__in=accounts)
+        if as_of is not None:
+            snapshots = snapshots.filter(as_of__lte=as_of)
+        latest_ids = snapshots.order_by().values('account').annotate(last=Max('id')).values('last')
+        return {snapshot.account: snapshot for snapshot in BalanceSnapshot.objects.filter(id__in=latest_ids)}
+
+    # Reading
+
+    @staticmethod
+    def balances(accounts, as_of=None):
+        """
+        ``{account: balance}`` now or at ``as_of``: the nearest snapshot plus
+        the postings after it, in two grouped queries per batch.
+        """
+        accounts = list(accounts)
+        result = {}
+        batch_size = JournalService.get_settings()['batch_size']
+        for i in range(0, len(accounts), batch_size):
+            chunk = accounts[i:i + batch_size]
+            snapshots = JournalService._latest_snapshots(chunk, as_of)
+            by_watermark = defaultdict(list)
+            for account in chunk:
+                snapshot = snapshots.get(account)
+                by_watermark[snapshot.posting_id if snapshot else 0].append(account)
+                result[account] = snapshot.balance if snapshot else ZERO
+            # Accounts share a watermark when they were snapshotted together,
+            # so this is usually one query
+            for watermark, group in by_watermark.items():
+                tail = JournalPosting.objects.filter(account__in=group, id__gt=watermark)
+                if as_of is not None:
+                    tail = tail.filter(created_at__lte=as_of)
+                for account, total in tail.order_by().values_list('account').annotate(total=Sum('amount')):
+                    result[account] += total
+        return result
+
+    @staticmethod
+    def balance(account, as_of=None):
+        return JournalService.balances([account], as_of)[account]
+
+    @staticmethod
+    def statement(account, start, end):
+        """Opening balance at ``start``, the postings in ``(start, end]`` with running balances, and the closing balance"""
+        opening = JournalService.balance(account, as_of=start)
+        running = opening
+        lines = []
+        postings = (
+            JournalPosting.objects
+            .filter(account=account, created_at__gt=start, created_at__lte=end)
+            .select_related('entry').order_by('id')
+        )
+        for posting in postings:
+            running += posting.amount
+            lines.append({
+                'posting_id': posting.id,
+                'created_at': posting.created_at,
+                'kind': posting.entry.kind,
+                'description': posting.entry.description,
+                'reference_ids': posting.entry.reference_ids,
+                'amount': posting.amount,
+                'balance': running,
+            })
+        return {'account': account, 'opening_balance': opening, 'closing_balance': running, 'lines': lines}
+
+    # Verification
+
+    @staticmethod
+    def verify():
+        """
+        Compare the wallet balances, hold balances and platform shards with the
+        journal. Reads each account once; returns
+        ``{'accounts': n, 'mismatches': [{'account', 'cached', 'journal'}]}``.
+        """
+        cached = {}
+        for wallet_id, balance, hold_balance in Wallet.objects.values_list('id', 'balance', 'hold_balance'):
+            cached[JournalService.wallet_account(wallet_id)] = balance
+            cached[JournalService.hold_account(wallet_id)] = hold_balance
+        cached[JournalService.PLATFORM_COMMISSION] = (
+            PlatformWalletShard.objects.aggregate(total=Sum('balance'))['total'] or ZERO
+        )
+
+        journal = JournalService.balances(cached)
+        mismatches = [
+            {'account': account, 'cached': value, 'journal': journal[account]}
+            for account, value in cached.items()
+            if journal[account] != value
+        ]
+        return {'accounts': len(cached), 'mismatches': mismatches}
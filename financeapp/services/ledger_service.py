@@ -0,0 +1,261 @@
+import random
+from collections import defaultdict
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Case, DecimalField, F, Sum, Value, When
+from django.utils import timezone
+
+from ..models import PlatformWalletShard, Wallet, WalletTransaction
+from .journal_service import JournalService
+from .wallet_summary_service import WalletSummaryService
+
+ZERO = Decimal('0.00')
+
+
+def _amount(amount):
+    amount = Decimal(str(amount))
+    if amount <= 0:
+        raise ValueError("Amount must be positive")
+    return amount
+
+
+class LedgerService:
+    """
+    Applies wallet balance changes without lost updates.
+
+    Every wallet touched by an operation is locked with one
+    ``SELECT ... FOR UPDATE ORDER BY id``, so concurrent operations on the
+    same wallets always take their locks in the same order and cannot
+    deadlock. The funds checks run against the locked rows, and the balances
+    are then moved with ``F()`` updates rather than by saving values read
+    into Python. The ``WalletTransaction`` rows and a balanced
+    ``JournalEntry`` are written in the same database transaction.
+
+    Platform commissions go to a random ``PlatformWalletShard`` instead of
+    the single platform wallet, which would otherwise be locked by every
+    payment.
+    """
+
+    @staticmethod
+    def apply(changes, entries=(), counterpart=JournalService.EXTERNAL, kind=None, metadata=None,
+              bulk_entries=False):
+        """
+        Apply ``{wallet_id: (balance_delta, hold_delta)}`` atomically and write
+        the unsaved ``WalletTransaction`` objects in ``entries``. The journal
+        entry balances the wallet postings against ``counterpart``.
+        ``bulk_entries`` writes the entries with one ``bulk_create()``, which
+        skips their post_save receivers.
+
+        Raises ValueError if a balance or hold balance would go negative.
+        Returns ``{wallet_id: (balance, hold_balance)}`` after the change.
+        """
+        with transaction.atomic():
+            locked = {
+                wallet.id: wallet
+                for wallet in Wallet.objects.select_for_update()
+                .filter(id__in=list(changes)).order_by('id').only('id', 'balance', 'hold_balance')
+            }
+            missing = set(changes) - set(locked)
+            if missing:
+                raise Wallet.DoesNotExist(f"Wallets not found: {', '.join(map(str, missing))}")
+
+            balances = {}
+            for wallet_id, (balance_delta, hold_delta) in changes.items():
+                wallet = locked[wallet_id]
+                balance = wallet.balance + balance_delta
+                hold_balance = wallet.hold_balance + hold_delta
+                if balance < 0:
+                    raise ValueError("Insufficient funds")
+                if hold_balance < 0:
+                    raise ValueError("Hold amount exceeds held balance")
+                balances[wallet_id] = (balance, hold_balance)
+
+            # One grouped UPDATE for every wallet in the change
+            Wallet.objects.filter(id__in=list(changes)).update(
+                balance=F('balance') + LedgerService._by_wallet(changes, 0),
+                hold_balance=F('hold_balance') + LedgerService._by_wallet(changes, 1),
+                last_updated=timezone.now(),
+            )
+            for entry in entries:
+                if not entry.reference_id:
+                    entry.reference_id = WalletTransaction.generate_reference_id()
+            if bulk_entries:
+                WalletTransaction.objects.bulk_create(entries)
+            else:
+                # Saved one by one so the WalletTransaction post_save receivers run
+                for entry in entries:
+                    entry.save(force_insert=True)
+
+            postings = defaultdict(lambda: ZERO)
+            for wallet_id, (balance_delta, hold_delta) in changes.items():
+                postings[JournalService.wallet_account(wallet_id)] += balance_delta
+                postings[JournalService.hold_account(wallet_id)] += hold_delta
+            postings[counterpart] -= sum(postings.values(), ZERO)
+            JournalService.post(
+                kind or (entries[0].transaction_type if entries else 'adjustment'),
+                postings,
+                description=entries[0].description if entries else '',
+                reference_ids=[entry.reference_id for entry in entries],
+                metadata=metadata,
+            )
+            wallet_ids = list(changes)
+            transaction.on_commit(lambda: WalletSummaryService.invalidate(wallet_ids))
+        return balances
+
+    @staticmethod
+    def _by_wallet(changes, index):
+        """``CASE id WHEN ... THEN delta`` over ``changes``, picking the balance (0) or hold (1) delta"""
+        return Case(
+            *[When(id=wallet_id, then=Value(deltas[index])) for wallet_id, deltas in changes.items()],
+            default=Value(ZERO),
+            output_field=DecimalField(max_digits=14, decimal_places=2),
+        )
+
+    @staticmethod
+    def _sync(wallets, balances):
+        """Copy the new balances onto the caller's instances"""
+        for wallet in wallets:
+            if wallet.id in balances:
+                wallet.balance, wallet.hold_balance = balances[wallet.id]
+
+    @staticmethod
+    def _entry(wallet, amount, transaction_type, description='', reference_id=None,
+               status='completed', metadata=None):
+        return WalletTransaction(
+            wallet=wallet,
+            amount=amount,
+            transaction_type=transaction_type,
+            status=status,
+            description=description,
+            reference_id=reference_id or WalletTransaction.generate_reference_id(),
+            metadata=metadata or {},
+        )
+
+    # Single-wallet operations
+
+    @staticmethod
+    def credit(wallet, amount, transaction_type='deposit', **entry):
+        amount = _amount(amount)
+        tx = LedgerService._entry(wallet, amount, transaction_type, **entry)
+        LedgerService._sync([wallet], LedgerService.apply({wallet.id: (amount, ZERO)}, [tx]))
+        return tx
+
+    @staticmethod
+    def debit(wallet, amount, transaction_type='withdrawal', **entry):
+        amount = _amount(amount)
+        tx = LedgerService._entry(wallet, amount, transaction_type, **entry)
+        LedgerService._sync([wallet], LedgerService.apply({wallet.id: (-amount, ZERO)}, [tx]))
+        return tx
+
+    @staticmethod
+    def hold(wallet, amount, status='pending', **entry):
+        """Move ``amount`` from the available balance to the hold balance"""
+        amount = _amount(amount)
+        tx = LedgerService._entry(wallet, amount, 'hold', status=status, **entry)
+        LedgerService._sync([wallet], LedgerService.apply({wallet.id: (-amount, amount)}, [tx]))
+        return tx
+
+    @staticmethod
+    def release_hold(wallet, amount, to_balance=True, record=True, **entry):
+        """
+        Take ``amount`` off the hold balance; ``to_balance`` returns it to the
+        available balance, otherwise it leaves the wallet (it has been paid out).
+        """
+        amount = _amount(amount)
+        entries = [LedgerService._entry(wallet, amount, 'release', **entry)] if record else []
+        changes = {wallet.id: (amount if to_balance else ZERO, -amount)}
+        LedgerService._sync([wallet], LedgerService.apply(changes, entries))
+        return entries[0] if entries else None
+
+    # Transfers
+
+    @staticmethod
+    def transfer(from_wallet, to_wallet, amount, commission=ZERO, description='', metadata=None,
+                 debit_type='withdrawal', credit_type='deposit', credit_description=None, shard=None):
+        """
+        Debit ``amount`` from ``from_wallet`` and credit ``amount - commission``
+        to ``to_wallet`` in one transaction; the commission goes to a platform
+        shard (random unless ``shard`` is given). Returns ``(debit_tx, credit_tx)``.
+        """
+        amount = _amount(amount)
+        commission = Decimal(str(commission or 0))
+        if commission < 0 or commission > amount:
+            raise ValueError("Commission must be between zero and the amount")
+
+        changes = defaultdict(lambda: [ZERO, ZERO])
+        changes[from_wallet.id][0] -= amount
+        changes[to_wallet.id][0] += amount - commission
+        debit_tx = LedgerService._entry(from_wallet, amount, debit_type, description, metadata=metadata)
+        entries = [debit_tx]
+        credit_tx = None
+        if amount - commission > 0:
+            credit_tx = LedgerService._entry(
+                to_wallet, amount - commission, credit_type,
+                description if credit_description is None else credit_description, metadata=metadata
+            )
+            entries.append(credit_tx)
+
+        with transaction.atomic():
+            # The commission is the entry's imbalance, posted to the platform
+            balances = LedgerService.apply(
+                {k: tuple(v) for k, v in changes.items()}, entries,
+                counterpart=JournalService.PLATFORM_COMMISSION, kind='transfer', metadata=metadata
+            )
+            if commission > 0:
+                LedgerService.credit_platform(commission, metadata=metadata, shard=shard, journal=False)
+        LedgerService._sync([from_wallet, to_wallet], balances)
+        return debit_tx, credit_tx
+
+    # Platform commission wallet
+
+    @staticmethod
+    def platform_wallet():
+        return Wallet.objects.get(user__username=settings.PLATFORM_WALLET_USERNAME)
+
+    @staticmethod
+    def credit_platform(amount, metadata=None, shard=None, journal=True, description="Platform commission"):
+        """
+        Credit a platform commission to one shard; returns the shard number.
+        ``journal=False`` when the caller's entry already posts it.
+        """
+        amount = _amount(amount)
+        shard = random.randrange(settings.PLATFORM_WALLET_SHARDS) if shard is None else shard
+        with transaction.atomic():
+            updated = PlatformWalletShard.objects.filter(shard=shard).update(
+                balance=F('balance') + amount, last_updated=timezone.now()
+            )
+            if not updated:
+                try:
+                    with transaction.atomic():
+                        PlatformWalletShard.objects.create(shard=shard, balance=amount)
+                except IntegrityError:
+                    # Created concurrently; add to it instead
+                    PlatformWalletShard.objects.filter(shard=shard).update(balance=F('balance') + amount)
+            # The commission entry is recorded against the platform wallet, but
+            # its balance row is not touched (or locked)
+            tx = WalletTransaction.objects.create(
+                wallet=LedgerService.platform_wallet(),
+                amount=amount,
+                transaction_type='commission',
+                status='completed',
+                reference_id=WalletTransaction.generate_reference_id(),
+                description=description,
+                metadata={**(metadata or {}), 'platform_shard': shard},
+            )
+            if journal:
+                JournalService.post(
+                    'commission',
+                    {JournalService.PLATFORM_COMMISSION: amount, JournalService.EXTERNAL: -amount},
+                    description=tx.description,
+                    reference_ids=[tx.reference_id],
+                    metadata=metadata,
+                )
+        return shard
+
+    @staticmethod
+    def platform_balance():
+        """Platform wallet balance plus every commission shard"""
+        shards = PlatformWalletShard.objects.aggregate(total=Sum('balance'))['total'] or ZERO
+        return LedgerService.platform_wallet().balance + shards
@@ -2,6 +2,8 @@ from decimal import Decimal
 from django.db import transaction
 from django.core.exceptions import ValidationError
 from ..models import Transaction, PaymentMethod, PaymentGatewayLog
+from .commission_service import CommissionService
+from .ledger_service import LedgerService
 import uuid
 
 class PaymentProcessor:
@@ -57,28 +59,15 @@ class PaymentProcessor:
     @staticmethod
     def _process_wallet_payment(transaction_obj, from_user, to_user, amount, commission_amount):
         """Handle wallet-to-wallet transfers"""
-        wallet_service = WalletService()
-        
-        # Deduct from sender
-        wallet_service.process_withdrawal(
+        # Both wallets are locked in id order and updated with F() expressions;
+        # the commission is credited to one of the platform wallet's shards so
+        # concurrent payments do not queue on a single platform row
+        LedgerService.transfer(
             from_user.wallet,
-            amount,
-            {'transaction_id': transaction_obj.transaction_id}
-        )
-        
-        # Credit to receiver (minus commission)
-        wallet_service.process_deposit(
             to_user.wallet,
-            amount - commission_amount,
-            {'transaction_id': transaction_obj.transaction_id}
-        )
-        
-        # Credit commission to platform wallet
-        platform_wallet = Wallet.objects.get(user__username='platform')
-        wallet_service.process_deposit(
-            platform_wallet,
-            commission_amount,
-            {'transaction_id': transaction_obj.transaction_id}
+            amount,
+            commission=commission_amount,
+            metadata={'transaction_id': transaction_obj.transaction_id}
         )
         
         transaction_obj.status = 'completed'
@@ -0,0 +1,191 @@
+import json
+import logging
+import multiprocessing
+from collections import deque
+from decimal import Decimal
+
+from django.db import connections, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from ..models import ReconciliationMismatch, ReconciliationRun, Wallet
+from ..models.hold import Hold
+from . import reconciliation_worker
+from .journal_service import JournalService
+
+logger = logging.getLogger(__name__)
+
+ZERO = Decimal('0.00')
+
+
+class ReconciliationService:
+    """
+    Checks every wallet's cached balances against the journal and its holds.
+
+    The journal is the reference: every LedgerService change posts to
+    ``wallet:<id>`` and ``wallet:<id>:hold`` in the same database
+    transaction that moves the cached balance, and the opening balances were
+    posted when it was introduced. Wallet and transaction rows alone cannot
+    reproduce a balance (a release may or may not return funds, commitments
+    reserve hold balance without a Hold row), so active holds are checked
+    only for holding more than the hold balance.
+
+    Wallets are read in id-ordered chunks, each reconciled with a handful of
+    grouped queries, across a process pool. The parent records each chunk's
+    mismatches and advances the run's checkpoint strictly in id order, so a
+    resumed run picks up after the last recorded chunk without repeating or
+    skipping any wallet.
+    """
+    CHUNK_SIZE = 1000
+
+    # Checking
+
+    @staticmethod
+    def check_wallets(wallet_ids):
+        """
+        Reconcile the given wallets (in id order). Returns ``{'wallets': n, 'last_wallet_id': id,
+        'mismatches': [{'wallet_id', 'check', 'cached', 'expected'}]}``.
+
+        Candidates from the lock-free pass are checked again with their
+        wallet rows locked, so a change that commits between the wallet and
+        journal reads is not reported.
+        """
+        wallet_ids = list(wallet_ids)
+        candidates = {row['wallet_id'] for row in ReconciliationService._compare(wallet_ids)}
+        mismatches = []
+        if candidates:
+            with transaction.atomic():
+                locked = list(
+                    Wallet.objects.select_for_update().filter(id__in=candidates)
+                    .order_by('id').values_list('id', flat=True)
+                )
+                mismatches = ReconciliationService._compare(locked)
+        return {
+            'wallets': len(wallet_ids),
+            'last_wallet_id': wallet_ids[-1] if wallet_ids else None,
+            'mismatches': mismatches,
+        }
+
+    @staticmethod
+    def _compare(wallet_ids):
+        wallets = list(Wallet.objects.filter(id__in=wallet_ids).values_list('id', 'balance', 'hold_balance'))
+        accounts = []
+        for wallet_id, _, _ in wallets:
+            accounts += [JournalService.wallet_account(wallet_id), JournalService.hold_account(wallet_id)]
+        journal = JournalService.balances(accounts)
+        holds = dict(
+            Hold.objects.filter(wallet_id__in=wallet_ids, status='active')
+            .order_by().values_list('wallet_id').annotate(total=Sum('amount'))
+        )
+
+        mismatches = []
+        for wallet_id, balance, hold_balance in wallets:
+            checks = [
+                ('balance', balance, journal[JournalService.wallet_account(wallet_id)]),
+                ('hold_balance', hold_balance, journal[JournalService.hold_account(wallet_id)]),
+            ]
+            if holds.get(wallet_id, ZERO) > hold_balance:
+                checks.append(('hold_rows', hold_balance, holds[wallet_id]))
+            mismatches.extend(
+                {'wallet_id': wallet_id, 'check': check, 'cached': cached, 'expected': expected}
+                for check, cached, expected in checks
+                if cached != expected
+            )
+        return mismatches
+
+    # Running
+
+    @staticmethod
+    def start(chunk_size=None):
+        return ReconciliationRun.objects.create(chunk_size=chunk_size or ReconciliationService.CHUNK_SIZE)
+
+    @staticmethod
+    def chunks(after=None, chunk_size=None):
+        """Yield lists of wallet ids in id order, after ``after``"""
+        chunk_size = chunk_size or ReconciliationService.CHUNK_SIZE
+        while True:
+            wallets = Wallet.objects.order_by('id')
+            if after is not None:
+                wallets = wallets.filter(id__gt=after)
+            ids = list(wallets.values_list('id', flat=True)[:chunk_size])
+            if not ids:
+                return
+            yield ids
+            after = ids[-1]
+
+    @staticmethod
+    def run(run, workers=1, jsonl=None, stdout=None):
+        """
+        Reconcile every wallet after ``run.last_wallet_id``, recording
+        mismatches on ``run`` (and appending them to the ``jsonl`` file
+        object). Returns the finished run.
+        """
+        ReconciliationRun.objects.filter(id=run.id).update(status='running', error='', finished_at=None)
+        chunks = ReconciliationService.chunks(after=run.last_wallet_id, chunk_size=run.chunk_size)
+        try:
+            if workers > 1:
+                # Spawned workers open their own connections; close the
+                # parent's so none is shared
+                connections.close_all()
+                with multiprocessing.get_context('spawn').Pool(workers, initializer=reconciliation_worker.init) as pool:
+                    pending = deque()
+                    for ids in chunks:
+                        pending.append(pool.apply_async(reconciliation_worker.check_chunk, (ids,)))
+                        # Keep a bounded window of chunks in flight; results
+                        # are recorded in submission (id) order
+                        while len(pending) >= workers * 2:
+                            ReconciliationService._record(run, pending.popleft().get(), jsonl, stdout)
+                    while pending:
+                        ReconciliationService._record(run, pending.popleft().get(), jsonl, stdout)
+            else:
+                for ids in chunks:
+                    ReconciliationService._record(run, ReconciliationService.check_wallets(ids), jsonl, stdout)
+        except BaseException as e:
+            ReconciliationRun.objects.filter(id=run.id).update(status='failed', error=repr(e))
+            raise
+
+        ReconciliationRun.objects.filter(id=run.id).update(status='completed', finished_at=timezone.now())
+        run.refresh_from_db()
+        logger.info(f"Reconciliation {run.id}: {run.wallets_checked} wallets, {run.mismatch_count} mismatches")
+        return run
+
+    @staticmethod
+    def _record(run, result, jsonl=None, stdout=None):
+        """Store one chunk's mismatches and move the checkpoint past it"""
+        rows = [
+            ReconciliationMismatch(
+                run_id=run.id,
+                wallet_id=mismatch['wallet_id'],
+                check_type=mismatch['check'],
+                cached=mismatch['cached'],
+                expected=mismatch['expected'],
+                difference=mismatch['cached'] - mismatch['expected'],
+            )
+            for mismatch in result['mismatches']
+        ]
+        with transaction.atomic():
+            ReconciliationMismatch.objects.bulk_create(rows)
+            ReconciliationRun.objects.filter(id=run.id).update(
+                last_wallet_id=result['last_wallet_id'],
+                wallets_checked=F('wallets_checked') + result['wallets'],
+                mismatch_count=F('mismatch_count') + len(rows),
+                updated_at=timezone.now(),
+            )
+        run.last_wallet_id = result['last_wallet_id']
+        run.wallets_checked += result['wallets']
+        run.mismatch_count += len(rows)
+
+        if jsonl is not None:
+            for row in rows:
+                jsonl.write(json.dumps({
+                    'run_id': str(run.id),
+                    'wallet_id': str(row.wallet_id),
+                    'check': row.check_type,
+                    'cached': str(row.cached),
+                    'expected': str(row.expected),
+                    'difference': str(row.difference),
+                }) + '\n')
+            jsonl.flush()
+        if stdout:
+            for row in rows:
+                stdout.write(f"  {row.check_type} mismatch on wallet {row.wallet_id}: cached {row.cached}, expected {row.expected}")
@@ -0,0 +1,16 @@
+"""
+Process pool entry points for ReconciliationService.
+
+Spawned workers import this module before Django is set up, so it must
+not import models at module level.
+"""
+
+
+def init():
+    import django
+    django.setup()
+
+
+def check_chunk(wallet_ids):
+    from .reconciliation_service import ReconciliationService
+    return ReconciliationService.check_wallets(wallet_ids)
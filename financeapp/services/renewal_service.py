@@ -0,0 +1,232 @@
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Sum
+from django.utils import timezone
+
+from ..models import SubscriptionPlan, SubscriptionRenewal, UserSubscription, Wallet, WalletTransaction
+from .journal_service import JournalService
+from .ledger_service import LedgerService
+
+logger = logging.getLogger(__name__)
+
+ZERO = Decimal('0.00')
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+DEFAULT_RENEWAL_SETTINGS = {
+    'chunk_size': 500,
+    'workers': 4,  # renew_due_subscriptions tasks started per dispatch
+    'lead_hours': 24,  # renew subscriptions ending within this many hours
+    # Hours until each retry after insufficient funds; after the last one the renewal gives up
+    'retry_delays_hours': [24, 72, 168],
+}
+
+
+class RenewalService:
+    """
+    Charges and extends auto-renewing subscriptions in chunks.
+
+    Each chunk is one database transaction. The due subscriptions are
+    locked with ``SKIP LOCKED``, so any number of workers can run at once
+    and each takes different subscriptions. The chunk's wallets are locked
+    once; the charges are one grouped ``LedgerService.apply()`` plus one
+    platform shard credit, and the subscriptions and ``SubscriptionRenewal``
+    rows are written in bulk.
+
+    A renewal is identified by the subscription and the ``end_date`` being
+    renewed. Its idempotency key is also the wallet charge's unique
+    ``reference_id``, and a period with a renewal row is no longer due
+    (until a scheduled retry comes round). A retried or concurrent run can
+    therefore never charge a period twice.
+    """
+
+    @staticmethod
+    def get_settings():
+        return {**DEFAULT_RENEWAL_SETTINGS, **getattr(settings, 'SUBSCRIPTION_RENEWALS', {})}
+
+    @staticmethod
+    def idempotency_key(subscription_id, period_end):
+        return f"renewal:{subscription_id}:{(period_end - EPOCH) // timedelta(microseconds=1)}"
+
+    @staticmethod
+    def due(now=None):
+        """Auto-renewing subscriptions ending soon whose period has no renewal, or a retry that is due"""
+        now = now or timezone.now()
+        config = RenewalService.get_settings()
+        settled = SubscriptionRenewal.objects.filter(
+            subscription_id=OuterRef('pk'), period_end=OuterRef('end_date')
+        ).exclude(status='retry_scheduled', next_retry_at__lte=now)
+        return UserSubscription.objects.filter(
+            is_active=True,
+            auto_renew=True,
+            cancel_requested=False,
+            end_date__lte=now + timedelta(hours=config['lead_hours']),
+        ).exclude(Exists(settled))
+
+    @staticmethod
+    def process_due(now=None, chunk_size=None, max_chunks=None, stdout=None):
+        """
+        Renew due subscriptions until none are left (or ``max_chunks``).
+        Returns the counts per renewal status plus ``amount`` charged and ``chunks``.
+        """
+        now = now or timezone.now()
+        chunk_size = chunk_size or RenewalService.get_settings()['chunk_size']
+        totals = {status: 0 for status, _ in SubscriptionRenewal.STATUS_CHOICES}
+        totals.update({'amount': ZERO, 'chunks': 0})
+        while max_chunks is None or totals['chunks'] < max_chunks:
+            result = RenewalService._process_chunk(now, chunk_size)
+            if result is None:
+                break
+            totals['chunks'] += 1
+            for key, value in result.items():
+                totals[key] += value
+            if stdout:
+                stdout.write(f"Chunk {totals['chunks']}: {result}")
+        if totals['chunks']:
+            logger.info(f"Subscription renewals due by {now.isoformat()}: {totals}")
+        return totals
+
+    @staticmethod
+    def _process_chunk(now, chunk_size):
+        config = RenewalService.get_settings()
+        with transaction.atomic():
+            subscriptions = list(
+                RenewalService.due(now)
+                .select_for_update(skip_locked=True)
+                .order_by('end_date', 'id')
+                .only('id', 'user_id', 'plan_id', 'start_date', 'end_date', 'last_renewed_at')[:chunk_size]
+            )
+            if not subscriptions:
+                return None
+
+            plans = SubscriptionPlan.objects.in_bulk({sub.plan_id for sub in subscriptions})
+            keys = {sub.id: RenewalService.idempotency_key(sub.id, sub.end_date) for sub in subscriptions}
+            existing = SubscriptionRenewal.objects.in_bulk(list(keys.values()), field_name='idempotency_key')
+            wallets = {}
+            balances = {}
+            for user_id, wallet_id, balance in (
+                Wallet.objects.select_for_update().filter(user_id__in={sub.user_id for sub in subscriptions})
+                .order_by('id').values_list('user_id', 'id', 'balance')
+            ):
+                wallets[user_id] = wallet_id
+                balances[wallet_id] = balance
+
+            counts = defaultdict(int)
+            charges = defaultdict(lambda: ZERO)
+            entries, renewed, created, updated = [], [], [], []
+            for sub in subscriptions:
+                plan = plans[sub.plan_id]
+                renewal = existing.get(keys[sub.id])
+                if renewal is None:
+                    renewal = SubscriptionRenewal(
+                        subscription_id=sub.id, idempotency_key=keys[sub.id], period_end=sub.end_date
+                    )
+                    created.append(renewal)
+                else:
+                    updated.append(renewal)
+                renewal.plan_id = plan.id
+                renewal.amount = plan.price
+                renewal.attempts += 1
+                renewal.next_retry_at = None
+                renewal.error = ''
+                renewal.updated_at = now
+                wallet_id = wallets.get(sub.user_id)
+
+                if not plan.is_active:
+                    renewal.status, renewal.error = 'failed', "Plan is no longer available"
+                elif wallet_id is None:
+                    renewal.status, renewal.error = 'failed', "User has no wallet"
+                elif balances[wallet_id] < plan.price:
+                    delays = config['retry_delays_hours']
+                    renewal.error = f"Insufficient funds: balance {balances[wallet_id]}, price {plan.price}"
+                    if renewal.attempts <= len(delays):
+                        renewal.status = 'retry_scheduled'
+                        renewal.next_retry_at = now + timedelta(hours=delays[renewal.attempts - 1])
+                    else:
+                        renewal.status = 'insufficient_funds'
+                else:
+                    balances[wallet_id] -= plan.price
+                    charges[wallet_id] += plan.price
+                    entry = WalletTransaction(
+                        wallet_id=wallet_id,
+                        amount=plan.price,
+                        transaction_type='subscription',
+                        status='completed',
+                        description=f"Subscription renewal: {plan.name}",
+                        reference_id=keys[sub.id],
+                        metadata={
+                            'subscription_id': str(sub.id),
+                            'subscription_plan_id': str(plan.id),
+                            'period_end': sub.end_date.isoformat(),
+                        },
+                    )
+                    entries.append(entry)
+
+                    # As UserSubscription.renew(): extend a running period, restart an expired one
+                    days = timedelta(days=plan.get_duration_in_days())
+                    if sub.end_date < now:
+                        sub.start_date, sub.end_date = now, now + days
+                    else:
+                        sub.end_date = sub.end_date + days
+                    sub.last_renewed_at = now
+                    sub.updated_at = now
+                    renewed.append(sub)
+                    renewal.status = 'renewed'
+                    renewal.wallet_transaction = entry
+                    renewal.new_end_date = sub.end_date
+                counts[renewal.status] += 1
+
+            if entries:
+                total = sum(charges.values(), ZERO)
+                # The subscription fees are the entry's imbalance, posted to the platform
+                LedgerService.apply(
+                    {wallet_id: (-amount, ZERO) for wallet_id, amount in charges.items()},
+                    entries,
+                    counterpart=JournalService.PLATFORM_COMMISSION,
+                    kind='subscription_renewal',
+                    metadata={'renewals': len(entries)},
+                    bulk_entries=True,
+                )
+                LedgerService.credit_platform(
+                    total,
+                    metadata={'purpose': 'subscription_renewals', 'renewals': len(entries)},
+                    journal=False,
+                    description="Subscription renewals",
+                )
+                UserSubscription.objects.bulk_update(
+                    renewed, ['start_date', 'end_date', 'last_renewed_at', 'updated_at']
+                )
+                counts['amount'] = total
+
+            SubscriptionRenewal.objects.bulk_create(created)
+            SubscriptionRenewal.objects.bulk_update(updated, [
+                'plan', 'amount', 'status', 'attempts', 'next_retry_at', 'error',
+                'wallet_transaction', 'new_end_date', 'updated_at',
+            ])
+        return dict(counts)
+
+    @staticmethod
+    def summary(start=None, end=None):
+        """
+        ``{status: {'count': n, ...}}`` of the renewals last processed between
+        ``start`` and ``end``. Only ``renewed`` renewals were charged, so they
+        report the charged ``amount``; the other statuses report the
+        ``amount_due`` that was not collected.
+        """
+        renewals = SubscriptionRenewal.objects.all()
+        if start:
+            renewals = renewals.filter(updated_at__gte=start)
+        if end:
+            renewals = renewals.filter(updated_at__lt=end)
+        rows = renewals.order_by().values('status').annotate(count=Count('id'), amount=Sum('amount'))
+        return {
+            row['status']: {
+                'count': row['count'],
+                'amount' if row['status'] == 'renewed' else 'amount_due': row['amount'] or ZERO,
+            }
+            for row in rows
+        }
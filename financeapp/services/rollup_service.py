@@ -0,0 +1,238 @@
+import logging
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Max, Min, Q, Sum
+from django.db.models.functions import TruncMonth, TruncYear
+from django.utils import timezone
+
+from ..models import ProjectDailyRollup, RolledUpTransaction, Transaction, UserDailyRollup
+
+logger = logging.getLogger(__name__)
+
+ZERO = Decimal('0.00')
+
+
+class RollupService:
+    """
+    Daily per-user and per-project totals of completed transactions.
+
+    ``sync()`` runs from the Transaction post_save signal. A
+    ``RolledUpTransaction`` row records what each completed transaction
+    added, so a transaction is counted once however often it is saved, and is
+    taken out exactly when it stops being completed. ``rebuild()`` recomputes
+    a range of days from the transactions, one window at a time. Chart
+    endpoints read the rollups, so their cost depends on the number of days
+    shown, not on how long a user has been active.
+    """
+    ENTRY_FIELDS = ('day', 'from_user_id', 'to_user_id', 'project_id', 'amount', 'net_amount', 'platform_fee_amount')
+    COUNT_FIELD = {'credits': 'credit_count', 'debits': 'debit_count', 'commission': 'credit_count'}
+    REBUILD_WINDOW_DAYS = 31
+    BATCH_SIZE = 2000
+
+    # Incremental maintenance
+
+    @staticmethod
+    def sync(tx):
+        """
+        Count ``tx`` in the rollups if it is completed and take it out if it no
+        longer is. Returns True if the rollups changed.
+        """
+        with transaction.atomic():
+            counted = RolledUpTransaction.objects.select_for_update().filter(transaction_id=tx.id).first()
+            current = RollupService._entry(tx) if tx.status == 'completed' else None
+            if counted is not None and current is not None and all(
+                getattr(counted, field) == getattr(current, field) for field in RollupService.ENTRY_FIELDS
+            ):
+                return False
+            if counted is None and current is None:
+                return False
+
+            if counted is not None:
+                RollupService._add(counted, -1)
+                counted.delete()
+            if current is not None:
+                try:
+                    with transaction.atomic():
+                        current.save(force_insert=True)
+                except IntegrityError:
+                    # Counted meanwhile by a concurrent save of the same transaction
+                    return False
+                RollupService._add(current, 1)
+        return True
+
+    @staticmethod
+    def _entry(tx):
+        return RolledUpTransaction(
+            transaction_id=tx.id,
+            day=timezone.localdate(tx.created_at),
+            from_user_id=tx.from_user_id,
+            to_user_id=tx.to_user_id,
+            project_id=tx.project_id,
+            amount=tx.amount,
+            net_amount=tx.net_amount,
+            platform_fee_amount=tx.platform_fee_amount,
+        )
+
+    @staticmethod
+    def _deltas(entry, sign):
+        """``{(user_id, project_id): {field: delta}}`` for one entry; project_id None is the user row"""
+        deltas = defaultdict(lambda: defaultdict(int))
+        for project_id in {None, entry.project_id}:
+            row = deltas[(entry.to_user_id, project_id)]
+            row['credits'] += sign * entry.net_amount
+            row['commission'] += sign * entry.platform_fee_amount
+            row['credit_count'] += sign
+            row = deltas[(entry.from_user_id, project_id)]
+            row['debits'] += sign * entry.amount
+            row['debit_count'] += sign
+        return deltas
+
+    @staticmethod
+    def _add(entry, sign):
+        for (user_id, project_id), fields in RollupService._deltas(entry, sign).items():
+            if project_id is None:
+                model, keys = UserDailyRollup, {'user_id': user_id, 'day': entry.day}
+            else:
+                model, keys = ProjectDailyRollup, {'user_id': user_id, 'project_id': project_id, 'day': entry.day}
+            rollup, _ = model.objects.get_or_create(**keys)
+            model.objects.filter(pk=rollup.pk).update(
+                updated_at=timezone.now(),
+                **{field: F(field) + delta for field, delta in fields.items()}
+            )
+
+    # Backfill
+
+    @staticmethod
+    def rebuild(start=None, end=None, stdout=None):
+        """
+        Recompute the rollups for the days ``start``..``end`` (inclusive, local
+        dates; default: all history) from the transactions.
+        Returns ``{'days': n, 'transactions': n, 'user_rows': n, 'project_rows': n}``.
+        """
+        totals = {'days': 0, 'transactions': 0, 'user_rows': 0, 'project_rows': 0}
+        if start is None:
+            first = Transaction.objects.aggregate(first=Min('created_at'))['first']
+            if first is None:
+                return totals
+            start = timezone.localdate(first)
+        end = end or timezone.localdate()
+
+        window_start = start
+        while window_start <= end:
+            window_end = min(window_start + timedelta(days=RollupService.REBUILD_WINDOW_DAYS - 1), end)
+            counts = RollupService._rebuild_window(window_start, window_end)
+            for key, value in counts.items():
+                totals[key] += value
+            if stdout:
+                stdout.write(
+                    f"{window_start}..{window_end}: {counts['transactions']} transactions, "
+                    f"{counts['user_rows']} user rows, {counts['project_rows']} project rows"
+                )
+            window_start = window_end + timedelta(days=1)
+        totals['days'] = (end - start).days + 1
+        logger.info(f"Rebuilt rollups for {start}..{end}: {totals}")
+        return totals
+
+    @staticmethod
+    def _rebuild_window(start, end):
+        with transaction.atomic():
+            created_in_window = Transaction.objects.filter(created_at__date__gte=start, created_at__date__lte=end)
+            completed = created_in_window.select_for_update().filter(status='completed')
+            in_window = Q(day__gte=start, day__lte=end)
+            dropped = RolledUpTransaction.objects.filter(in_window | Q(transaction__in=created_in_window))
+
+            # Entries whose transaction was moved to another day by a bulk
+            # update: take them out of the day they were counted on...
+            for entry in dropped.exclude(in_window):
+                RollupService._add(entry, -1)
+            # ...and count them again on their own day afterwards
+            moved_out = list(dropped.filter(in_window).exclude(transaction__in=created_in_window)
+                             .values_list('transaction_id', flat=True))
+            dropped.delete()
+            UserDailyRollup.objects.filter(in_window).delete()
+            ProjectDailyRollup.objects.filter(in_window).delete()
+
+            rows = defaultdict(lambda: defaultdict(int))
+            entries = []
+            count = 0
+            for tx in completed.only(
+                'id', 'created_at', 'from_user_id', 'to_user_id', 'project_id',
+                'amount', 'net_amount', 'platform_fee_amount'
+            ).iterator(chunk_size=RollupService.BATCH_SIZE):
+                entry = RollupService._entry(tx)
+                entries.append(entry)
+                for (user_id, project_id), fields in RollupService._deltas(entry, 1).items():
+                    for field, delta in fields.items():
+                        rows[(user_id, project_id, entry.day)][field] += delta
+                if len(entries) >= RollupService.BATCH_SIZE:
+                    RolledUpTransaction.objects.bulk_create(entries)
+                    count += len(entries)
+                    entries = []
+            RolledUpTransaction.objects.bulk_create(entries)
+            count += len(entries)
+
+            user_rows, project_rows = [], []
+            for (user_id, project_id, day), fields in rows.items():
+                if project_id is None:
+                    user_rows.append(UserDailyRollup(user_id=user_id, day=day, **fields))
+                else:
+                    project_rows.append(ProjectDailyRollup(user_id=user_id, project_id=project_id, day=day, **fields))
+            UserDailyRollup.objects.bulk_create(user_rows, batch_size=RollupService.BATCH_SIZE)
+            ProjectDailyRollup.objects.bulk_create(project_rows, batch_size=RollupService.BATCH_SIZE)
+
+            for tx in Transaction.objects.filter(id__in=moved_out):
+                RollupService.sync(tx)
+        return {'transactions': count, 'user_rows': len(user_rows), 'project_rows': len(project_rows)}
+
+    # Reading
+
+    @staticmethod
+    def totals(user, field='credits', start=None, end=None, period='day'):
+        """
+        ``[(period_start, total, count)]`` of ``field`` oldest first, where
+        ``period`` is 'day', 'month' or 'year'.
+        """
+        rollups = UserDailyRollup.objects.filter(user=user)
+        if start:
+            rollups = rollups.filter(day__gte=start)
+        if end:
+            rollups = rollups.filter(day__lte=end)
+        if period != 'day':
+            trunc = {'month': TruncMonth, 'year': TruncYear}[period]
+            rollups = rollups.annotate(period=trunc('day'))
+        else:
+            rollups = rollups.annotate(period=F('day'))
+        rows = (
+            rollups.order_by().values('period')
+            .annotate(total=Sum(field), count=Sum(RollupService.COUNT_FIELD[field]))
+            .order_by('period')
+        )
+        return [(row['period'], row['total'] or ZERO, row['count'] or 0) for row in rows]
+
+    @staticmethod
+    def grand_total(user, field='credits'):
+        result = UserDailyRollup.objects.filter(user=user).aggregate(
+            total=Sum(field), count=Sum(RollupService.COUNT_FIELD[field])
+        )
+        return result['total'] or ZERO, result['count'] or 0
+
+    @staticmethod
+    def by_project(user, field='credits', project_ids=None):
+        """The user's all-time ``field`` totals per project, largest first, as a values() queryset"""
+        rollups = ProjectDailyRollup.objects.filter(user=user)
+        if project_ids is not None:
+            rollups = rollups.filter(project_id__in=project_ids)
+        return (
+            rollups.order_by().values('project_id', 'project__title')
+            .annotate(
+                total=Sum(field),
+                count=Sum(RollupService.COUNT_FIELD[field]),
+                first_day=Min('day'),
+                last_day=Max('day'),
+            )
+            .filter(count__gt=0)
+            .order_by('-total', 'project_id')
+        )
@@ -0,0 +1,247 @@
+import csv
+import io
+import json
+import os
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime, parse_date
+
+from ..models import StatementExport, Transaction, WalletTransaction
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+class StatementService:
+    """
+    Wallet and platform transaction history for one user.
+
+    Pages are keyset-paginated on ``(timestamp, id)`` newest first, so a page
+    costs the same at any depth and no ``count()`` is needed. Exports read
+    the same queryset with ``.values_list().iterator(chunk_size=...)`` and
+    yield encoded lines, so memory stays flat however long the history is.
+    """
+    DEFAULT_PAGE_SIZE = 20
+    MAX_PAGE_SIZE = 100
+    CHUNK_SIZE = 2000
+
+    # Exported columns per source: (column, queryset field)
+    COLUMNS = {
+        'wallet': [
+            ('id', 'id'),
+            ('reference_id', 'reference_id'),
+            ('timestamp', 'timestamp'),
+            ('type', 'transaction_type'),
+            ('status', 'status'),
+            ('amount', 'amount'),
+            ('description', 'description'),
+        ],
+        'platform': [
+            ('id', 'id'),
+            ('transaction_id', 'transaction_id'),
+            ('timestamp', 'created_at'),
+            ('type', 'payment_type'),
+            ('status', 'status'),
+            ('amount', 'amount'),
+            ('net_amount', 'net_amount'),
+            ('currency', 'currency'),
+            ('from_user', 'from_user__username'),
+            ('to_user', 'to_user__username'),
+            ('project', 'project__title'),
+            ('task', 'task__title'),
+            ('description', 'description'),
+        ],
+    }
+    TIME_FIELD = {'wallet': 'timestamp', 'platform': 'created_at'}
+    TYPE_FIELD = {'wallet': 'transaction_type', 'platform': 'payment_type'}
+
+    @staticmethod
+    def parse_filters(params):
+        """Pick the supported filters out of query params (``type``, ``status``, ``start_date``, ``end_date``)"""
+        filters = {}
+        for key in ('type', 'status'):
+            if params.get(key):
+                filters[key] = params.get(key)
+        for key in ('start_date', 'end_date'):
+            value = params.get(key)
+            if not value:
+                continue
+            moment = parse_datetime(value)
+            if moment is None:
+                day = parse_date(value)
+                if day is None:
+                    raise ValueError(f"Invalid {key}: {value}")
+                moment = datetime.combine(day, datetime.max.time() if key == 'end_date' else datetime.min.time())
+            if timezone.is_naive(moment):
+                moment = timezone.make_aware(moment)
+            filters[key] = moment.isoformat()
+        return filters
+
+    @staticmethod
+    def queryset(user, source, filters=None):
+        """The user's history for ``source``, newest first"""
+        filters = filters or {}
+        if source == 'wallet':
+            queryset = WalletTransaction.objects.filter(wallet__user=user)
+        elif source == 'platform':
+            queryset = Transaction.objects.filter(Q(from_user=user) | Q(to_user=user))
+        else:
+            raise ValueError(f"Unknown statement source: {source}")
+
+        time_field = StatementService.TIME_FIELD[source]
+        if filters.get('type'):
+            queryset = queryset.filter(**{StatementService.TYPE_FIELD[source]: filters['type']})
+        if filters.get('status'):
+            queryset = queryset.filter(status=filters['status'])
+        if filters.get('start_date'):
+            queryset = queryset.filter(**{f'{time_field}__gte': parse_datetime(filters['start_date'])})
+        if filters.get('end_date'):
+            queryset = queryset.filter(**{f'{time_field}__lte': parse_datetime(filters['end_date'])})
+        return queryset.order_by(f'-{time_field}', '-id')
+
+    # Keyset pages
+
+    @staticmethod
+    def encode_cursor(moment, row_id):
+        return f"{(moment - EPOCH) // timedelta(microseconds=1)}_{row_id}"
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """``(moment, row_id)`` of a cursor; raises ValueError if it is malformed"""
+        try:
+            micros, row_id = cursor.split('_', 1)
+            return EPOCH + timedelta(microseconds=int(micros)), uuid.UUID(row_id)
+        except (ValueError, OverflowError):
+            raise ValueError(f"Invalid cursor: {cursor}")
+
+    @staticmethod
+    def page(user, source, cursor=None, limit=None, filters=None):
+        """Return ``{'results': [row], 'next_cursor': str|None}``"""
+        limit = min(int(limit or StatementService.DEFAULT_PAGE_SIZE), StatementService.MAX_PAGE_SIZE)
+        if limit <= 0:
+            raise ValueError("limit must be positive")
+
+        time_field = StatementService.TIME_FIELD[source]
+        queryset = StatementService.queryset(user, source, filters)
+        if cursor:
+            moment, row_id = StatementService.decode_cursor(cursor)
+            queryset = queryset.filter(
+                Q(**{f'{time_field}__lt': moment}) | Q(**{time_field: moment, 'id__lt': row_id})
+            )
+        fields = [field for _, field in StatementService.COLUMNS[source]]
+        rows = list(queryset.values(*fields)[:limit + 1])
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = None
+        if has_more:
+            next_cursor = StatementService.encode_cursor(rows[-1][time_field], rows[-1]['id'])
+        return {
+            'results': [StatementService._serialize(row, source) for row in rows],
+            'next_cursor': next_cursor,
+        }
+
+    @staticmethod
+    def _serialize(row, source):
+        data = {}
+        for column, field in StatementService.COLUMNS[source]:
+            value = row[field]
+            if isinstance(value, datetime):
+                value = value.isoformat()
+            elif isinstance(value, Decimal):
+                value = float(value)
+            elif value is not None and column == 'id':
+                value = str(value)
+            data[column] = value
+        return data
+
+    # Exports
+
+    @staticmethod
+    def export_lines(user, source, fmt, filters=None, stats=None):
+        """
+        Yield the statement as encoded CSV or JSON Lines, a few hundred rows
+        at a time. ``stats['rows']``, if given, counts the rows written.
+        """
+        stats = {} if stats is None else stats
+        stats['rows'] = 0
+        if fmt not in ('csv', 'jsonl'):
+            raise ValueError(f"Unknown export format: {fmt}")
+        columns = StatementService.COLUMNS[source]
+        rows = (
+            StatementService.queryset(user, source, filters)
+            .values_list(*[field for _, field in columns])
+            .iterator(chunk_size=StatementService.CHUNK_SIZE)
+        )
+        names = [column for column, _ in columns]
+
+        if fmt == 'csv':
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(names)
+            for row in rows:
+                writer.writerow([StatementService._csv_value(value) for value in row])
+                stats['rows'] += 1
+                if stats['rows'] % 500 == 0:
+                    yield buffer.getvalue().encode()
+                    buffer.seek(0)
+                    buffer.truncate()
+            yield buffer.getvalue().encode()
+        else:
+            for row in rows:
+                stats['rows'] += 1
+                yield (json.dumps(dict(zip(names, row)), default=StatementService._json_value) + '\n').encode()
+
+    @staticmethod
+    def _csv_value(value):
+        if isinstance(value, datetime):
+            return value.isoformat()
+        return '' if value is None else value
+
+    @staticmethod
+    def _json_value(value):
+        if isinstance(value, datetime):
+            return value.isoformat()
+        return str(value)
+
+    @staticmethod
+    def file_name(export):
+        return f"{export.user_id}/{export.id}.{export.format}"
+
+    @staticmethod
+    def file_path(export):
+        return os.path.join(settings.STATEMENT_EXPORT_ROOT, StatementService.file_name(export))
+
+    @staticmethod
+    def run_export(export):
+        """Write ``export`` to STATEMENT_EXPORT_ROOT, streaming row chunks to disk"""
+        StatementExport.objects.filter(id=export.id).update(status='running')
+        path = StatementService.file_path(export)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        stats = {}
+        try:
+            with open(path + '.part', 'wb') as handle:
+                chunks = StatementService.export_lines(
+                    export.user, export.source, export.format, export.filters, stats=stats
+                )
+                for chunk in chunks:
+                    handle.write(chunk)
+            os.replace(path + '.part', path)
+        except Exception as e:
+            if os.path.exists(path + '.part'):
+                os.remove(path + '.part')
+            StatementExport.objects.filter(id=export.id).update(
+                status='failed', error=str(e), completed_at=timezone.now()
+            )
+            raise
+
+        StatementExport.objects.filter(id=export.id).update(
+            status='completed',
+            file_name=StatementService.file_name(export),
+            row_count=stats['rows'],
+            completed_at=timezone.now(),
+        )
+        return stats['rows']
@@ -1,8 +1,12 @@
 from datetime import datetime, timedelta
+from django.contrib.auth import get_user_model
 from django.db import transaction
 from django.core.exceptions import ValidationError
-from finance.models import SubscriptionPlan, UserSubscription
-from finance.services.payment_processor import PaymentProcessor
+from ..models import SubscriptionPlan, UserSubscription
+from .payment_processor import PaymentProcessor
+from .renewal_service import RenewalService
+
+User = get_user_model()
 
 class SubscriptionService:
     @staticmethod
@@ -72,24 +76,8 @@ class SubscriptionService:
 
     @staticmethod
     def process_renewals():
-        """Process automatic renewals for subscriptions"""
-        today = datetime.now()
-        expiring_subs = UserSubscription.objects.filter(
-            is_active=True,
-            auto_renew=True,
-            end_date__date=today.date()
-        )
-
-        for sub in expiring_subs:
-            try:
-                SubscriptionService.subscribe_user(
-                    sub.user,
-                    sub.plan.id,
-                    payment_method='wallet'  # Default to wallet for renewals
-                )
-            except Exception as e:
-                # Log renewal failure
-                print(f"Renewal failed for subscription {sub.id}: {str(e)}")
+        """Process automatic renewals for subscriptions (see RenewalService)"""
+        return RenewalService.process_due()
 
     @staticmethod
     def get_subscription_status(user):
@@ -2,6 +2,7 @@ from decimal import Decimal
 from django.db import transaction
 from django.core.exceptions import ValidationError
 from ..models import Wallet, WalletTransaction
+from .ledger_service import LedgerService
 import uuid
 
 class WalletService:
@@ -20,57 +21,41 @@ class WalletService:
         return wallet
 
     @staticmethod
-    @transaction.atomic
     def process_deposit(wallet, amount, metadata=None):
         """Process a deposit to the wallet"""
         if amount <= 0:
             raise ValidationError("Amount must be positive")
 
         try:
-            # Create transaction record
-            transaction = WalletTransaction.objects.create(
-                wallet=wallet,
-                amount=amount,
+            # Locks the wallet row, credits it with an F() update and records
+            # the transaction in one database transaction
+            return LedgerService.credit(
+                wallet,
+                amount,
                 transaction_type='deposit',
                 reference_id=WalletService.generate_reference_id(),
-                metadata=metadata or {}
+                metadata=metadata
             )
-
-            # Update wallet balance
-            wallet.deposit(amount)
-            transaction.status = 'completed'
-            transaction.save()
-
-            return transaction
         except Exception as e:
             raise ValidationError(f"Deposit failed: {str(e)}")
 
     @staticmethod
-    @transaction.atomic
     def process_withdrawal(wallet, amount, metadata=None):
         """Process a withdrawal from the wallet"""
         if amount <= 0:
             raise ValidationError("Amount must be positive")
 
-        if wallet.balance < amount:
-            raise ValidationError("Insufficient funds")
-
         try:
-            # Create transaction record
-            transaction = WalletTransaction.objects.create(
-                wallet=wallet,
-                amount=amount,
+            # The funds check runs against the locked row, not this instance
+            return LedgerService.debit(
+                wallet,
+                amount,
                 transaction_type='withdrawal',
                 reference_id=WalletService.generate_reference_id(),
-                metadata=metadata or {}
+                metadata=metadata
             )
-
-            # Update wallet balance
-            wallet.withdraw(amount)
-            transaction.status = 'completed'
-            transaction.save()
-
-            return transaction
+        except ValueError as e:
+            raise ValidationError(str(e))
         except Exception as e:
             raise ValidationError(f"Withdrawal failed: {str(e)}")
 
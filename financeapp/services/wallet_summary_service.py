@@ -0,0 +1,139 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from ..models import Wallet, WalletTransaction
+from ..models.hold import Hold
+from .statement_service import StatementService
+
+ZERO = Decimal('0.00')
+
+
+class WalletSummaryService:
+    """
+    Wallet details for the wallet pages.
+
+    The summary (balances, active holds per type, recent transactions) is
+    cached per wallet and dropped after commit by every ``LedgerService``
+    change and every saved or deleted wallet, hold or wallet transaction.
+    The per-type hold totals are one grouped aggregate. The hold list itself
+    is keyset-paginated on ``(created_at, id)`` newest first with its related
+    objects selected, so a page costs the same however many holds the wallet
+    has.
+    """
+    CACHE_TIMEOUT = 60 * 5
+    DEFAULT_PAGE_SIZE = 20
+    MAX_PAGE_SIZE = 100
+    RECENT_TRANSACTIONS = 20
+
+    @staticmethod
+    def cache_key(wallet_id):
+        return f"wallet_summary:{wallet_id}"
+
+    @staticmethod
+    def invalidate(wallet_ids):
+        cache.delete_many([WalletSummaryService.cache_key(wallet_id) for wallet_id in wallet_ids])
+
+    @staticmethod
+    def summary(wallet_id):
+        """The cached summary of a wallet, built on a miss"""
+        key = WalletSummaryService.cache_key(wallet_id)
+        summary = cache.get(key)
+        if summary is None:
+            summary = WalletSummaryService._build(wallet_id)
+            cache.set(key, summary, timeout=WalletSummaryService.CACHE_TIMEOUT)
+        return summary
+
+    @staticmethod
+    def _build(wallet_id):
+        wallet = Wallet.objects.get(id=wallet_id)
+        holds_summary = {}
+        total_hold_amount = ZERO
+        for row in (
+            Hold.objects.filter(wallet_id=wallet_id, status='active')
+            .order_by().values('hold_type')
+            .annotate(count=Count('id'), total_amount=Sum('amount'))
+        ):
+            holds_summary[row['hold_type']] = {'count': row['count'], 'total_amount': float(row['total_amount'])}
+            total_hold_amount += row['total_amount']
+
+        recent_transactions = [{
+            'id': str(tx['id']),
+            'reference_id': tx['reference_id'],
+            'amount': float(tx['amount']),
+            'type': tx['transaction_type'],
+            'status': tx['status'],
+            'timestamp': tx['timestamp'].isoformat(),
+            'description': tx['description'],
+        } for tx in (
+            WalletTransaction.objects.filter(wallet_id=wallet_id).order_by('-timestamp', '-id')
+            .values('id', 'reference_id', 'amount', 'transaction_type', 'status', 'timestamp', 'description')
+            [:WalletSummaryService.RECENT_TRANSACTIONS]
+        )]
+
+        return {
+            'basic_info': {
+                'balance': float(wallet.balance),
+                'hold_balance': float(wallet.hold_balance),
+                'total_balance': float(wallet.total_balance),
+                'currency': wallet.currency,
+                'last_updated': wallet.last_updated.isoformat(),
+            },
+            'holds_summary': holds_summary,
+            'total_hold_amount': float(total_hold_amount),
+            'recent_transactions': recent_transactions,
+        }
+
+    @staticmethod
+    def hold_page(wallet_id, cursor=None, limit=None, select_related=('project', 'milestone')):
+        """Return ``{'holds': [Hold], 'next_cursor': str|None}`` of the wallet's active holds, newest first"""
+        limit = min(int(limit or WalletSummaryService.DEFAULT_PAGE_SIZE), WalletSummaryService.MAX_PAGE_SIZE)
+        if limit <= 0:
+            raise ValueError("limit must be positive")
+        holds = Hold.objects.filter(wallet_id=wallet_id, status='active')
+        if cursor:
+            moment, hold_id = StatementService.decode_cursor(cursor)
+            holds = holds.filter(Q(created_at__lt=moment) | Q(created_at=moment, id__lt=hold_id))
+        holds = list(holds.select_related(*select_related).order_by('-created_at', '-id')[:limit + 1])
+        next_cursor = None
+        if len(holds) > limit:
+            holds = holds[:limit]
+            next_cursor = StatementService.encode_cursor(holds[-1].created_at, holds[-1].id)
+        return {'holds': holds, 'next_cursor': next_cursor}
+
+    @staticmethod
+    def serialize_hold(hold, now=None):
+        """A hold with the details of what it is for; ``now`` is shared by a whole page"""
+        now = now or timezone.now()
+        hold_info = {
+            'id': str(hold.id),
+            'hold_type': hold.hold_type,
+            'amount': float(hold.amount),
+            'title': hold.title,
+            'description': hold.description,
+            'created_at': hold.created_at.isoformat(),
+            'expires_at': hold.expires_at.isoformat() if hold.expires_at else None,
+            'days_remaining': max(0, (hold.expires_at - now).days) if hold.expires_at else None,
+            'reference_id': hold.reference_id,
+            'metadata': hold.metadata,
+        }
+
+        if hold.hold_type == 'project_milestone':
+            hold_info.update({
+                'project_title': hold.project.title if hold.project else 'Unknown Project',
+                'milestone_title': hold.milestone.title if hold.milestone else 'Unknown Milestone',
+                'project_id': str(hold.project_id) if hold.project_id else None,
+                'milestone_id': str(hold.milestone_id) if hold.milestone_id else None,
+            })
+        elif hold.hold_type == 'obsp_purchase':
+            hold_info.update({
+                'obsp_title': hold.obsp_response.template.title if hold.obsp_response else 'Unknown OBSP',
+                'obsp_level': hold.obsp_response.selected_level if hold.obsp_response else None,
+            })
+        elif hold.hold_type == 'auto_pay_commitment':
+            hold_info.update({
+                'auto_pay_details': hold.metadata.get('auto_pay_details', {}),
+            })
+        return hold_info
@@ -0,0 +1,68 @@
+from datetime import timedelta
+
+from celery import shared_task
+from django.utils import timezone
+
+from .models import StatementExport
+from .services.hold_service import HoldService
+from .services.journal_service import JournalService
+from .services.renewal_service import RenewalService
+from .services.rollup_service import RollupService
+from .services.statement_service import StatementService
+
+
+@shared_task
+def snapshot_journal_balances():
+    """Checkpoint the balance of every journal account that moved since the last run"""
+    result = JournalService.snapshot()
+    return f"Snapshotted {result['accounts']} journal accounts at posting {result['posting_id']}"
+
+
+@shared_task
+def rebuild_recent_rollups(days=2):
+    """
+    Recompute the last few days of rollups, picking up any transaction that
+    was completed by a bulk update and so never reached the post_save signal
+    """
+    result = RollupService.rebuild(start=timezone.localdate() - timedelta(days=days - 1))
+    return f"Rebuilt {result['days']} days of rollups from {result['transactions']} transactions"
+
+
+@shared_task
+def generate_statement_export(export_id):
+    """Write a queued statement export to STATEMENT_EXPORT_ROOT"""
+    export = StatementExport.objects.select_related('user').filter(id=export_id, status='pending').first()
+    if export is None:
+        return f"Statement export {export_id} is not pending"
+    rows = StatementService.run_export(export)
+    return f"Statement export {export_id} wrote {rows} rows"
+
+
+@shared_task
+def expire_holds():
+    """Expire the active holds whose expires_at has passed and release their amounts"""
+    result = HoldService.expire_due()
+    return (
+        f"Expired {result['holds']} holds totalling {result['amount']} on {result['wallets']} wallets"
+        f" ({result['skipped']} skipped)"
+    )
+
+
+@shared_task
+def renew_due_subscriptions(max_chunks=None):
+    """Charge and extend due auto-renewing subscriptions; safe to run in several workers at once"""
+    result = RenewalService.process_due(max_chunks=max_chunks)
+    return (
+        f"Renewed {result['renewed']} subscriptions for {result['amount']}, "
+        f"{result['retry_scheduled']} retries scheduled, {result['insufficient_funds']} out of retries, "
+        f"{result['failed']} failed"
+    )
+
+
+@shared_task
+def dispatch_subscription_renewals():
+    """Start the configured number of renewal workers; they share the due subscriptions"""
+    workers = RenewalService.get_settings()['workers']
+    for _ in range(workers):
+        renew_due_subscriptions.delay()
+    return f"Started {workers} subscription renewal workers"
@@ -1,3 +1,188 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core.models import User
+from financeapp.models import (
+    CommissionTier, Hold, JournalPosting, PlatformWalletShard, SpecialCommissionRate, Transaction, Wallet,
+    WalletTransaction,
+)
+from financeapp.services.commission_resolver import CommissionResolver
+from financeapp.services.commission_service import CommissionService
+from financeapp.services.hold_service import HoldService
+from financeapp.services.journal_service import JournalService
+from financeapp.services.ledger_service import LedgerService
+
+
+@override_settings(PLATFORM_WALLET_USERNAME='platform', PLATFORM_WALLET_SHARDS=4)
+class LedgerServiceTests(TestCase):
+    def setUp(self):
+        platform = User.objects.create(username='platform', email='platform@example.com', role='client')
+        self.platform_wallet = Wallet.objects.create(user=platform)
+        self.payer = self.make_wallet('payer', Decimal('100.00'))
+        self.payee = self.make_wallet('payee', Decimal('0.00'))
+
+    def make_wallet(self, username, balance):
+        user = User.objects.create(username=username, email=f'{username}@example.com', role='freelancer')
+        wallet = Wallet.objects.create(user=user)
+        if balance:
+            LedgerService.credit(wallet, balance)
+        return wallet
+
+    def assertJournalMatches(self):
+        self.assertEqual(JournalService.verify()['mismatches'], [])
+
+    def test_apply_locks_wallets_in_id_order(self):
+        changes = {self.payee.id: (Decimal('5.00'), Decimal('0.00')), self.payer.id: (Decimal('-5.00'), Decimal('0.00'))}
+        with CaptureQueriesContext(connection) as queries:
+            LedgerService.apply(changes)
+
+        lock_query = next(q['sql'] for q in queries.captured_queries if 'FROM "financeapp_wallet"' in q['sql'])
+        self.assertIn('ORDER BY "financeapp_wallet"."id" ASC', lock_query)
+        if connection.features.has_select_for_update:
+            self.assertIn('FOR UPDATE', lock_query)
+
+    def test_debit_rejects_insufficient_funds(self):
+        entries = WalletTransaction.objects.count()
+        postings = JournalPosting.objects.count()
+
+        with self.assertRaisesMessage(ValueError, "Insufficient funds"):
+            LedgerService.debit(self.payer, Decimal('100.01'))
+
+        self.payer.refresh_from_db()
+        self.assertEqual(self.payer.balance, Decimal('100.00'))
+        self.assertEqual(WalletTransaction.objects.count(), entries)
+        self.assertEqual(JournalPosting.objects.count(), postings)
+
+    def test_transfer_with_commission(self):
+        debit_tx, credit_tx = LedgerService.transfer(
+            self.payer, self.payee, Decimal('40.00'), commission=Decimal('4.00'), shard=1
+        )
+
+        self.payer.refresh_from_db()
+        self.payee.refresh_from_db()
+        self.assertEqual(self.payer.balance, Decimal('60.00'))
+        self.assertEqual(self.payee.balance, Decimal('36.00'))
+        self.assertEqual(debit_tx.amount, Decimal('40.00'))
+        self.assertEqual(credit_tx.amount, Decimal('36.00'))
+        self.assertEqual(LedgerService.platform_balance(), Decimal('4.00'))
+        self.assertEqual(JournalService.balance(JournalService.PLATFORM_COMMISSION), Decimal('4.00'))
+        self.assertJournalMatches()
+
+    def test_transfer_rejects_commission_above_amount(self):
+        with self.assertRaises(ValueError):
+            LedgerService.transfer(self.payer, self.payee, Decimal('10.00'), commission=Decimal('10.01'))
+
+    def test_credit_platform_adds_to_the_chosen_shard(self):
+        self.assertEqual(LedgerService.credit_platform(Decimal('2.50'), shard=3), 3)
+        self.assertEqual(LedgerService.credit_platform(Decimal('1.50'), shard=3), 3)
+
+        self.assertEqual(PlatformWalletShard.objects.get(shard=3).balance, Decimal('4.00'))
+        self.assertEqual(PlatformWalletShard.objects.count(), 1)
+        self.platform_wallet.refresh_from_db()
+        self.assertEqual(self.platform_wallet.balance, Decimal('0.00'))
+        self.assertEqual(
+            WalletTransaction.objects.filter(wallet=self.platform_wallet, transaction_type='commission').count(), 2
+        )
+        self.assertJournalMatches()
+
+
+class HoldExpiryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='client', email='client@example.com', role='client')
+        self.wallet = Wallet.objects.create(user=self.user)
+        LedgerService.credit(self.wallet, Decimal('100.00'))
+        self.past = timezone.now() - timedelta(minutes=1)
+
+    def assertWallet(self, balance, hold_balance):
+        self.wallet.refresh_from_db()
+        self.assertEqual((self.wallet.balance, self.wallet.hold_balance), (balance, hold_balance))
+        journal = JournalService.balances([
+            JournalService.wallet_account(self.wallet.id), JournalService.hold_account(self.wallet.id)
+        ])
+        self.assertEqual(
+            (journal[JournalService.wallet_account(self.wallet.id)], journal[JournalService.hold_account(self.wallet.id)]),
+            (balance, hold_balance),
+        )
+        self.assertEqual(JournalService.verify()['mismatches'], [])
+
+    def test_expired_funded_hold_returns_to_the_balance(self):
+        hold = self.wallet.create_hold('manual', Decimal('30.00'), 'Manual', 'Manual hold', expires_at=self.past)
+        self.assertWallet(Decimal('70.00'), Decimal('30.00'))
+
+        result = HoldService.expire_due()
+
+        self.assertEqual(result['holds'], 1)
+        self.assertEqual(result['amount'], Decimal('30.00'))
+        hold.refresh_from_db()
+        self.assertEqual(hold.status, 'expired')
+        self.assertWallet(Decimal('100.00'), Decimal('0.00'))
+        self.assertEqual(JournalService.balance(JournalService.EXTERNAL), Decimal('-100.00'))
+
+    def test_expired_commitment_hold_unwinds_the_reservation(self):
+        LedgerService.apply(
+            {self.wallet.id: (Decimal('0.00'), Decimal('20.00'))},
+            counterpart=JournalService.COMMITMENTS, kind='auto_pay_commitment',
+        )
+        Hold.objects.create(
+            wallet=self.wallet, user=self.user, amount=Decimal('20.00'), hold_type='project_milestone',
+            title='Milestone', description='Auto-pay hold', expires_at=self.past,
+        )
+
+        HoldService.expire_due()
+
+        self.assertWallet(Decimal('100.00'), Decimal('0.00'))
+        self.assertEqual(JournalService.balance(JournalService.COMMITMENTS), Decimal('0.00'))
+        self.assertEqual(JournalService.balance(JournalService.EXTERNAL), Decimal('-100.00'))
+
+    def test_expiry_is_not_repeated(self):
+        self.wallet.create_hold('manual', Decimal('30.00'), 'Manual', 'Manual hold', expires_at=self.past)
+        HoldService.expire_due()
+
+        self.assertEqual(HoldService.expire_due()['holds'], 0)
+        self.assertWallet(Decimal('100.00'), Decimal('0.00'))
+
+
+class CommissionQuoteTests(TestCase):
+    def setUp(self):
+        self.client_user = User.objects.create(username='client', email='client@example.com', role='client')
+        self.payee = User.objects.create(username='payee', email='payee@example.com', role='freelancer')
+        CommissionTier.objects.create(
+            name='Standard', min_amount=Decimal('0.00'), max_amount=Decimal('10000.00'),
+            percentage=Decimal('10.00'), flat_fee=Decimal('5.00'), freelancer_discount=Decimal('20.00'),
+        )
+        CommissionResolver.invalidate()
+        self.api = APIClient()
+        self.api.force_authenticate(self.client_user)
+
+    def quote(self, amount):
+        response = self.api.post(
+            '/api/finance/commission/quote/', {'amounts': [str(amount)], 'payee_id': self.payee.id}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        return Decimal(str(response.data['quotes'][0]['commission']))
+
+    def charge(self, amount):
+        payment = Transaction.objects.create(
+            from_user=self.client_user, to_user=self.payee, amount=amount, payment_type='milestone'
+        )
+        return CommissionService.calculate_commission(payment).amount
+
+    def test_quote_matches_the_charged_commission(self):
+        amount = Decimal('250.00')
+        # 10% plus the 5.00 flat fee, less the 20% freelancer discount
+        self.assertEqual(self.charge(amount), Decimal('24.00'))
+        self.assertEqual(self.quote(amount), self.charge(amount))
+
+    def test_quote_matches_the_charge_under_a_special_rate(self):
+        SpecialCommissionRate.objects.create(user=self.payee, percentage=Decimal('3.00'), flat_fee=Decimal('1.00'))
+        CommissionResolver.invalidate()
+        amount = Decimal('250.00')
+
+        self.assertEqual(self.charge(amount), Decimal('8.50'))
+        self.assertEqual(self.quote(amount), self.charge(amount))
@@ -12,4 +12,14 @@ urlpatterns = [
     path('wallet/details/', views.get_comprehensive_wallet_details, name='wallet_details'),
 
     path('wallet/freelancer-details/', views.freelancer_wallet_details, name='freelancer_wallet_details'),
+
+    path('wallet/history/', views.get_transaction_history, name='wallet_transaction_history'),
+
+    path('wallet/statement/export/', views.export_statement, name='wallet_statement_export'),
+
+    path('wallet/statement/exports/<uuid:export_id>/', views.statement_export_status, name='wallet_statement_export_status'),
+
+    path('wallet/statement/exports/<uuid:export_id>/download/', views.download_statement_export, name='wallet_statement_export_download'),
+
+    path('commission/quote/', views.quote_commissions, name='quote_commissions'),
 ]
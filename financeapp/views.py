@@ -9,14 +9,21 @@ from django.utils import timezone
 import razorpay
 from django.conf import settings
 from django.views.decorators.csrf import csrf_exempt
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse, FileResponse
+from django.shortcuts import get_object_or_404
 from django.views import View
 import json
 from datetime import datetime, timedelta
-from core.models import Project, Milestone, Task
+from core.models import Project, Milestone, Task, User
 from .models.hold import Hold
 from .models.transaction import Transaction
 from .models.subscription import UserSubscription
+from .models import StatementExport
+from .services.commission_service import CommissionService
+from .services.statement_service import StatementService
+from .services.wallet_summary_service import WalletSummaryService
+from .tasks import generate_statement_export
+import os
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -101,49 +108,103 @@ def withdraw_funds(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_transaction_history(request):
-    """Get wallet transaction history with filters"""
-    wallet = request.user.wallet
-    
-    # Get query parameters
-    transaction_type = request.GET.get('type')
-    start_date = request.GET.get('start_date')
-    end_date = request.GET.get('end_date')
-    limit = int(request.GET.get('limit', 20))
-    offset = int(request.GET.get('offset', 0))
-    
-    # Build query
-    transactions = wallet.get_transaction_history()
-    
-    if transaction_type:
-        transactions = transactions.filter(transaction_type=transaction_type)
-    if start_date:
-        transactions = transactions.filter(timestamp__gte=start_date)
-    if end_date:
-        transactions = transactions.filter(timestamp__lte=end_date)
-    
-    # Get total count
-    total_count = transactions.count()
-    
-    # Apply pagination
-    transactions = transactions[offset:offset + limit]
-    
-    transactions_data = [{
-        'id': str(tx.id),
-        'reference_id': tx.reference_id,
-        'amount': float(tx.amount),
-        'type': tx.transaction_type,
-        'status': tx.status,
-        'timestamp': tx.timestamp.isoformat(),
-        'description': tx.description
-    } for tx in transactions]
-    
+    """
+    Get wallet or platform transaction history with filters, newest first.
+
+    Keyset-paginated: pass the returned ``next_cursor`` back as ``cursor``
+    for the next page.
+    """
+    source = request.GET.get('source', 'wallet')
+    if source not in StatementService.TIME_FIELD:
+        return Response({'error': 'source must be wallet or platform'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        filters = StatementService.parse_filters(request.GET)
+        page = StatementService.page(
+            request.user, source,
+            cursor=request.GET.get('cursor'),
+            limit=request.GET.get('limit'),
+            filters=filters,
+        )
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response({
+        'transactions': page['results'],
+        'next_cursor': page['next_cursor'],
+        'has_more': page['next_cursor'] is not None,
+    })
+
+
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticated])
+def export_statement(request):
+    """
+    GET streams the statement as CSV or JSON Lines; POST queues a background
+    export written to STATEMENT_EXPORT_ROOT and returns its id.
+    """
+    params = request.GET if request.method == 'GET' else request.data
+    source = params.get('source', 'wallet')
+    fmt = params.get('export_format', 'csv')
+    if source not in StatementService.TIME_FIELD:
+        return Response({'error': 'source must be wallet or platform'}, status=status.HTTP_400_BAD_REQUEST)
+    if fmt not in ('csv', 'jsonl'):
+        return Response({'error': 'export_format must be csv or jsonl'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        filters = StatementService.parse_filters(params)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    if request.method == 'POST':
+        export = StatementExport.objects.create(user=request.user, source=source, format=fmt, filters=filters)
+        generate_statement_export.delay(str(export.id))
+        return Response({'export_id': str(export.id), 'status': export.status}, status=status.HTTP_202_ACCEPTED)
+
+    response = StreamingHttpResponse(
+        StatementService.export_lines(request.user, source, fmt, filters),
+        content_type='text/csv' if fmt == 'csv' else 'application/x-ndjson',
+    )
+    stamp = timezone.now().strftime('%Y%m%d')
+    response['Content-Disposition'] = f'attachment; filename="{source}-statement-{stamp}.{fmt}"'
+    return response
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def statement_export_status(request, export_id):
+    """Status of one of the user's background statement exports"""
+    export = get_object_or_404(StatementExport, id=export_id, user=request.user)
     return Response({
-        'transactions': transactions_data,
-        'total_count': total_count,
-        'has_more': (offset + limit) < total_count
+        'export_id': str(export.id),
+        'source': export.source,
+        'format': export.format,
+        'filters': export.filters,
+        'status': export.status,
+        'row_count': export.row_count,
+        'error': export.error,
+        'created_at': export.created_at.isoformat(),
+        'completed_at': export.completed_at.isoformat() if export.completed_at else None,
     })
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def download_statement_export(request, export_id):
+    """Download a completed background statement export"""
+    export = get_object_or_404(StatementExport, id=export_id, user=request.user)
+    if export.status != 'completed':
+        return Response({'error': f'Export is {export.status}'}, status=status.HTTP_409_CONFLICT)
+    path = StatementService.file_path(export)
+    if not os.path.exists(path):
+        return Response({'error': 'Export file is no longer available'}, status=status.HTTP_410_GONE)
+    return FileResponse(
+        open(path, 'rb'),
+        as_attachment=True,
+        filename=f"{export.source}-statement-{export.created_at:%Y%m%d}.{export.format}",
+        content_type='text/csv' if export.format == 'csv' else 'application/x-ndjson',
+    )
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def create_wallet_order(request):
@@ -207,96 +268,34 @@ def verify_wallet_payment(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_comprehensive_wallet_details(request):
-    """Get detailed wallet information with hold breakdown and transaction history"""
+    """
+    Get detailed wallet information with hold breakdown and transaction history.
+    Active holds are paged with ``cursor`` and ``limit``.
+    """
     try:
-        wallet = request.user.wallet
-        user_role = request.user.role
-        
-        # Get active holds with details
-        active_holds = wallet.get_active_holds().select_related(
-            'project', 'milestone', 'obsp_response'
+        wallet_id = Wallet.objects.filter(user=request.user).values_list('id', flat=True).first()
+        if wallet_id is None:
+            return Response({'error': 'Wallet not found.'}, status=status.HTTP_404_NOT_FOUND)
+        summary = WalletSummaryService.summary(wallet_id)
+        page = WalletSummaryService.hold_page(
+            wallet_id,
+            cursor=request.GET.get('cursor'),
+            limit=request.GET.get('limit'),
+            select_related=('project', 'milestone', 'obsp_response__template'),
         )
-        
-        holds_data = []
-        for hold in active_holds:
-            hold_info = {
-                'id': str(hold.id),
-                'hold_type': hold.hold_type,
-                'amount': float(hold.amount),
-                'title': hold.title,
-                'description': hold.description,
-                'created_at': hold.created_at.isoformat(),
-                'expires_at': hold.expires_at.isoformat() if hold.expires_at else None,
-                'days_remaining': hold.days_remaining,
-                'reference_id': hold.reference_id,
-                'metadata': hold.metadata
-            }
-            
-            # Add specific details based on hold type
-            if hold.hold_type == 'project_milestone':
-                hold_info.update({
-                    'project_title': hold.project.title if hold.project else 'Unknown Project',
-                    'milestone_title': hold.milestone.title if hold.milestone else 'Unknown Milestone',
-                    'project_id': str(hold.project.id) if hold.project else None,
-                    'milestone_id': str(hold.milestone.id) if hold.milestone else None,
-                })
-            elif hold.hold_type == 'obsp_purchase':
-                hold_info.update({
-                    'obsp_title': hold.obsp_response.template.title if hold.obsp_response else 'Unknown OBSP',
-                    'obsp_level': hold.obsp_response.selected_level if hold.obsp_response else None,
-                })
-            elif hold.hold_type == 'auto_pay_commitment':
-                hold_info.update({
-                    'auto_pay_details': hold.metadata.get('auto_pay_details', {}),
-                })
-            
-            holds_data.append(hold_info)
-        
-        # Group holds by type for summary
-        holds_summary = {}
-        for hold in active_holds:
-            hold_type = hold.hold_type
-            if hold_type not in holds_summary:
-                holds_summary[hold_type] = {
-                    'count': 0,
-                    'total_amount': Decimal('0.00'),
-                    'holds': []
-                }
-            holds_summary[hold_type]['count'] += 1
-            holds_summary[hold_type]['total_amount'] += hold.amount
-            holds_summary[hold_type]['holds'].append(str(hold.id))
-        
-        # Convert to float for JSON serialization
-        for hold_type in holds_summary:
-            holds_summary[hold_type]['total_amount'] = float(holds_summary[hold_type]['total_amount'])
-        
-        # Get recent transactions (customize limit as needed)
-        recent_transactions = wallet.get_transaction_history(limit=20)
-        transactions_data = [{
-            'id': str(tx.id),
-            'reference_id': tx.reference_id,
-            'amount': float(tx.amount),
-            'type': tx.transaction_type,
-            'status': tx.status,
-            'timestamp': tx.timestamp.isoformat(),
-            'description': tx.description
-        } for tx in recent_transactions]
-        
+        now = timezone.now()
+
         return Response({
-            'basic_info': {
-                'balance': float(wallet.balance),
-                'hold_balance': float(wallet.hold_balance),
-                'total_balance': float(wallet.total_balance),
-                'currency': wallet.currency,
-                'last_updated': wallet.last_updated.isoformat()
-            },
+            'basic_info': summary['basic_info'],
             'holds': {
-                'active_holds': holds_data,
-                'holds_summary': holds_summary,
-                'total_hold_amount': float(wallet.get_total_hold_amount())
+                'active_holds': [WalletSummaryService.serialize_hold(hold, now) for hold in page['holds']],
+                'next_cursor': page['next_cursor'],
+                'has_more': page['next_cursor'] is not None,
+                'holds_summary': summary['holds_summary'],
+                'total_hold_amount': summary['total_hold_amount'],
             },
-            'user_role': user_role,
-            'recent_transactions': transactions_data
+            'user_role': request.user.role,
+            'recent_transactions': summary['recent_transactions'],
         })
         
     except Exception as e:
@@ -312,52 +311,54 @@ def freelancer_wallet_details(request):
         return Response({'error': 'Wallet not found.'}, status=404)
     wallet = user.wallet
 
-    
-
-    # 1. Holds (project, OBSP stake, etc.)
-    holds = Hold.objects.filter(wallet=wallet, status='active')
     # Header Info
+    summary = WalletSummaryService.summary(wallet.id)
     header = {
-
-        'balance': float(wallet.balance),
-        'hold_balance': float(wallet.hold_balance),
-        'currency': wallet.currency,
-        'last_updated': wallet.last_updated.isoformat(),
+        'balance': summary['basic_info']['balance'],
+        'hold_balance': summary['basic_info']['hold_balance'],
+        'currency': summary['basic_info']['currency'],
+        'last_updated': summary['basic_info']['last_updated'],
     }
-    holds_data = []
-    for hold in holds:
-        hold_info = {
-            'id': str(hold.id),
-            'hold_type': hold.hold_type,
-            'amount': float(hold.amount),
-            'title': hold.title,
-            'description': hold.description,
-            'created_at': hold.created_at.isoformat(),
-            'reference_id': hold.reference_id,
-            'project_title': hold.project.title if hold.project else None,
-            'milestone_title': hold.milestone.title if hold.milestone else None,
-            'obsp_response_id': str(hold.obsp_response.id) if hold.obsp_response else None,
-        }
-        holds_data.append(hold_info)
+
+    # 1. Holds (project, OBSP stake, etc.), paged with holds_cursor and holds_limit
+    try:
+        page = WalletSummaryService.hold_page(
+            wallet.id, cursor=request.GET.get('holds_cursor'), limit=request.GET.get('holds_limit')
+        )
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    holds_data = [{
+        'id': str(hold.id),
+        'hold_type': hold.hold_type,
+        'amount': float(hold.amount),
+        'title': hold.title,
+        'description': hold.description,
+        'created_at': hold.created_at.isoformat(),
+        'reference_id': hold.reference_id,
+        'project_title': hold.project.title if hold.project else None,
+        'milestone_title': hold.milestone.title if hold.milestone else None,
+        'obsp_response_id': str(hold.obsp_response_id) if hold.obsp_response_id else None,
+    } for hold in page['holds']]
 
     # 2. Earnings (project, milestone, task payments)
     earnings_qs = Transaction.objects.filter(
         to_user=user,
         payment_type__in=['project', 'milestone', 'task'],
         status='completed'
-    ).order_by('-created_at')
-    earnings = []
-    for tx in earnings_qs:
-        earnings.append({
-            'id': str(tx.id),
-            'amount': float(tx.amount),
-            'type': tx.payment_type,
-            'description': tx.description,
-            'project': tx.project.title if tx.project else None,
-            'milestone': tx.milestone.title if tx.milestone else None,
-            'task': tx.task.title if tx.task else None,
-            'timestamp': tx.created_at.isoformat(),
-        })
+    ).order_by('-created_at').values(
+        'id', 'amount', 'payment_type', 'description', 'created_at',
+        'project__title', 'milestone__title', 'task__title',
+    )
+    earnings = [{
+        'id': str(tx['id']),
+        'amount': float(tx['amount']),
+        'type': tx['payment_type'],
+        'description': tx['description'],
+        'project': tx['project__title'],
+        'milestone': tx['milestone__title'],
+        'task': tx['task__title'],
+        'timestamp': tx['created_at'].isoformat(),
+    } for tx in earnings_qs]
 
     # 3. Transactions (Transaction, WalletTransaction, UserSubscription)
     # a. Platform Transactions
@@ -368,25 +369,24 @@ def freelancer_wallet_details(request):
         'id': str(tx.id),
         'amount': float(tx.amount),
         'type': tx.payment_type,
-        'direction': 'in' if tx.to_user == user else 'out',
+        'direction': 'in' if tx.to_user_id == user.id else 'out',
         'description': tx.description,
         'timestamp': tx.created_at.isoformat(),
         'status': tx.status,
     } for tx in platform_transactions]
 
     # b. Wallet Transactions
-    wallet_transactions = WalletTransaction.objects.filter(wallet=wallet).order_by('-timestamp')[:20]
     wallet_tx_data = [{
-        'id': str(wtx.id),
-        'amount': float(wtx.amount),
-        'type': wtx.transaction_type,
-        'description': wtx.description,
-        'timestamp': wtx.timestamp.isoformat(),
-        'status': wtx.status,
-    } for wtx in wallet_transactions]
+        'id': wtx['id'],
+        'amount': wtx['amount'],
+        'type': wtx['type'],
+        'description': wtx['description'],
+        'timestamp': wtx['timestamp'],
+        'status': wtx['status'],
+    } for wtx in summary['recent_transactions']]
 
     # c. Subscriptions
-    subscriptions = UserSubscription.objects.filter(user=user).order_by('-start_date')[:5]
+    subscriptions = UserSubscription.objects.filter(user=user).select_related('plan').order_by('-start_date')[:5]
     subs_data = [{
         'id': str(sub.id),
         'plan': sub.plan.name,
@@ -399,6 +399,7 @@ def freelancer_wallet_details(request):
     return Response({
         'header': header,
         'holds': holds_data,
+        'holds_next_cursor': page['next_cursor'],
         'earnings': earnings,
         'transactions': {
             'platform': platform_tx_data,
@@ -407,3 +408,56 @@ def freelancer_wallet_details(request):
         }
     })
 
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def quote_commissions(request):
+    """
+    Preview the commission on a batch of amounts.
+
+    Body: ``amounts`` (list), optional ``payee_id`` (the user the payments
+    go to; defaults to the requesting user) and ``category_id``. Each quote
+    is what ``CommissionService.calculate_commission`` charges for that
+    payment: the payee's special rates and role discount apply. ``user_types``
+    (one type or a list parallel to ``amounts``) overrides the payee's role.
+    """
+    amounts = request.data.get('amounts')
+    if not isinstance(amounts, list) or not amounts:
+        return Response({'error': 'amounts must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(amounts) > 500:
+        return Response({'error': 'At most 500 amounts per request'}, status=status.HTTP_400_BAD_REQUEST)
+
+    payee = request.user
+    payee_id = request.data.get('payee_id')
+    if payee_id is not None:
+        payee = User.objects.filter(pk=payee_id).first() if str(payee_id).isdigit() else None
+        if payee is None:
+            return Response({'error': 'Payee not found'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        quotes = CommissionService.quote_commissions(
+            amounts,
+            request.data.get('user_types', payee.role),
+            user=payee,
+            category=request.data.get('category_id'),
+        )
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    results = []
+    for quote in quotes:
+        if 'error' in quote:
+            results.append({'amount': str(quote['amount']), 'user_type': quote['user_type'], 'error': quote['error']})
+            continue
+        results.append({
+            'amount': float(quote['amount']),
+            'user_type': quote['user_type'],
+            'commission': float(quote['commission']),
+            'net_amount': float(quote['net_amount']),
+            'percentage': float(quote['percentage']),
+            'tier_id': str(quote['tier'].id) if quote['tier'] else None,
+            'tier_name': quote['tier'].name if quote['tier'] else None,
+            'special_rate': quote['special_rate'] is not None,
+        })
+    return Response({'quotes': results})
@@ -2,9 +2,8 @@ from channels.generic.websocket import AsyncWebsocketConsumer
 import json
 from channels.db import database_sync_to_async
 from core.models import Notification, User
+from core.services.notification_counter_service import NotificationCounterService
 from asgiref.sync import async_to_sync
-from rest_framework_simplejwt.tokens import AccessToken
-from urllib.parse import parse_qs
 from django.core.paginator import Paginator
 from django.core.cache import cache
 from Profile.models import FreelancerProfile
@@ -12,17 +11,16 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+FREELANCER_NOTIFICATION_TYPES = ['project_assignment', 'interview_request', 'bid_update', 'payment_received', 'project_update']
+
 class FreelancerNotificationConsumer(AsyncWebsocketConsumer):
     """WebSocket consumer for freelancer notification counts"""
     async def connect(self):
         try:
-            # Extract the user from the token
-            token = self.scope['query_string'].decode().split('=')[-1]
-            user_id = await self.get_user_from_token(token)
+            # The user is resolved once per connection by JWTAuthMiddleware
+            self.user = self.scope['user']
 
-            if user_id:
-                self.user = await database_sync_to_async(User.objects.get)(id=user_id)
-                
+            if self.user.is_authenticated:
                 # Verify user is a freelancer
                 if self.user.role not in ['freelancer', 'student']:
                     logger.warning(f"User {self.user.username} is not a freelancer, closing connection")
@@ -88,11 +86,7 @@ class FreelancerNotificationConsumer(AsyncWebsocketConsumer):
     def get_unread_notification_count(self, user):
         """Get count of unread notifications for freelancer"""
         try:
-            return Notification.objects.filter(
-                user=user, 
-                is_read=False,
-                type__in=['project_assignment', 'interview_request', 'bid_update', 'payment_received', 'project_update']
-            ).count()
+            return NotificationCounterService.get_total(user.id, types=FREELANCER_NOTIFICATION_TYPES)
         except Exception as e:
             logger.error(f"Error getting notification count: {str(e)}")
             return 0
@@ -104,60 +98,41 @@ class FreelancerNotificationConsumer(AsyncWebsocketConsumer):
         # For now, return 0 - you can implement this based on your message model
         return 0
 
-    @database_sync_to_async
-    def get_user_from_token(self, token):
-        """Extract user ID from JWT token"""
-        try:
-            decoded_token = AccessToken(token)
-            return decoded_token['user_id']
-        except Exception as e:
-            logger.error(f"Error decoding token: {str(e)}")
-            return None
-
 
 class FreelancerNotificationShowConsumer(AsyncWebsocketConsumer):
     """WebSocket consumer for freelancer individual notifications"""
     async def connect(self):
         try:
-            # Extract the user from the token
-            query_string = parse_qs(self.scope['query_string'].decode())
-            token = query_string.get('token', [None])[0]
+            # The user is resolved once per connection by JWTAuthMiddleware
+            self.user = self.scope['user']
 
-            if token:
-                user_id = await self.get_user_from_token(token)
-
-                if user_id:
-                    self.user = await database_sync_to_async(User.objects.get)(id=user_id)
-                    
-                    # Verify user is a freelancer
-                    if self.user.role not in ['freelancer', 'student']:
-                        logger.warning(f"User {self.user.username} is not a freelancer, closing connection")
-                        await self.close()
-                        return
-                        
-                    self.group_name = f"freelancer_notification_{self.user.id}"
-
-                    # Join the user to their group
-                    await self.channel_layer.group_add(
-                        self.group_name,
-                        self.channel_name
-                    )
-                    await self.accept()
-
-                    # Send initial notifications only once
-                    notifications = await self.get_user_notification(self.user)
-                    if notifications:
-                        # Send only the first notification
-                        await self.send(text_data=json.dumps({
-                            "notifications": [notifications[0]]
-                        }))
-                    
-                    logger.info(f"Freelancer notification consumer connected for {self.user.username}")
-                else:
-                    logger.error("Invalid token, closing connection")
+            if self.user.is_authenticated:
+                # Verify user is a freelancer
+                if self.user.role not in ['freelancer', 'student']:
+                    logger.warning(f"User {self.user.username} is not a freelancer, closing connection")
                     await self.close()
+                    return
+
+                self.group_name = f"freelancer_notification_{self.user.id}"
+
+                # Join the user to their group
+                await self.channel_layer.group_add(
+                    self.group_name,
+                    self.channel_name
+                )
+                await self.accept()
+
+                # Send initial notifications only once
+                notifications = await self.get_user_notification(self.user)
+                if notifications:
+                    # Send only the first notification
+                    await self.send(text_data=json.dumps({
+                        "notifications": [notifications[0]]
+                    }))
+
+                logger.info(f"Freelancer notification consumer connected for {self.user.username}")
             else:
-                logger.error("No token provided, closing connection")
+                logger.error("Invalid or missing token, closing connection")
                 await self.close()
         except Exception as e:
             logger.error(f"Error in freelancer notification show connect: {str(e)}")
@@ -199,7 +174,7 @@ class FreelancerNotificationShowConsumer(AsyncWebsocketConsumer):
             notifications = Notification.objects.filter(
                 user=user, 
                 is_read=False,
-                type__in=['project_assignment', 'interview_request', 'bid_update', 'payment_received', 'project_update']
+                type__in=FREELANCER_NOTIFICATION_TYPES
             ).order_by('-created_at')
             
             return [{
@@ -213,13 +188,3 @@ class FreelancerNotificationShowConsumer(AsyncWebsocketConsumer):
         except Exception as e:
             logger.error(f"Error getting user notifications: {str(e)}")
             return []
-
-    @database_sync_to_async
-    def get_user_from_token(self, token):
-        """Extract user ID from JWT token"""
-        try:
-            decoded_token = AccessToken(token)
-            return decoded_token['user_id']
-        except Exception as e:
-            logger.error(f"Error decoding token: {str(e)}")
-            return None
@@ -1,6 +1,8 @@
 from django.db.models.signals import post_save, post_delete, m2m_changed
 from django.dispatch import receiver
 from core.models import Project, User, Invitation, Notification
+from core.services.notification_counter_service import NotificationCounterService
+from core.services.notification_service import NotificationService
 from Profile.models import Feedback, FreelancerReview
 from freelancer.models import OBSPEligibilityManager
 from freelancer.obsp_eligibility import OBSPEligibilityCalculator
@@ -555,11 +557,10 @@ def create_freelancer_invitation_notification(sender, instance, created, **kwarg
             f"freelancer_{instance.to_user.id}",
             {
                 "type": "send_notification_count",
-                "notifications_count": Notification.objects.filter(
-                    user=instance.to_user, 
-                    is_read=False,
-                    type__in=['project_assignment', 'interview_request', 'bid_invitation', 'bid_update', 'payment_received', 'project_update']
-                ).count()
+                "notifications_count": NotificationCounterService.get_total(
+                    instance.to_user.id,
+                    types=['project_assignment', 'interview_request', 'bid_invitation', 'bid_update', 'payment_received', 'project_update']
+                )
             }
         )
         
@@ -593,61 +594,39 @@ def create_freelancer_project_notification(sender, instance, created, **kwargs):
         return
     
     try:
-        # Get all assigned freelancers
-        assigned_freelancers = instance.assigned_to.filter(role__in=['freelancer', 'student'])
-        
-        for freelancer in assigned_freelancers:
-            # Create notification based on project status
-            if instance.status == 'completed':
-                title = "Project Completed"
-                message = f"Your project '{instance.title}' has been marked as completed."
-                notification_type = "project_update"
-            elif instance.status == 'cancelled':
-                title = "Project Cancelled"
-                message = f"Your project '{instance.title}' has been cancelled."
-                notification_type = "project_update"
-            else:
-                continue
-            
-            notification = Notification.objects.create(
-                user=freelancer,
-                title=title,
-                notification_text=message,
-                type=notification_type,
-                related_model_id=instance.id,
-                is_read=False
-            )
-            
-            # Send real-time notification
-            channel_layer = get_channel_layer()
-            async_to_sync(channel_layer.group_send)(
-                f"freelancer_{freelancer.id}",
-                {
-                    "type": "send_notification_count",
-                    "notifications_count": Notification.objects.filter(
-                        user=freelancer, 
-                        is_read=False,
-                        type__in=['project_assignment', 'interview_request', 'bid_update', 'payment_received', 'project_update']
-                    ).count()
-                }
-            )
-            
-            async_to_sync(channel_layer.group_send)(
-                f"freelancer_notification_{freelancer.id}",
-                {
-                    "type": "send_notification",
-                    "notification": {
-                        "id": notification.id,
-                        "title": notification.title,
-                        "notification_text": notification.notification_text,
-                        "created_at": notification.created_at.isoformat(),
-                        "related_model_id": notification.related_model_id,
-                        "type": notification.type
-                    }
-                }
-            )
-            
-            logger.info(f"Created project notification for freelancer {freelancer.username}")
+        # Create notification based on project status
+        if instance.status == 'completed':
+            title = "Project Completed"
+            message = f"Your project '{instance.title}' has been marked as completed."
+            notification_type = "project_update"
+        elif instance.status == 'cancelled':
+            title = "Project Cancelled"
+            message = f"Your project '{instance.title}' has been cancelled."
+            notification_type = "project_update"
+        else:
+            return
+
+        # One bulk insert for all assigned freelancers
+        assigned_ids = list(
+            instance.assigned_to.filter(role__in=['freelancer', 'student']).values_list('id', flat=True)
+        )
+        notifications = NotificationService.send_many(
+            assigned_ids,
+            type=notification_type,
+            title=title,
+            notification_text=message,
+            related_model_id=instance.id,
+        )
+
+        # Send real-time notifications and counts to the freelancer consumers
+        transaction.on_commit(lambda: NotificationService.publish_to_groups(
+            notifications,
+            "freelancer_notification_{}",
+            count_group="freelancer_{}",
+            count_types=['project_assignment', 'interview_request', 'bid_update', 'payment_received', 'project_update'],
+        ))
+
+        logger.info(f"Created project notification for {len(notifications)} freelancer(s)")
     except Exception as e:
         logger.error(f"Error creating freelancer project notification: {str(e)}")
 
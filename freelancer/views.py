@@ -1397,81 +1397,58 @@ class FreelancerViewSet(viewsets.ModelViewSet):
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    @staticmethod
+    def _monthly_totals(user, start_date):
+        """Net earnings and payment count per month since ``start_date``, oldest first, from the daily rollups"""
+        from financeapp.services.rollup_service import RollupService
+
+        return [
+            {'month': month.strftime('%b %Y'), 'total': float(total), 'count': count}
+            for month, total, count in RollupService.totals(
+                user, 'credits', start=timezone.localdate(start_date), period='month'
+            )
+        ]
+
     @action(detail=False, methods=['get'])
     def earnings(self, request):
-        """Get detailed earnings information calculated directly from transactions"""
-        from django.db.models import Sum, Count
-        from financeapp.models.transaction import Transaction
+        """Get detailed earnings information from the daily earnings rollups"""
+        from financeapp.services.rollup_service import RollupService
         from django.utils import timezone
-        from datetime import datetime, timedelta
+        from datetime import timedelta
         
         try:
             # Calculate earnings by month (last 6 months)
             end_date = timezone.now()
             start_date = end_date - timedelta(days=180)  # approximately 6 months
-            
-            # Monthly aggregation - SQLite compatible approach
-            monthly_earnings = []
-            month_data = {}
-            
-            # Manually aggregate by month
-            for tx in Transaction.objects.filter(
-                to_user=request.user,
-                status='completed',
-                created_at__gte=start_date
-            ):
-                month_key = tx.created_at.strftime('%b %Y')
-                if month_key not in month_data:
-                    month_data[month_key] = {
-                        'total': 0,
-                        'count': 0
-                    }
-                
-                month_data[month_key]['total'] += float(tx.net_amount)
-                month_data[month_key]['count'] += 1
-            
-            # Convert to list and sort by month
-            for month, data in month_data.items():
-                monthly_earnings.append({
-                    'month': month,
-                    'total': data['total'],
-                    'count': data['count']
-                })
-            
-            # Sort by month
-            monthly_earnings.sort(key=lambda x: datetime.strptime(x['month'], '%b %Y'))
-            
-            # Get project-wise earnings
-            project_earnings = []
-            completed_projects = Project.objects.filter(
+            monthly_earnings = self._monthly_totals(request.user, start_date)
+
+            # Get project-wise earnings, grouped in one query
+            completed_projects = list(Project.objects.filter(
                 Q(assigned_to=request.user) |
                 Q(tasks__assigned_to=request.user),
                 status='completed'
-            ).distinct()
-            
-            for project in completed_projects:
-                # Calculate total earnings for this project from transactions
-                project_transactions = Transaction.objects.filter(
-                    to_user=request.user,
-                    project=project,
-                    status='completed'
+            ).distinct().values('id', 'title', 'deadline'))
+
+            project_totals = {
+                row['project_id']: row
+                for row in RollupService.by_project(
+                    request.user, 'credits', project_ids=[project['id'] for project in completed_projects]
                 )
-                
-                project_total = project_transactions.aggregate(total=Sum('net_amount'))['total'] or 0
-                
+            }
+
+            project_earnings = []
+            for project in completed_projects:
+                totals = project_totals.get(project['id'], {})
                 project_earnings.append({
-                    'project_id': project.id,
-                    'project_title': project.title,
-                    'earnings': float(project_total),
-                    'completion_date': project.deadline,
-                    'transaction_count': project_transactions.count()
+                    'project_id': project['id'],
+                    'project_title': project['title'],
+                    'earnings': float(totals.get('total') or 0),
+                    'completion_date': project['deadline'],
+                    'transaction_count': totals.get('count', 0)
                 })
             
             # Calculate total all-time earnings
-            total_earnings = Transaction.objects.filter(
-                to_user=request.user,
-                status='completed'
-            ).aggregate(total=Sum('net_amount'))['total'] or 0
+            total_earnings, _ = RollupService.grand_total(request.user, 'credits')
             
             # Calculate average project value
             avg_project_value = total_earnings / len(project_earnings) if project_earnings else 0
@@ -1530,36 +1507,11 @@ class FreelancerViewSet(viewsets.ModelViewSet):
         end_date = timezone.now()
         start_date = end_date - timedelta(days=180)
         
-        # SQLite-compatible approach for monthly data
-        monthly_data = []
-        month_transactions = {}
-        
-        # Group transactions by month manually
-        for tx in received_payments.filter(created_at__gte=start_date):
-            month_key = tx.created_at.strftime('%b %Y')
-            if month_key not in month_transactions:
-                month_transactions[month_key] = {
-                    'total': 0,
-                    'count': 0
-                }
-            
-            month_transactions[month_key]['total'] += float(tx.net_amount)
-            month_transactions[month_key]['count'] += 1
-        
-        # Convert dictionary to list format
-        for month, data in month_transactions.items():
-            monthly_data.append({
-                'month': month,
-                'total': data['total'],
-                'count': data['count']
-            })
-        
-        # Sort by month
-        monthly_data.sort(key=lambda x: timezone.datetime.strptime(x['month'], '%b %Y'))
+        monthly_data = self._monthly_totals(request.user, start_date)
         
         # Serialize transaction list (limited to 20 most recent)
         recent_transactions = []
-        for tx in transactions[:20]:
+        for tx in transactions.select_related('from_user', 'to_user', 'project', 'task')[:20]:
             recent_transactions.append({
                 'id': str(tx.id),
                 'transaction_id': tx.transaction_id,
@@ -1569,8 +1521,8 @@ class FreelancerViewSet(viewsets.ModelViewSet):
                 'status': tx.status,
                 'created_at': tx.created_at.isoformat(),
                 'completed_at': tx.completed_at.isoformat() if tx.completed_at else None,
-                'is_incoming': tx.to_user.id == request.user.id,
-                'other_party': tx.from_user.username if tx.to_user.id == request.user.id else tx.to_user.username,
+                'is_incoming': tx.to_user_id == request.user.id,
+                'other_party': tx.from_user.username if tx.to_user_id == request.user.id else tx.to_user.username,
                 'project_title': tx.project.title if tx.project else None,
                 'task_title': tx.task.title if tx.task else None
             })
@@ -8,12 +8,12 @@ django.setup()
 
 from django.core.asgi import get_asgi_application
 from channels.routing import ProtocolTypeRouter, URLRouter
-from channels.auth import AuthMiddlewareStack
 from channels.security.websocket import AllowedHostsOriginValidator
 import core.routing
 import client.routing
 import freelancer.routing
 import chat.routing
+from freelancer_hub.middleware import JWTAuthMiddleware
 
 # Set the event loop policy to use a more scalable reactor
 if sys.platform == 'linux':
@@ -23,7 +23,7 @@ if sys.platform == 'linux':
 application = ProtocolTypeRouter({
     "http": get_asgi_application(),
     "websocket": AllowedHostsOriginValidator(
-        AuthMiddlewareStack(
+        JWTAuthMiddleware(
             URLRouter(
                 core.routing.websocket_urlpatterns + 
                 client.routing.websocket_urlpatterns +
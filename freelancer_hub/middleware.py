@@ -1,23 +1,184 @@
+import asyncio
+import logging
+import time
 from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
 from channels.middleware import BaseMiddleware  # Correct import
-from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
+from django.db import router
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from rest_framework_simplejwt.tokens import AccessToken
 from core.models import User  # Ensure your User model is correct
 
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """Tiny per-process cache with a fixed time-to-live per entry"""
+
+    def __init__(self, ttl, max_entries=50000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._data = {}
+
+    def get(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            self._data.pop(key, None)
+            return None
+        return value
+
+    def set(self, key, value):
+        if len(self._data) >= self.max_entries:
+            self._evict()
+        self._data[key] = (time.monotonic() + self.ttl, value)
+
+    def delete(self, key):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def _evict(self):
+        now = time.monotonic()
+        for key in [k for k, (expires_at, _) in self._data.items() if expires_at < now]:
+            del self._data[key]
+        if len(self._data) >= self.max_entries:
+            # Still full of live entries: drop the oldest half.
+            oldest = sorted(self._data, key=lambda k: self._data[k][0])
+            for key in oldest[:len(oldest) // 2]:
+                del self._data[key]
+
+
+SNAPSHOT_USER_FIELDS = ('id', 'username', 'role', 'first_name', 'last_name', 'is_active')
+
+
+class UserSnapshotCache:
+    """
+    Caches the handful of user fields websocket consumers need (id, role,
+    username, names, avatar URL) so a connect does not have to hit the users
+    and profile tables. Concurrent misses for the same user share a single
+    database lookup, which keeps reconnect storms after a deploy cheap.
+    """
+
+    def __init__(self, ttl):
+        self.cache = TTLCache(ttl)
+        self._inflight = {}
+
+    async def get_user(self, user_id):
+        """
+        Return a ``User`` built from the snapshot, or None. It behaves like a
+        row loaded with ``only()``: the other fields are deferred and load on
+        access, and ``save()`` writes back only the snapshot fields.
+        """
+        snapshot = await self.get_snapshot(user_id)
+        if snapshot is None:
+            return None
+        # from_db() takes the values in the model's field order
+        fields = [f.attname for f in User._meta.concrete_fields if f.attname in SNAPSHOT_USER_FIELDS]
+        user = User.from_db(router.db_for_read(User), fields, [snapshot[field] for field in fields])
+        user.avatar_url = snapshot['avatar_url']
+        return user
+
+    async def get_snapshot(self, user_id):
+        snapshot = self.cache.get(user_id)
+        if snapshot is not None:
+            return snapshot
+
+        task = self._inflight.get(user_id)
+        if task is None:
+            task = asyncio.ensure_future(self._load(user_id))
+            self._inflight[user_id] = task
+            task.add_done_callback(lambda _: self._inflight.pop(user_id, None))
+        return await asyncio.shield(task)
+
+    async def _load(self, user_id):
+        snapshot = await database_sync_to_async(build_user_snapshot)(user_id)
+        if snapshot is not None:
+            self.cache.set(user_id, snapshot)
+        return snapshot
+
+    def invalidate(self, user_id):
+        self.cache.delete(user_id)
+
+
+def build_absolute_uri(path):
+    base = getattr(settings, "BASE_URL", "http://127.0.0.1:8000")
+    if not path:
+        return None
+    if path.startswith("http"):
+        return path
+    return base + path
+
+
+def build_user_snapshot(user_id):
+    """Load the fields cached by ``UserSnapshotCache`` with at most two queries"""
+    from Profile.models import ClientProfile, FreelancerProfile
+
+    user = User.objects.filter(id=user_id).values(*SNAPSHOT_USER_FIELDS).first()
+    if user is None:
+        return None
+
+    profile_model = ClientProfile if user['role'] == 'client' else FreelancerProfile
+    profile = profile_model.objects.filter(user_id=user_id).only('profile_picture').first()
+    if profile and profile.profile_picture:
+        avatar_url = build_absolute_uri(profile.profile_picture.url)
+    else:
+        name = f"{user['first_name'] or ''} {user['last_name'] or ''}".strip() or user['username']
+        avatar_url = f"https://ui-avatars.com/api/?name={name.replace(' ', '+')}&background=random"
+
+    return {**user, 'avatar_url': avatar_url}
+
+
+user_snapshot_cache = UserSnapshotCache(ttl=getattr(settings, 'WS_AUTH_CACHE_TTL', 60))
+
+
+async def authenticate_token(token):
+    """Validate a JWT access token and return the cached user, or None"""
+    if not token:
+        return None
+    try:
+        access_token = AccessToken(token)  # Validate JWT
+    except Exception as e:
+        logger.info(f"JWT Authentication Failed: {e}")
+        return None
+
+    user = await user_snapshot_cache.get_user(access_token["user_id"])
+    if user is None or not user.is_active:
+        return None
+    return user
+
+
 class JWTAuthMiddleware(BaseMiddleware):
+    """
+    Authenticates every websocket connection once, from the ``token`` query
+    parameter, and exposes the result as ``scope['user']`` to all consumers.
+    """
     async def __call__(self, scope, receive, send):
+        scope = dict(scope)
         query_string = scope["query_string"].decode()
         query_params = parse_qs(query_string)
 
         token = query_params.get("token", [None])[0]  # Get token from URL
-        scope["user"] = AnonymousUser()  # Default to anonymous
-        if token:
-            try:
-                access_token = AccessToken(token)  # Validate JWT
-                user = await sync_to_async(User.objects.get)(id=access_token["user_id"])
-                scope["user"] = user  # Attach user to scope
-            except Exception as e:
-                print(f"JWT Authentication Failed: {e}")
+        user = await authenticate_token(token)
+        scope["user"] = user or AnonymousUser()  # Default to anonymous
 
         return await super().__call__(scope, receive, send)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def invalidate_user_snapshot(sender, instance, **kwargs):
+    user_snapshot_cache.invalidate(instance.id)
+
+
+@receiver(post_save, sender='Profile.ClientProfile')
+@receiver(post_save, sender='Profile.FreelancerProfile')
+def invalidate_profile_snapshot(sender, instance, **kwargs):
+    user_snapshot_cache.invalidate(instance.user_id)
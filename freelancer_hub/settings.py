@@ -42,6 +42,15 @@ CHANNEL_LAYERS = {
     },
 }
 
+# Seconds a websocket user snapshot (id, role, username, avatar) stays in the
+# per-process cache used by JWTAuthMiddleware
+WS_AUTH_CACHE_TTL = int(os.getenv('WS_AUTH_CACHE_TTL', 60))
+
+# Chat presence: 'redis' in deployments, 'local' (in-process) for tests and
+# single-process development. Clients should heartbeat well within the TTL.
+PRESENCE_BACKEND = os.getenv('PRESENCE_BACKEND', 'redis')
+PRESENCE_TTL = int(os.getenv('PRESENCE_TTL', 60))
+
 # Celery (background tasks/notifications)
 CELERY_BROKER_URL = REDIS_URL  # Use Redis as the Celery broker
 CELERY_RESULT_BACKEND = REDIS_URL  # Use Redis for task results
@@ -203,6 +212,68 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'client.tasks.send_event_approaching_notification',  # Make sure this path is correct
         'schedule': 30.0,  # Run every minute (adjust as needed)
     },
+    'reconcile-notification-counters-hourly': {
+        'task': 'core.tasks.reconcile_notification_counters',
+        'schedule': crontab(minute=15),  # Fix any unread counter drift once an hour
+    },
+    'rollup-notification-digests': {
+        'task': 'core.tasks.rollup_notification_digests',
+        'schedule': crontab(minute=5),  # Roll up the window that just closed
+    },
+    'purge-expired-notifications-daily': {
+        'task': 'core.tasks.purge_expired_notifications',
+        'schedule': crontab(minute=30, hour=3),
+    },
+    'snapshot-journal-balances-hourly': {
+        'task': 'financeapp.tasks.snapshot_journal_balances',
+        'schedule': crontab(minute=45),  # Bounds the postings summed for a point-in-time balance
+    },
+    'rebuild-recent-rollups-daily': {
+        'task': 'financeapp.tasks.rebuild_recent_rollups',
+        'schedule': crontab(minute=15, hour=2),
+    },
+    'expire-holds': {
+        'task': 'financeapp.tasks.expire_holds',
+        'schedule': crontab(minute='*/5'),
+    },
+    'dispatch-subscription-renewals-hourly': {
+        'task': 'financeapp.tasks.dispatch_subscription_renewals',
+        'schedule': crontab(minute=20),  # Also picks up the retries that came due
+    },
+}
+
+# Grouping of similar notifications into digests (see core.services.notification_digest_service)
+NOTIFICATION_DIGEST = {
+    'window': 'hour',
+    'min_items': 3,
+    'sample_size': 5,
+}
+
+# Notification retention (see core.services.notification_retention_service)
+NOTIFICATION_RETENTION = {
+    'read_days': int(os.getenv('NOTIFICATION_READ_RETENTION_DAYS', 90)),
+    'unread_days': int(os.getenv('NOTIFICATION_UNREAD_RETENTION_DAYS', 365)),
+    'archive': True,
+    'archive_days': 730,
+}
+
+# Wallet commissions are spread over this many platform sub-accounts
+# (see financeapp.services.ledger_service)
+PLATFORM_WALLET_USERNAME = 'platform'
+PLATFORM_WALLET_SHARDS = int(os.getenv('PLATFORM_WALLET_SHARDS', 16))
+
+# Background statement exports are written here; not served as media
+STATEMENT_EXPORT_ROOT = os.getenv('STATEMENT_EXPORT_ROOT', os.path.join(BASE_DIR, 'exports', 'statements'))
+
+# Subscription auto-renewal (see financeapp.services.renewal_service)
+SUBSCRIPTION_RENEWALS = {
+    'workers': int(os.getenv('SUBSCRIPTION_RENEWAL_WORKERS', 4)),
+    'retry_delays_hours': [24, 72, 168],
+}
+
+# Wallet journal snapshots (see financeapp.services.journal_service)
+WALLET_JOURNAL = {
+    'snapshot_lag_seconds': 300,
 }
 
 # Password validation
@@ -84,19 +84,18 @@ class TaskDependency(models.Model):
     
     def notify_affected_freelancers(self):
         """Notify freelancers affected by this dependency"""
-        # Implementation would send notifications
-        from_task_freelancers = self.from_task.assigned_to.all()
-        to_task_freelancers = self.to_task.assigned_to.all()
-        
-        # Create notifications for affected users
-        for user in to_task_freelancers:
-            Notification.objects.create(
-                user=user,
-                type='Projects & Tasks',
-                related_model_id=self.to_task.id,
-                title=f"Task {self.to_task.title} dependency updated",
-                notification_text=f"Your task depends on '{self.from_task.title}' which affects your timeline"
-            )
+        from core.services.notification_service import NotificationService
+
+        to_task_freelancers = self.to_task.assigned_to.values_list('id', flat=True)
+
+        # One bulk insert and one realtime event per affected user
+        NotificationService.send_many(
+            to_task_freelancers,
+            type='Projects & Tasks',
+            related_model_id=self.to_task.id,
+            title=f"Task {self.to_task.title} dependency updated",
+            notification_text=f"Your task depends on '{self.from_task.title}' which affects your timeline"
+        )
         
         return True
     